@@ -1,33 +1,99 @@
-import uuid, asyncio, os, logging
-from collections import defaultdict
+import uuid, asyncio, os, logging, hashlib
+from collections import defaultdict, OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from apps.core_contracts_pb2 import Plan, TaskBundle, CodingTask
 from clients import rag_client
 from clients.srm_client import SRMClient
 from apps.orchestrator import topics as T
-from clients.kafka_utils import produce, subscribe
+from clients.kafka_utils import produce, serve
 from prometheus_client import Counter, start_http_server
 import networkx as nx
 import radon.complexity as rc
 
 GROUP = "code-planner"
+CONCURRENCY = int(os.getenv("CP_CONCURRENCY", "4"))
+RAG_BATCH = int(os.getenv("CP_RAG_BATCH", "32"))                   # step searches per batch request
+RAG_CONCURRENCY = int(os.getenv("CP_RAG_CONCURRENCY", "8"))        # batch requests in flight per plan
+COMPLEXITY_WORKERS = int(os.getenv("CP_COMPLEXITY_WORKERS", "2"))
+COMPLEXITY_CACHE = int(os.getenv("CP_COMPLEXITY_CACHE", "4096"))   # labels kept, by snippet hash
 
 # Prometheus metrics
 TASKS = Counter("cp_tasks_emitted_total","coding tasks")
-start_http_server(9500)
 
 srm = SRMClient("srm", 9090)
 log = logging.getLogger("code-planner")
 
-async def complexity_of(snippet:str)->str:
+def _score(snippet:str)->str:
     try:
         cc = max(b.complexity for b in rc.cc_visit(snippet))
         return "trivial" if cc<=5 else "moderate" if cc<=10 else "complex"
     except Exception:
         return "moderate"
 
+_pool: ProcessPoolExecutor|None = None
+_labels: OrderedDict[str, str|asyncio.Future] = OrderedDict()   # label, or the scoring in flight
+
+def _drop_pool(broken:ProcessPoolExecutor):
+    """Forget a pool whose worker died; the next scoring starts a fresh one."""
+    global _pool
+    if _pool is broken:
+        _pool = None
+        broken.shutdown(wait=False, cancel_futures=True)
+
+async def complexity_of(snippet:str)->str:
+    """radon label for a snippet, scored in a process pool off the event loop and cached by hash."""
+    global _pool
+    key = hashlib.sha1(snippet.encode()).hexdigest()
+    hit = _labels.get(key)
+    if isinstance(hit, str):
+        _labels.move_to_end(key)
+        return hit
+    pool = None                                # set when this call submits the scoring
+    if hit is None or hit.get_loop() is not asyncio.get_running_loop():
+        if _pool is None:
+            _pool = ProcessPoolExecutor(COMPLEXITY_WORKERS)
+        pool = _pool
+        try:
+            hit = _labels[key] = asyncio.get_running_loop().run_in_executor(pool, _score, snippet)
+        except BrokenProcessPool:
+            _drop_pool(pool)
+            hit = None
+    try:
+        if hit is None:
+            raise BrokenProcessPool("complexity pool is broken")
+        label = await asyncio.shield(hit)      # the same snippet in other steps shares one scoring
+    except BrokenProcessPool as e:             # a worker died: rebuild the pool next time, score here now
+        log.warning("complexity pool broken, restarting it: %s", e)
+        if pool is not None:
+            _drop_pool(pool)
+        label = _score(snippet)
+    except Exception as e:                     # score here rather than fail the plan
+        log.warning("complexity scoring in pool failed: %s", e)
+        label = _score(snippet)
+    _labels[key] = label
+    _labels.move_to_end(key)
+    while len(_labels) > COMPLEXITY_CACHE:
+        _labels.popitem(last=False)
+    return label
+
+async def _search(steps, gate:asyncio.Semaphore)->list[list]:
+    async with gate:
+        return await rag_client.hybrid_search_batch(
+            [{"query": s.goal, "k": 6, "alpha": .25, "filter": {"path": s.path} if s.path else None} for s in steps])
+
+async def _label(ctx:list)->str:
+    return await complexity_of(ctx[0].get("snippet", "")) if ctx else "moderate"
+
 async def build_tasks(plan:Plan)->TaskBundle:
-    tb = TaskBundle(plan_id=plan.id)
-    for step in plan.steps:
+    tb = TaskBundle(plan_id=plan.id, correlation_id=plan.correlation_id or plan.parent_request_id)
+    # hydrate contextual chunks for every step in a few batch searches, then label them all at once
+    gate = asyncio.Semaphore(RAG_CONCURRENCY)
+    steps = list(plan.steps)
+    batches = await asyncio.gather(*(_search(steps[i:i+RAG_BATCH], gate) for i in range(0, len(steps), RAG_BATCH)))
+    ctxs = [ctx for batch in batches for ctx in batch]
+    labels = await asyncio.gather(*(_label(ctx) for ctx in ctxs))
+    for step, ctx, label in zip(plan.steps, ctxs, labels):
         task = CodingTask(
             id=str(uuid.uuid4()),
             parent_plan_id=plan.id,
@@ -36,25 +102,21 @@ async def build_tasks(plan:Plan)->TaskBundle:
             path=step.path,
             kind=step.kind
         )
-        # hydrate contextual chunks
-        ctx = await rag_client.hybrid_search(step.goal, k=6, alpha=.25,
-                                             filter={"path": step.path} if step.path else None)
         task.blob_ids.extend([str(c.get("id", i)) for i, c in enumerate(ctx)])
-        # complexity label
-        if ctx:
-            snippet = ctx[0].get("snippet", "")
-            task.complexity = await complexity_of(snippet)
-        else:
-            task.complexity = "moderate"
+        task.complexity = label
         tb.tasks.append(task)
     return tb
 
 async def loop():
-    async for topic, plan in subscribe(GROUP, [T.PLAN], proto_map={T.PLAN: Plan}):
+    start_http_server(9500)
+    async def handle(topic, plan):
         tb = await build_tasks(plan)
         await produce(T.TASK, tb)
         TASKS.inc(len(tb.tasks))
         log.info("emitted %d tasks for plan %s", len(tb.tasks), plan.id)
+    # plans are independent; one slow plan no longer blocks the ones behind it
+    await serve(GROUP, [T.PLAN], handle,
+                concurrency=CONCURRENCY, key=lambda t, plan: plan.id)
 
 if __name__ == "__main__":
     logging.basicConfig(level=logging.INFO)
@@ -4,14 +4,14 @@ from apps.core_contracts_pb2 import Plan, Step
 from apps.agents.code_planner.agent import build_tasks
 
 # Mock RAG client function
-async def mock_hybrid_search(*_, **__):
-    return [{"id": "blob1", "snippet": "def x(): pass"}]
+async def mock_hybrid_search_batch(queries):
+    return [[{"id": "blob1", "snippet": "def x(): pass"}] for _ in queries]
 
 # Patch the rag client
 @pytest.fixture
 def mock_rag(monkeypatch):
     import clients.rag_client as rag_mod
-    monkeypatch.setattr(rag_mod, "hybrid_search", mock_hybrid_search)
+    monkeypatch.setattr(rag_mod, "hybrid_search_batch", mock_hybrid_search_batch)
 
 @pytest.mark.asyncio
 async def test_build_tasks(mock_rag):
@@ -36,4 +36,32 @@ async def test_build_tasks(mock_rag):
     assert task.path == "src/app.py"
     assert task.complexity in ("trivial", "moderate", "complex")
     assert len(task.blob_ids) == 1
-    assert task.blob_ids[0] == "blob1"
\ No newline at end of file
+    assert task.blob_ids[0] == "blob1"
+
+@pytest.mark.asyncio
+async def test_step_searches_are_batched(monkeypatch):
+    import clients.rag_client as rag_mod
+    from apps.agents.code_planner import agent
+    inflight = peak = 0
+    sizes = []
+
+    async def slow_batch(queries):
+        nonlocal inflight, peak
+        inflight += 1
+        peak = max(peak, inflight)
+        sizes.append(len(queries))
+        await asyncio.sleep(0.01)
+        inflight -= 1
+        return [[{"id": q["query"], "snippet": "def x(): pass"}] if q["query"] != "none" else [] for q in queries]
+
+    monkeypatch.setattr(rag_mod, "hybrid_search_batch", slow_batch)
+    monkeypatch.setattr(agent, "RAG_BATCH", 2)
+    monkeypatch.setattr(agent, "RAG_CONCURRENCY", 2)
+    plan = Plan(id="p2")
+    for i, goal in enumerate(["a", "b", "none", "c", "d"]):
+        plan.steps.append(Step(order=i, goal=goal, kind="MODIFY", path=f"src/{goal}.py"))
+    tb = await build_tasks(plan)
+    assert sizes == [2, 2, 1] and peak == 2
+    assert [t.goal for t in tb.tasks] == ["a", "b", "none", "c", "d"]       # step order kept
+    assert [list(t.blob_ids) for t in tb.tasks][:3] == [["a"], ["b"], []]
+    assert [t.complexity for t in tb.tasks] == ["trivial", "trivial", "moderate", "trivial", "trivial"]
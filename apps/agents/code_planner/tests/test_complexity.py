@@ -22,4 +22,38 @@ async def test_complexity_moderate():
 async def test_complexity_error():
     snippet = "not valid python code {"
     result = await complexity_of(snippet)
-    assert result == "moderate"  # defaults to moderate on error
\ No newline at end of file
+    assert result == "moderate"  # defaults to moderate on error
+
+@pytest.mark.asyncio
+async def test_complexity_cached_by_snippet(monkeypatch):
+    import asyncio
+    from apps.agents.code_planner import agent
+    snippet = "def cached(x):\n    return x if x else -x\n"
+    first = await asyncio.gather(*(complexity_of(snippet) for _ in range(3)))
+    assert first == ["trivial"] * 3
+    monkeypatch.setattr(agent, "_score", lambda s: pytest.fail("scored twice"))
+    assert await complexity_of(snippet) == "trivial"
+
+@pytest.mark.asyncio
+async def test_complexity_survives_broken_pool(monkeypatch):
+    from concurrent.futures import Future
+    from concurrent.futures.process import BrokenProcessPool
+    from apps.agents.code_planner import agent
+
+    class Broken:
+        def __init__(self, at_submit): self.at_submit, self.closed = at_submit, False
+        def submit(self, fn, *args):
+            if self.at_submit:
+                raise BrokenProcessPool("gone")
+            fut = Future()
+            fut.set_exception(BrokenProcessPool("worker died"))
+            return fut
+        def shutdown(self, **kw): self.closed = True
+
+    for n, at_submit in enumerate((True, False)):
+        pool = Broken(at_submit)
+        monkeypatch.setattr(agent, "_pool", pool)
+        assert await complexity_of(f"def broken_{n}(x): return x") == "trivial"
+        assert pool.closed and agent._pool is None      # the next call starts a fresh pool
+    assert await complexity_of("def fresh(x): return -x") == "trivial"
+    assert isinstance(agent._pool, agent.ProcessPoolExecutor)
@@ -0,0 +1,88 @@
+"""CPU- and memory-aware admission of coding tasks.
+
+CA_CONCURRENCY caps how many tasks are in flight; this gate additionally
+holds a task back while the pod is already busy: the 1-minute load average
+per CPU is above CA_MAX_LOAD, or less than CA_MIN_FREE_MB plus one task's
+CA_TASK_MB of memory is left.  Limits come from the cgroup when the agent
+runs in one (the pod's own quota, not the node's), else from the host.
+A task is always admitted when none is running, so a small pod still makes
+progress.
+"""
+from __future__ import annotations
+import asyncio, logging, os
+from contextlib import asynccontextmanager
+from pathlib import Path
+
+log = logging.getLogger("coding-agent.admission")
+
+MAX_LOAD = float(os.getenv("CA_MAX_LOAD", "1.0"))         # load average per CPU
+MIN_FREE_MB = float(os.getenv("CA_MIN_FREE_MB", "512"))
+TASK_MB = float(os.getenv("CA_TASK_MB", "256"))           # expected peak of one task
+POLL_SEC = float(os.getenv("CA_ADMISSION_POLL_SEC", "0.5"))
+
+_CGROUP = Path("/sys/fs/cgroup")
+
+def cpus() -> float:
+    try:
+        quota, period = (_CGROUP / "cpu.max").read_text().split()
+        if quota != "max":
+            return max(int(quota) / int(period), 1.0)
+    except (OSError, ValueError):
+        pass
+    return float(len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count() or 1)
+
+def free_mb() -> float|None:
+    """Memory still available to this pod, in MB; None if unknown."""
+    try:
+        limit = (_CGROUP / "memory.max").read_text().strip()
+        if limit != "max":
+            used = int((_CGROUP / "memory.current").read_text())
+            return (int(limit) - used) / 2**20
+    except (OSError, ValueError):
+        pass
+    try:
+        for line in Path("/proc/meminfo").read_text().splitlines():
+            if line.startswith("MemAvailable:"):
+                return int(line.split()[1]) / 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+def load() -> float|None:
+    try:
+        return os.getloadavg()[0] / cpus()
+    except OSError:
+        return None
+
+class Admission:
+    def __init__(self, max_load:float=MAX_LOAD, min_free_mb:float=MIN_FREE_MB, task_mb:float=TASK_MB,
+                 poll:float=POLL_SEC, probe=None):
+        self.max_load, self.min_free_mb, self.task_mb, self.poll = max_load, min_free_mb, task_mb, poll
+        self.probe = probe or (lambda: (load(), free_mb()))
+        self.running = 0
+
+    def blocked(self) -> str|None:
+        """Why a new task should wait, or None to admit it."""
+        if self.running == 0:
+            return None
+        cpu, mem = self.probe()
+        if cpu is not None and cpu > self.max_load:
+            return f"load {cpu:.2f}/cpu"
+        if mem is not None and mem < self.min_free_mb + self.task_mb:
+            return f"{mem:.0f} MB free"
+        return None
+
+    @asynccontextmanager
+    async def slot(self):
+        """Wait until the pod has room for one more task, then hold a slot for it."""
+        why = self.blocked()
+        if why:
+            log.info(f"Holding task back: {why} ({self.running} running)")
+        while why:
+            await asyncio.sleep(self.poll)
+            why = self.blocked()
+        self.running += 1
+        try:
+            yield
+        finally:
+            self.running -= 1
@@ -1,23 +1,27 @@
 import os
 import asyncio
 import subprocess
-import tempfile
+import time
 import uuid
 import json
 import logging
 import shutil
 from pathlib import Path
 
+import pygit2
 from unidiff import PatchSet
 from git import Repo, GitCommandError
-from prometheus_client import Counter, start_http_server
+from prometheus_client import Counter, Gauge, Histogram, start_http_server
 
-from apps.core_contracts_pb2 import CodingTask, CommitResult, TaskBundle
-from clients.kafka_utils import producer, consumer
-from clients import rag_client, srm_client
+from apps.core_contracts_pb2 import CodingTask, CommitResult
+from clients.kafka_utils import producer, serve
+from clients import srm_client
+from clients.llm_client.tokens import truncate
 from apps.orchestrator import topics as T
-import openai
-import anyio
+from apps.agents.coding_agent.workspace import WorktreePool
+from apps.agents.coding_agent.admission import Admission
+from apps.agents.coding_agent.prefetch import Prefetcher
+from apps.agents.coding_agent import patching, selfcheck, timing, workspace
 
 # Setup logging
 logging.basicConfig(level=logging.INFO)
@@ -28,16 +32,31 @@ LLM_MODEL = os.getenv("CODING_MODEL", "gpt-4o-mini-code-30k")
 MAX_RETRIES = int(os.getenv("MAX_RETRIES", "2"))
 REMOTE_REPO = os.getenv("REMOTE_REPO", "https://github.com/your-org/self-healing-code")
 MOCK_LLM = os.getenv("MOCK_LLM", "0") == "1"
+GROUP = "coding-agent"
+CONCURRENCY = int(os.getenv("CA_CONCURRENCY", "4"))   # tasks in flight
+CTX_TOKENS = int(os.getenv("CODING_CTX_TOKENS", "2000"))
+SELFCHECK_FULL = os.getenv("CA_SELFCHECK_FULL", "0") == "1"   # ignore what the patch touched
+CANDIDATES = int(os.getenv("CA_CANDIDATES", "1"))     # >1: race this many patches per round
+TEMPERATURES = [float(t) for t in os.getenv("CA_CANDIDATE_TEMPS", "0.1,0.4,0.7").split(",")]
 
 # Prometheus metrics
 PATCH_GEN = Counter("ca_patches_total", "Patches generated", ["result"])
 COMMIT_CNT = Counter("ca_commits_total", "Commits made", ["status"])
-start_http_server(9600)
+CAND_CNT = Counter("ca_candidates_total", "Speculative patch candidates", ["result"])
+RUNNING = Gauge("ca_tasks_running", "Tasks admitted and running")
+ADMIT_WAIT = Histogram("ca_admission_wait_seconds", "Time a task waited for CPU/memory headroom")
 
-# Kafka configuration
-KAFKA_CONFIG = {"topics": {"subscribe": [T.TASK]}}
+# Worktrees off the git_cache mirror, reused across tasks
+pool = WorktreePool(remote=REMOTE_REPO)
+# Speculative candidates validate in worktrees of their own: a separate pool, so
+# tasks holding a worktree never wait on each other for a second one
+spec_pool = WorktreePool(size=int(os.getenv("CA_SPEC_WORKTREES", str(CONCURRENCY * CANDIDATES))),
+                         root=workspace.ROOT + "-spec", remote=REMOTE_REPO)
+_lingering: set[asyncio.Task] = set()
+admission = Admission()
+prefetcher = Prefetcher(REMOTE_REPO, CTX_TOKENS, LLM_MODEL)
 
-async def llm_patch(task: CodingTask, ctx_text: str) -> dict:
+async def llm_patch(task: CodingTask, ctx_text: str, temperature: float = 0.1) -> dict:
     """Generate a patch using LLM or mock response"""
     if MOCK_LLM:
         return {
@@ -60,16 +79,17 @@ TASK KIND:
 {task.kind}
 
 CONTEXT (read-only reference):
-{ctx_text[:3000]}
+{truncate(ctx_text, CTX_TOKENS, LLM_MODEL)}
 
 Generate a minimal, focused patch that accomplishes the goal."""
     
     try:
+        import openai  # only the live path needs it; MOCK_LLM workers never pay the import
         # Use new OpenAI API
         client = openai.AsyncOpenAI()
         resp = await client.chat.completions.create(
             model=LLM_MODEL,
-            temperature=0.1,
+            temperature=temperature,
             messages=[
                 {"role": "system", "content": system},
                 {"role": "user", "content": user}
@@ -81,12 +101,31 @@ Generate a minimal, focused patch that accomplishes the goal."""
         log.error(f"LLM call failed: {e}")
         return {"diff": "", "reasoning": f"Error: {str(e)}"}
 
-def apply_patch(repo: Repo, diff: str) -> bool:
-    """Apply a unified diff patch to the repository"""
+def apply_patch(repo: Repo, diff: str, rejects: list | None = None) -> bool:
+    """Apply a unified diff patch to the repository
+
+    Hunks are matched in memory against HEAD, with offset and fuzz, and the
+    working tree is only written if every hunk applies; per-hunk failures go
+    to `rejects`.  `git apply` remains the fallback when there is no git
+    repository to read the base from.
+    """
     try:
         # Validate diff syntax
         PatchSet(diff)
         
+        try:
+            applied = patching.apply(patching.Base(repo.working_dir), diff)
+        except pygit2.GitError:
+            applied = None
+        if applied is not None:
+            if not applied.ok:
+                log.warning(f"Patch rejected: {'; '.join(applied.failures())}")
+                if rejects is not None:
+                    rejects.extend(applied.failures())
+                return False
+            applied.materialize(repo.working_dir)
+            return True
+        
         # Apply the patch
         proc = subprocess.run(
             ["git", "apply", "-"],
@@ -105,202 +144,352 @@ def apply_patch(repo: Repo, diff: str) -> bool:
         log.warning(f"Patch validation failed: {e}")
         return False
 
-def run_selfcheck(repo_dir: str) -> tuple[bool, list]:
-    """Run format/lint/test checks on the code"""
+async def run_selfcheck(repo_dir: str, touched: list[str] | None = None) -> tuple[bool, list]:
+    """Run format/lint/test checks on the code
+
+    With `touched` (the files the patch changed) only those are formatted and
+    linted, and only the tests importing them run; without it, or with
+    CA_SELFCHECK_FULL=1, the whole repository is checked.
+    """
     notes = []
     
-    def _run(cmd):
-        result = subprocess.run(
-            cmd,
-            cwd=repo_dir,
-            capture_output=True,
-            text=True,
-            shell=False
-        )
-        if result.returncode != 0:
-            notes.append(f"{' '.join(cmd)}: {result.stdout}\n{result.stderr}")
-        return result.returncode == 0
+    async def _run(cmd, ok=(0,)):
+        with timing.stage(cmd[0]):
+            proc = await asyncio.create_subprocess_exec(
+                *cmd,
+                cwd=repo_dir,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE
+            )
+            try:
+                out, err = await proc.communicate()
+            except asyncio.CancelledError:
+                # a cancelled candidate must not leave pytest running in a released worktree
+                proc.kill()
+                await proc.wait()
+                raise
+        if proc.returncode not in ok:
+            notes.append(f"{' '.join(cmd)}: {out.decode(errors='replace')}\n{err.decode(errors='replace')}")
+        return proc.returncode in ok
     
-    # Skip checks if files don't exist
-    py_files = list(Path(repo_dir).glob("**/*.py"))
-    if not py_files:
-        return True, []
+    full = touched is None or SELFCHECK_FULL
+    if full:
+        # Skip checks if there is no Python at all
+        if next(iter(Path(repo_dir).glob("**/*.py")), None) is None:
+            return True, []
+        targets = ["."]
+    else:
+        targets = [p for p in touched if p.endswith(".py") and Path(repo_dir, p).exists()]
     
     # Run checks (fail fast)
     checks_pass = True
     
     # Black formatting check
-    if shutil.which("black"):
-        checks_pass = _run(["black", "--check", "."])
+    if targets and shutil.which("black"):
+        checks_pass = await _run(["black", "--check", *targets])
     
     # Ruff linting
-    if checks_pass and shutil.which("ruff"):
-        checks_pass = _run(["ruff", "check", "."])
+    if checks_pass and targets and shutil.which("ruff"):
+        checks_pass = await _run(["ruff", "check", *targets])
     
     # Fast tests (if available)
     if checks_pass and Path(repo_dir, "pytest.ini").exists():
-        checks_pass = _run(["pytest", "-q", "-m", "fast", "--tb=short"])
+        cmd = ["pytest", "-q", "-m", "fast", "--tb=short"]
+        if full or selfcheck.needs_full_suite(touched):
+            checks_pass = await _run(cmd)
+        else:
+            with timing.stage("import_graph"):
+                graph = await asyncio.to_thread(selfcheck.graph_for, repo_dir, touched)
+            tests = [t for t in graph.tests_for(touched) if Path(repo_dir, t).exists()]
+            if tests:
+                log.info(f"Self-check: {len(tests)} test files for {len(touched)} touched")
+                checks_pass = await _run(cmd + tests, ok=(0, 5))   # 5: none of them marked fast
     
     return checks_pass, notes
 
-async def process_task(task: CodingTask):
-    """Process a single coding task"""
-    workdir = Path(tempfile.mkdtemp())
-    log.info(f"Processing task {task.id} in {workdir}")
+def task_branch(task: CodingTask) -> str:
+    return task.path.split("/")[0] if task.path and "/" in task.path else "main"
+
+def task_ref(task: CodingTask) -> str:
+    """What the task starts from: its predecessor's commit if it has one, else its branch"""
+    return task.base_commit_sha or task_branch(task)
+
+async def process_task(task: CodingTask, correlation_id: str = "", waited: float = 0.0):
+    """Process a single coding task; `waited` is the time it spent waiting for admission"""
+    with timing.task(task.id, task.complexity) as timer:
+        if waited:
+            timing.record("admission", waited)
+        result = await _process(task, correlation_id)
+        # where the time went, e.g. "timing: total=41.20s worktree=0.08s context=0.00s llm=12.31s ..."
+        result.notes.append(timer.summary())
     
+    await producer.send(T.CRES, result)
+    COMMIT_CNT.labels(result.status.lower()).inc()
+
+async def _process(task: CodingTask, correlation_id: str) -> CommitResult:
+    repo_branch = task_branch(task)
+    # Context is hydrated while the worktree is set up (already started if prefetched)
+    ctx = prefetcher.start(task, task_ref(task))
     try:
-        # Clone repository using git cache if available
-        repo_branch = task.path.split("/")[0] if task.path and "/" in task.path else "main"
-        
-        # Check for git cache reference
-        cache_ref = os.getenv("GIT_CACHE_REF")
-        if cache_ref and Path(cache_ref).exists():
-            log.info(f"Using git cache reference: {cache_ref}")
-            # Clone with reference to cache
-            clone_cmd = [
-                "git", "clone",
-                "--reference-if-able", cache_ref,
-                "--depth", "1",
-                "--branch", repo_branch,
-                REMOTE_REPO,
-                str(workdir)
-            ]
-            subprocess.run(clone_cmd, check=True)
-            repo = Repo(workdir)
-        else:
-            # Fallback to regular clone
-            repo = Repo.clone_from(
-                REMOTE_REPO,
-                workdir,
-                depth=1,
-                branch=repo_branch
-            )
-        
-        # Get RAG context if blob_ids provided
-        ctx_text = ""
-        if task.blob_ids:
-            snippets = []
-            async for result in rag_client.snippet_stream(task.blob_ids):
-                snippets.append(result.snippet)
-            ctx_text = "\n\n".join(snippets)
-        
-        # Try to generate and apply patch
-        notes = []  # Initialize notes list
-        for attempt in range(MAX_RETRIES + 1):
-            patch_json = await llm_patch(task, ctx_text)
-            
-            if not patch_json.get("diff"):
-                log.warning(f"Empty diff generated for task {task.id}")
-                continue
-            
-            if not apply_patch(repo, patch_json["diff"]):
-                PATCH_GEN.labels("invalid").inc()
-                continue
-            
-            # Run self-checks
-            ok, notes = run_selfcheck(str(workdir))
-            
-            if ok:
-                PATCH_GEN.labels("success").inc()
-                
-                # Create branch and commit
-                branch_name = f"agt/{task.id}"
-                repo.git.checkout("-b", branch_name)
-                repo.git.add(all=True)
-                
-                commit_msg = f"{task.kind.lower()}: {task.goal}\n\n[agent:{task.id}]"
-                repo.git.commit("-m", commit_msg)
-                
-                # Push to remote
-                try:
-                    repo.git.push("origin", branch_name)
-                except GitCommandError as e:
-                    log.error(f"Push failed: {e}")
-                    notes.append(f"Push failed: {str(e)}")
-                    ok = False
-                
-                if ok:
-                    commit_sha = repo.head.commit.hexsha
-                    
-                    # Claim SRM leases if any
-                    if hasattr(task, 'reserved_lease_ids'):
-                        for lease_id in task.reserved_lease_ids:
-                            try:
-                                await srm_client.claim(
-                                    lease_id=int(lease_id),
-                                    commit_sha=commit_sha
-                                )
-                            except Exception as e:
-                                log.warning(f"SRM claim failed for lease {lease_id}: {e}")
-                    
-                    # Emit success result
-                    result = CommitResult(
-                        task_id=task.id,
-                        commit_sha=commit_sha,
-                        status="SUCCESS",
-                        branch_name=branch_name,
-                        notes=[]
-                    )
-                    
-                    await producer.send(T.CRES, result)
-                    COMMIT_CNT.labels("success").inc()
-                    return
-            else:
-                PATCH_GEN.labels("fail").inc()
-                
-                # Add failure notes to context for retry
-                if attempt < MAX_RETRIES:
-                    ctx_text += "\n\n# SELF-CHECK FAILURES\n" + "\n".join(notes)
-                    notes = []  # Clear for next attempt
-        
-        # All attempts failed - emit soft fail
-        result = CommitResult(
-            task_id=task.id,
-            commit_sha="",
-            status="SOFT_FAIL",
-            branch_name="",
-            notes=notes
-        )
-        
-        await producer.send(T.CRES, result)
-        COMMIT_CNT.labels("soft_fail").inc()
-        
+        if CANDIDATES > 1:
+            with timing.stage("context"):
+                ctx_text = await ctx
+            return await _speculate(task, repo_branch, ctx_text, correlation_id)
+        # Lease a clean worktree; bounded by the pool size
+        t0 = time.perf_counter()
+        async with pool.lease(repo_branch, task.base_commit_sha or None) as workdir:
+            timing.record("worktree", time.perf_counter() - t0)
+            log.info(f"Processing task {task.id} in {workdir}")
+            with timing.stage("context"):
+                ctx_text = await ctx
+            return await _run_task(task, Repo(workdir), workdir, ctx_text, correlation_id)
     except Exception as e:
         log.error(f"Task {task.id} hard failed: {e}", exc_info=True)
         
-        # Emit hard fail
-        result = CommitResult(
+        # Hard fail
+        return CommitResult(
             task_id=task.id,
             commit_sha="",
             status="HARD_FAIL",
             branch_name="",
-            notes=[str(e)]
+            notes=[str(e)],
+            correlation_id=correlation_id
         )
+    finally:
+        prefetcher.done(task.id)
+
+async def _commit(task: CodingTask, repo: Repo, correlation_id: str, notes: list) -> CommitResult | None:
+    """Branch, commit and push the worktree; None (with a note) if the push failed"""
+    branch_name = f"agt/{task.id}"
+    with timing.stage("commit"):
+        await asyncio.to_thread(repo.git.checkout, "-B", branch_name)
+        await asyncio.to_thread(repo.git.add, all=True)
         
-        await producer.send(T.CRES, result)
-        COMMIT_CNT.labels("hard_fail").inc()
+        commit_msg = f"{task.kind.lower()}: {task.goal}\n\n[agent:{task.id}]"
+        await asyncio.to_thread(repo.git.commit, "-m", commit_msg)
+    
+    # Push to remote
+    try:
+        with timing.stage("push"):
+            await asyncio.to_thread(repo.git.push, "origin", branch_name)
+    except GitCommandError as e:
+        log.error(f"Push failed: {e}")
+        notes.append(f"Push failed: {str(e)}")
+        return None
+    
+    commit_sha = repo.head.commit.hexsha
+    
+    # Claim SRM leases if any
+    if hasattr(task, 'reserved_lease_ids') and task.reserved_lease_ids:
+        with timing.stage("srm_claim"):
+            for lease_id in task.reserved_lease_ids:
+                try:
+                    await srm_client.claim(
+                        lease_id=int(lease_id),
+                        commit_sha=commit_sha
+                    )
+                except Exception as e:
+                    log.warning(f"SRM claim failed for lease {lease_id}: {e}")
+    
+    return CommitResult(
+        task_id=task.id,
+        commit_sha=commit_sha,
+        status="SUCCESS",
+        branch_name=branch_name,
+        notes=[],
+        correlation_id=correlation_id
+    )
+
+async def _run_task(task: CodingTask, repo: Repo, workdir: str, ctx_text: str, correlation_id: str) -> CommitResult:
+    """Generate, check and commit patches one attempt at a time in a leased worktree"""
+    notes = []  # Initialize notes list
+    for attempt in range(MAX_RETRIES + 1):
+        with timing.stage("llm"):
+            patch_json = await llm_patch(task, ctx_text)
         
-    finally:
-        # Cleanup
-        if workdir.exists():
-            shutil.rmtree(workdir)
+        if not patch_json.get("diff"):
+            log.warning(f"Empty diff generated for task {task.id}")
+            continue
+        
+        rejects = []
+        with timing.stage("apply"):
+            applied = await asyncio.to_thread(apply_patch, repo, patch_json["diff"], rejects)
+        if not applied:
+            PATCH_GEN.labels("invalid").inc()
+            if rejects and attempt < MAX_RETRIES:
+                ctx_text += "\n\n# PATCH REJECTED\n" + "\n".join(rejects)
+            continue
+        
+        # Run self-checks on what the patch touched
+        ok, notes = await run_selfcheck(str(workdir), selfcheck.touched_files(patch_json["diff"]))
+        
+        if ok:
+            PATCH_GEN.labels("success").inc()
+            result = await _commit(task, repo, correlation_id, notes)
+            if result is not None:
+                return result
+        else:
+            PATCH_GEN.labels("fail").inc()
+            
+            # Add failure notes to context for retry
+            if attempt < MAX_RETRIES:
+                ctx_text += "\n\n# SELF-CHECK FAILURES\n" + "\n".join(notes)
+                notes = []  # Clear for next attempt
+                # the next patch is made against HEAD, not on top of this one
+                with timing.stage("reset"):
+                    await asyncio.to_thread(repo.git.checkout, "-f", "HEAD")
+                    await asyncio.to_thread(repo.git.clean, "-fdq")
+    
+    # All attempts failed - soft fail
+    return CommitResult(
+        task_id=task.id,
+        commit_sha="",
+        status="SOFT_FAIL",
+        branch_name="",
+        notes=notes,
+        correlation_id=correlation_id
+    )
+
+async def _validate(repo: Repo, workdir: str, diff: str, applied: "patching.Applied | None" = None) -> tuple[bool, list]:
+    """Apply (or write out an already applied) diff and self-check it"""
+    rejects = []
+    with timing.stage("apply"):
+        if applied is not None:
+            await _in_thread(applied.materialize, workdir)
+        else:
+            applied = await _in_thread(apply_patch, repo, diff, rejects)
+    if not applied:
+        PATCH_GEN.labels("invalid").inc()
+        return False, [f"patch rejected: {r}" for r in rejects]
+    ok, notes = await run_selfcheck(workdir, selfcheck.touched_files(diff))
+    PATCH_GEN.labels("success" if ok else "fail").inc()
+    return ok, notes
+
+async def _in_thread(fn, *args):
+    """Run blocking work in a thread. On cancellation the work still finishes
+    before the caller unwinds, so a worktree is never released while in use."""
+    job = asyncio.ensure_future(asyncio.to_thread(fn, *args))
+    try:
+        return await asyncio.shield(job)
+    except asyncio.CancelledError:
+        await asyncio.wait([job])
+        raise
+
+async def _candidate(task: CodingTask, branch: str, base: tuple, ctx_text: str, temperature: float,
+                     seen: set, won: list, correlation_id: str) -> tuple[CommitResult | None, list]:
+    """One speculative attempt; applied in memory against the shared `base` (sha, patching.Base),
+    and only a diff that applies gets a worktree, where it is checked and committed if no
+    other candidate has been"""
+    with timing.stage("llm", temperature=temperature):
+        patch_json = await llm_patch(task, ctx_text, temperature)
+    diff = patch_json.get("diff")
+    if not diff or diff in seen:
+        CAND_CNT.labels("duplicate" if diff else "empty").inc()
+        return None, []
+    seen.add(diff)
+    sha, shared = base
+    applied = None
+    if shared is not None:
+        with timing.stage("apply"):
+            applied = await _in_thread(patching.apply, shared, diff)
+        if not applied.ok:
+            PATCH_GEN.labels("invalid").inc()
+            CAND_CNT.labels("failed").inc()
+            return None, [f"patch rejected: {r}" for r in applied.failures()]
+    t0 = time.perf_counter()
+    async with spec_pool.lease(branch, sha or task.base_commit_sha or None) as workdir:
+        timing.record("worktree", time.perf_counter() - t0)
+        repo = Repo(workdir)
+        ok, notes = await _validate(repo, workdir, diff, applied)
+        if not ok or won:
+            CAND_CNT.labels("failed" if not ok else "late").inc()
+            return None, notes
+        won.append(temperature)                 # claimed before any await: one commit per round
+        log.info(f"Task {task.id}: candidate at temperature {temperature} passed")
+        result = await _commit(task, repo, correlation_id, notes)
+        CAND_CNT.labels("won" if result is not None else "failed").inc()
+        return result, notes
+
+def _reap(job: asyncio.Task):
+    _lingering.discard(job)
+    if not job.cancelled():
+        job.exception()                         # retrieved: a loser's error is not worth a warning
+
+async def _spec_base(task: CodingTask, branch: str) -> tuple:
+    """Resolve the task's base commit once and read its blobs once for every candidate"""
+    sha = await spec_pool.resolve(branch, task.base_commit_sha or None)
+    return sha, await asyncio.to_thread(patching.Base, str(spec_pool.base), sha)
+
+async def _speculate(task: CodingTask, branch: str, ctx_text: str, correlation_id: str) -> CommitResult:
+    """Race CANDIDATES patches per round; the first to pass its self-check is committed, the rest cancelled"""
+    notes = []
+    base = await _spec_base(task, branch)
+    for attempt in range(MAX_RETRIES + 1):
+        seen, won = set(), []
+        jobs = [asyncio.create_task(_candidate(task, branch, base, ctx_text, TEMPERATURES[i % len(TEMPERATURES)],
+                                               seen, won, correlation_id))
+                for i in range(CANDIDATES)]
+        notes, errors = [], []
+        try:
+            for fut in asyncio.as_completed(jobs):
+                try:
+                    result, cand_notes = await fut
+                except Exception as e:          # one candidate's LLM or apply error must not sink the others
+                    log.warning(f"Task {task.id}: candidate raised: {e}")
+                    CAND_CNT.labels("error").inc()
+                    errors.append(e)
+                    notes.append(f"candidate error: {e}")
+                    continue
+                if result is not None:
+                    return result
+                notes += cand_notes
+        finally:
+            for job in jobs:
+                if not job.done():
+                    job.cancel()
+                    CAND_CNT.labels("cancelled").inc()
+                _lingering.add(job)             # losers unwind (and free their worktrees) in the background
+                job.add_done_callback(_reap)
+        if len(errors) == len(jobs):
+            raise errors[-1]                    # every candidate broke: nothing to retry with
+        if attempt < MAX_RETRIES and notes:
+            ctx_text += "\n\n# FAILURES OF PREVIOUS CANDIDATES\n" + "\n".join(notes)
+    
+    # No candidate passed in any round - soft fail
+    return CommitResult(
+        task_id=task.id,
+        commit_sha="",
+        status="SOFT_FAIL",
+        branch_name="",
+        notes=notes,
+        correlation_id=correlation_id
+    )
 
 async def main_loop():
     """Main event loop"""
+    start_http_server(9600)
     log.info("Coding-Agent started")
     
-    async with consumer.configure(KAFKA_CONFIG) as c:
-        async for topic, msg in c:
-            if topic == T.TASK:
-                bundle = TaskBundle()
-                bundle.ParseFromString(msg)
-                
-                log.info(f"Received TaskBundle for plan {bundle.plan_id} with {len(bundle.tasks)} tasks")
-                
-                # Process tasks concurrently
-                await asyncio.gather(*[
-                    process_task(task) for task in bundle.tasks
-                ], return_exceptions=True)
+    async def handle(topic, task: CodingTask):
+        log.info(f"Received task {task.id} (step {task.step_number}) for plan {task.parent_plan_id}")
+        prefetcher.start(task, task_ref(task))      # hydrate while waiting for admission
+        t0 = time.monotonic()
+        async with admission.slot():
+            waited = time.monotonic() - t0
+            ADMIT_WAIT.observe(waited)
+            RUNNING.inc()
+            try:
+                await process_task(task, task.correlation_id, waited)
+            finally:
+                RUNNING.dec()
+    
+    # The orchestrator only releases a task once the steps it depends on have
+    # committed, and hands it their commit as base_commit_sha, so every record
+    # here is independent of the others in flight.
+    # At most CONCURRENCY run at once, fewer while the pod is short of CPU or
+    # memory; waiting tasks hold their slot, so busy partitions get paused.
+    await serve(GROUP, [T.CTASK], handle,
+                concurrency=CONCURRENCY, key=lambda t, task: task.id)
 
 if __name__ == "__main__":
     asyncio.run(main_loop())
\ No newline at end of file
@@ -0,0 +1,186 @@
+"""In-memory patch application.
+
+Diffs are applied to the base blobs read from HEAD with pygit2, never to the
+working tree, so a rejected candidate costs no filesystem round trip and
+several candidates can be tried against the same base.  Only the winner is
+written out (`Applied.materialize`).  Candidates share one `Base`, so each
+blob is read once however many diffs touch it, and may apply against it
+from several threads at once.
+
+libgit2's own apply is all-or-nothing and exact, so hunks are matched here:
+each is looked for at its stated line, then at growing offsets up to
+CA_PATCH_OFFSET lines away, then with up to CA_PATCH_FUZZ context lines
+dropped from each end, and finally ignoring trailing whitespace.  Every hunk
+reports where it landed or why it failed, which is what the LLM is told on
+a retry.
+"""
+from __future__ import annotations
+import os, threading
+from dataclasses import dataclass, field
+from pathlib import Path
+import pygit2
+from unidiff import PatchSet, UnidiffParseError
+
+MAX_OFFSET = int(os.getenv("CA_PATCH_OFFSET", "200"))   # lines a hunk may drift
+MAX_FUZZ = int(os.getenv("CA_PATCH_FUZZ", "2"))         # context lines that may be ignored per end
+
+@dataclass
+class HunkResult:
+    path: str
+    hunk: int
+    ok: bool
+    offset: int = 0
+    fuzz: int = 0
+    reason: str = ""
+
+    def __str__(self):
+        if not self.ok:
+            return f"{self.path} hunk #{self.hunk}: FAILED ({self.reason})"
+        extra = "".join([f" offset {self.offset:+d}" if self.offset else "", f" fuzz {self.fuzz}" if self.fuzz else ""])
+        return f"{self.path} hunk #{self.hunk}: applied{extra}"
+
+@dataclass
+class Applied:
+    diff: str
+    files: dict[str, bytes|None] = field(default_factory=dict)   # path -> new content, None = deleted
+    hunks: list[HunkResult] = field(default_factory=list)
+    error: str = ""
+
+    @property
+    def ok(self) -> bool:
+        return not self.error and bool(self.files) and all(h.ok for h in self.hunks)
+
+    def failures(self) -> list[str]:
+        return [self.error] if self.error else [str(h) for h in self.hunks if not h.ok]
+
+    def materialize(self, root:str):
+        """Write the patched files into the working tree at `root`."""
+        for path, data in self.files.items():
+            p = Path(root, path)
+            if data is None:
+                p.unlink(missing_ok=True)
+            else:
+                p.parent.mkdir(parents=True, exist_ok=True)
+                p.write_bytes(data)
+
+class Base:
+    """Blobs at a commit, read once and shared by every candidate."""
+    def __init__(self, repo_dir:str, rev:str="HEAD"):
+        self.repo = pygit2.Repository(repo_dir)
+        self.tree = self.repo.revparse_single(rev).peel(pygit2.Tree)
+        self._blobs: dict[str, bytes|None] = {}
+        self._lock = threading.Lock()            # one pygit2 repository, many candidate threads
+
+    def read(self, path:str) -> bytes|None:
+        with self._lock:
+            if path not in self._blobs:
+                try:
+                    self._blobs[path] = self.tree[path].data
+                except KeyError:
+                    self._blobs[path] = None
+            return self._blobs[path]
+
+def _find(lines:list[str], want:list[str], start:int, lo:int, key) -> tuple[int, int]|None:
+    """Nearest index >= lo where `want` matches, searching outwards from `start`."""
+    want = [key(w) for w in want]
+    n = len(want)
+    for d in range(MAX_OFFSET + 1):
+        for i in ((start,) if d == 0 else (start - d, start + d)):
+            if lo <= i <= len(lines) - n and [key(x) for x in lines[i:i + n]] == want:
+                return i, i - start
+    return None
+
+def _exact(s:str) -> str:
+    return s.rstrip("\r\n")
+
+def _loose(s:str) -> str:
+    return s.rstrip()
+
+def _patch_file(pf, old:str, path:str, results:list[HunkResult]) -> str:
+    lines = old.splitlines(keepends=True)
+    eol = "\r\n" if lines and lines[0].endswith("\r\n") else "\n"
+    out, pos = [], 0                                  # pos: next unconsumed line of `lines`
+    for n, h in enumerate(pf, 1):
+        old_side = [l for l in h if l.is_context or l.is_removed]
+        src, kinds = [l.value for l in old_side], [l.line_type for l in old_side]
+        hit = None
+        for key in (_exact, _loose):
+            for fuzz in range(min(MAX_FUZZ, len(src) // 2) + 1):
+                # drop up to `fuzz` context lines from each end, never a removed line
+                head = next((i for i in range(fuzz) if kinds[i] != " "), fuzz)
+                tail = next((i for i in range(fuzz) if kinds[len(kinds) - 1 - i] != " "), fuzz)
+                want = src[head:len(src) - tail]
+                start = max(h.source_start - 1, 0) + head if src else h.source_start
+                hit = _find(lines, want, start, pos, key) if want else (min(max(start, pos), len(lines)), 0)
+                if hit:
+                    break
+            if hit:
+                break
+        if not hit:
+            results.append(HunkResult(path, n, False, reason=f"context at line {h.source_start} not found"))
+            continue
+        at, offset = hit
+        at -= head                                     # back to the hunk's first line
+        # dropped leading context that would sit before the file start or
+        # inside the previous hunk has no line of its own: skip it
+        skip = max(pos - at, 0)
+        at += skip
+        out += lines[pos:at]
+        body, i, added = [], at, False
+        for l in h:
+            if skip and l.is_context:
+                skip -= 1
+                continue
+            if l.is_added:
+                body.append(l.value.rstrip("\r\n") + eol)
+                added = True
+            elif l.is_removed:
+                i += 1
+                added = False
+            elif l.is_context:                         # keep the file's own line
+                if i < len(lines):
+                    body.append(lines[i])
+                i += 1
+                added = False
+            elif added:                                # "\ No newline at end of file"
+                body[-1] = body[-1].rstrip("\r\n")
+        out += body
+        pos = min(i, len(lines))
+        results.append(HunkResult(path, n, True, offset=offset, fuzz=max(head, tail)))
+    out += lines[pos:]
+    # a line that lost its newline (end of file) may no longer be last
+    return "".join(l if l.endswith("\n") else l + eol for l in out[:-1]) + "".join(out[-1:])
+
+def apply(base:Base, diff:str) -> Applied:
+    """Apply `diff` to the base blobs in memory, reporting each hunk."""
+    res = Applied(diff)
+    try:
+        patch = PatchSet(diff)
+    except UnidiffParseError as e:
+        res.error = f"unparseable diff: {e}"
+        return res
+    for pf in patch:
+        path = pf.path
+        data = res.files[path] if path in res.files else base.read(path)
+        # only /dev/null makes an add or a delete; unidiff also guesses one from
+        # a lone `@@ -0,0` or `+0,0` hunk, which on an existing file is an edit
+        if pf.target_file == "/dev/null":
+            if data is None:
+                res.error = f"{path}: cannot delete, not in the base"
+                return res
+            res.files[path] = None
+            continue
+        if pf.source_file == "/dev/null":
+            if data is not None:
+                res.error = f"{path}: cannot add, already in the base"
+                return res
+            old = ""
+        else:
+            if data is None:
+                res.hunks.append(HunkResult(path, 0, False, reason="file not in the base"))
+                continue
+            old = data.decode("utf-8", "surrogateescape")
+        new = _patch_file(pf, old, path, res.hunks)
+        res.files[path] = new.encode("utf-8", "surrogateescape")
+    return res
+
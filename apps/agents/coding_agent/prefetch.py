@@ -0,0 +1,93 @@
+"""Context prefetch for coding tasks.
+
+Hydration starts when a task record arrives, so RAG snippets and the
+target file (via git_adapter) are fetched while the task waits for
+admission and its worktree instead of after them.  Fetches are shared: a
+snippet or file wanted by several tasks is requested once, whether the
+first request is still in flight or already done, and finished results
+stay in a bounded cache for the tasks that follow.  A file read at a branch
+name is only shared while in flight, since the branch may move; one read at
+a commit sha is cached like a snippet.  A fetch that fails is left out of
+the context rather than failing the task, and is not cached.
+"""
+from __future__ import annotations
+import asyncio, logging, os, re
+from collections import OrderedDict
+from clients import rag_client
+from clients.llm_client.tokens import pack, truncate
+
+log = logging.getLogger("coding-agent.prefetch")
+
+CACHE_SIZE = int(os.getenv("CA_PREFETCH_CACHE", "1024"))      # snippets and files kept
+RADIUS = int(os.getenv("CA_SNIPPET_RADIUS", "30"))
+_SHA = re.compile(r"[0-9a-f]{40}")
+
+class Prefetcher:
+    def __init__(self, remote:str, tokens:int, model:str, cache_size:int=CACHE_SIZE):
+        self.remote, self.tokens, self.model = remote, tokens, model
+        self.cache_size = cache_size
+        self._items: OrderedDict[tuple, asyncio.Task] = OrderedDict()
+        self._tasks: dict[str, asyncio.Task] = {}
+        self._loop = None
+
+    @staticmethod
+    async def _run(factory):
+        return await factory()                         # errors raised building the call land in the task too
+
+    def _fetch(self, key:tuple, factory, keep:bool=True) -> asyncio.Task:
+        job = self._items.get(key)
+        if job is not None:
+            self._items.move_to_end(key)
+            return job
+        job = self._items[key] = asyncio.ensure_future(self._run(factory))
+        job.add_done_callback(lambda j: self._forget_failed(key, j, keep))
+        while len(self._items) > self.cache_size:
+            old_key, old = next(iter(self._items.items()))
+            if not old.done():
+                break                                  # never evict what someone may be awaiting
+            del self._items[old_key]
+        return job
+
+    def _forget_failed(self, key:tuple, job:asyncio.Task, keep:bool=True):
+        failed = job.cancelled() or job.exception() is not None
+        if (failed or not keep) and self._items.get(key) is job:
+            del self._items[key]                      # the next task asks again
+
+    def _file(self, ref:str, path:str) -> asyncio.Task:
+        def read():
+            from clients import git_client      # aiohttp: paid on first use, not at worker start
+            return git_client.read_file(self.remote, ref, path)
+        return self._fetch(("file", ref, path), read, keep=bool(_SHA.fullmatch(ref)))
+
+    def _snippet(self, blob_id:str) -> asyncio.Task:
+        return self._fetch(("snippet", blob_id), lambda: rag_client.snippet(blob_id, radius=RADIUS))
+
+    async def _hydrate(self, task, ref:str) -> str:
+        jobs = [self._snippet(b) for b in task.blob_ids]
+        if task.path:
+            jobs.insert(0, self._file(ref, task.path))
+        parts = []
+        for res in await asyncio.gather(*(asyncio.shield(j) for j in jobs), return_exceptions=True):
+            if isinstance(res, BaseException):
+                log.warning(f"Task {task.id}: context fetch failed: {res}")
+            elif isinstance(res, bytes):                 # the target file: at most half the budget
+                text = truncate(res.decode(errors="replace"), self.tokens // 2, self.model)
+                parts.append(f"# {task.path} (current)\n{text}")
+            elif res:
+                parts.append(res)
+        return "\n\n".join(pack(parts, self.tokens, self.model))
+
+    def start(self, task, ref:str) -> asyncio.Task:
+        """Begin hydrating `task` (idempotent); await the result for its context text."""
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:                    # fetches are tasks of one event loop
+            self._loop, self._items, self._tasks = loop, OrderedDict(), {}
+        job = self._tasks.get(task.id)
+        if job is None:
+            job = self._tasks[task.id] = asyncio.ensure_future(self._hydrate(task, ref))
+        return job
+
+    def done(self, task_id:str):
+        job = self._tasks.pop(task_id, None)
+        if job is not None and not job.done():
+            job.cancel()
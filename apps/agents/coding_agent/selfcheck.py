@@ -0,0 +1,129 @@
+"""Change-aware self-check: what a patch touched and which tests can see it.
+
+Touched files come from the patch itself.  Tests are selected through the
+repository's import graph: a test runs if it is touched or imports, directly
+or transitively, a touched module.  The graph is parsed once per base commit
+and cached, since every task leased at that commit shares it; touched files
+are parsed as they are at the base commit, so a patch never leaks its edits
+into the cached graph.  Changes the graph cannot see (conftest.py, config
+files) select the whole suite.
+"""
+from __future__ import annotations
+import ast, subprocess
+from collections import deque
+from pathlib import Path
+from unidiff import PatchSet, UnidiffParseError
+
+_DOCS = {".md", ".rst", ".txt"}          # touched alone, these need no tests
+_SKIP_DIRS = {".git", ".venv", "venv", "node_modules", "__pycache__", "build", "dist"}
+_CACHE_MAX = 8
+
+def touched_files(diff:str) -> list[str]|None:
+    """Paths a unified diff adds, modifies or removes; None if it cannot be parsed."""
+    try:
+        return [f.path for f in PatchSet(diff, metadata_only=True)]
+    except UnidiffParseError:
+        return None
+
+def is_test(path:str) -> bool:
+    name = Path(path).name
+    return name.endswith(".py") and (name.startswith("test_") or name.endswith("_test.py"))
+
+def module_name(path:str) -> str:
+    parts = list(Path(path).with_suffix("").parts)
+    if parts and parts[0] == "src":
+        parts = parts[1:]
+    if parts and parts[-1] == "__init__":
+        parts = parts[:-1]
+    return ".".join(parts)
+
+def _imports(src:str, mod:str, is_pkg:bool) -> set[str]:
+    try:
+        tree = ast.parse(src)
+    except (SyntaxError, ValueError):
+        return set()
+    pkg = mod.split(".") if is_pkg else mod.split(".")[:-1]
+    out = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            out.update(a.name for a in node.names)
+        elif isinstance(node, ast.ImportFrom):
+            base = node.module or ""
+            if node.level:
+                anchor = pkg[:len(pkg) - node.level + 1]
+                base = ".".join(anchor + ([base] if base else []))
+            if base:
+                out.add(base)
+                out.update(f"{base}.{a.name}" for a in node.names)    # `from pkg import mod`
+    # importing a.b.c runs a/__init__ and a/b/__init__ too
+    return {".".join(m.split(".")[:i]) for m in out for i in range(1, m.count(".") + 2)}
+
+class ImportGraph:
+    def __init__(self):
+        self.files: dict[str, str] = {}                  # module -> path
+        self.importers: dict[str, set[str]] = {}         # module -> modules importing it
+
+    @classmethod
+    def build(cls, root:str, base_src:dict[str, str|None]|None=None) -> "ImportGraph":
+        """Parse every .py under `root`; `base_src` overrides file contents by path (None: skip)."""
+        g, base_src = cls(), base_src or {}
+        paths = {p.relative_to(root).as_posix() for p in Path(root).rglob("*.py")
+                 if not _SKIP_DIRS.intersection(p.relative_to(root).parts[:-1])}
+        for rel in paths | base_src.keys():             # removed files still count at the base
+            if rel in base_src:
+                src = base_src[rel]
+                if src is None:                          # added by the patch
+                    continue
+            else:
+                try:
+                    src = Path(root, rel).read_text(errors="replace")
+                except OSError:
+                    continue
+            mod = module_name(rel)
+            g.files[mod] = rel
+            for dep in _imports(src, mod, rel.endswith("__init__.py")):
+                g.importers.setdefault(dep, set()).add(mod)
+        return g
+
+    def tests_for(self, paths:list[str]) -> list[str]:
+        """Test files that are, or transitively import, one of `paths`."""
+        seen = {module_name(p) for p in paths if p.endswith(".py")}
+        todo = deque(seen)
+        while todo:
+            for m in self.importers.get(todo.popleft(), ()):
+                if m not in seen:
+                    seen.add(m)
+                    todo.append(m)
+        tests = {self.files[m] for m in seen if m in self.files and is_test(self.files[m])}
+        tests.update(p for p in paths if is_test(p))
+        return sorted(tests)
+
+def needs_full_suite(paths:list[str]) -> bool:
+    """Touched files whose effect on tests the import graph cannot trace."""
+    for p in paths:
+        path = Path(p)
+        if path.name == "conftest.py" or (path.suffix != ".py" and path.suffix not in _DOCS):
+            return True
+    return False
+
+_graphs: dict[str, ImportGraph] = {}
+
+def _git(repo_dir:str, *args) -> subprocess.CompletedProcess:
+    return subprocess.run(["git", *args], cwd=repo_dir, capture_output=True, text=True)
+
+def graph_for(repo_dir:str, touched:list[str]) -> ImportGraph:
+    """The import graph at the worktree's base commit, cached by commit sha."""
+    head = _git(repo_dir, "rev-parse", "HEAD").stdout.strip()
+    if head and head in _graphs:
+        return _graphs[head]
+    base_src = {}
+    for p in touched:                                    # as committed, not as patched
+        if p.endswith(".py"):
+            r = _git(repo_dir, "show", f"HEAD:{p}")
+            base_src[p] = r.stdout if r.returncode == 0 else None
+    g = ImportGraph.build(repo_dir, base_src)
+    if head:
+        if len(_graphs) >= _CACHE_MAX:
+            _graphs.pop(next(iter(_graphs)))
+        _graphs[head] = g
+    return g
@@ -0,0 +1,39 @@
+import asyncio
+import pytest
+
+from apps.agents.coding_agent.admission import Admission
+
+
+def test_blocked_reasons():
+    probe = {"v": (0.5, 4096.0)}
+    a = Admission(max_load=1.0, min_free_mb=512, task_mb=256, probe=lambda: probe["v"])
+    assert a.blocked() is None
+    a.running = 1
+    assert a.blocked() is None
+    probe["v"] = (1.5, 4096.0)
+    assert a.blocked() == "load 1.50/cpu"
+    probe["v"] = (0.5, 700.0)
+    assert a.blocked() == "700 MB free"
+    probe["v"] = (None, None)                   # nothing measurable: admit
+    assert a.blocked() is None
+
+
+@pytest.mark.asyncio
+async def test_waits_for_headroom_but_never_starves():
+    probe = {"v": (3.0, 4096.0)}
+    a = Admission(max_load=1.0, poll=0.01, probe=lambda: probe["v"])
+    order = []
+
+    async def task(name, hold):
+        async with a.slot():
+            order.append(name)
+            await asyncio.sleep(hold)
+
+    first = asyncio.create_task(task("first", 0.2))   # overloaded, but nothing runs yet
+    await asyncio.sleep(0.02)
+    second = asyncio.create_task(task("second", 0))
+    await asyncio.sleep(0.05)
+    assert order == ["first"] and a.running == 1
+    probe["v"] = (0.2, 4096.0)
+    await asyncio.gather(first, second)
+    assert order == ["first", "second"] and a.running == 0
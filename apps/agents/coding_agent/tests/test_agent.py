@@ -4,11 +4,30 @@ os.environ["PROTOCOL_BUFFERS_PYTHON_IMPLEMENTATION"] = "python"
 import asyncio
 import json
 import pytest
+from contextlib import asynccontextmanager
 from unittest.mock import Mock, patch, AsyncMock, MagicMock
 
 from apps.core_contracts_pb2 import CodingTask, CommitResult, TaskBundle
 
 
+@pytest.fixture(autouse=True)
+def no_git_adapter():
+    """Keep the context prefetch off the network"""
+    with patch("clients.git_client.read_file", AsyncMock(return_value=b"")):
+        yield
+
+
+class FakePool:
+    """Stands in for the worktree pool; leases a fixed directory"""
+    def __init__(self):
+        self.leased = []
+
+    @asynccontextmanager
+    async def lease(self, branch="main", base=None):
+        self.leased.append((branch, base))
+        yield "/tmp/test"
+
+
 class TestCodingAgent:
     @pytest.mark.asyncio
     async def test_llm_patch_mock(self):
@@ -63,7 +82,8 @@ class TestCodingAgent:
         result = apply_patch(mock_repo, invalid_diff)
         assert result is False
     
-    def test_run_selfcheck(self):
+    @pytest.mark.asyncio
+    async def test_run_selfcheck(self):
         """Test self-check pipeline"""
         from apps.agents.coding_agent.agent import run_selfcheck
         from pathlib import Path
@@ -74,13 +94,16 @@ class TestCodingAgent:
             with patch("shutil.which") as mock_which:
                 mock_which.return_value = "/usr/bin/black"
                 
-                with patch("subprocess.run") as mock_run:
+                with patch("asyncio.create_subprocess_exec") as mock_exec:
                     # All checks pass
-                    mock_run.return_value.returncode = 0
-                    ok, notes = run_selfcheck("/tmp/test")
+                    proc = mock_exec.return_value
+                    proc.communicate = AsyncMock(return_value=(b"", b""))
+                    proc.returncode = 0
+                    ok, notes = await run_selfcheck("/tmp/test")
                     
                     assert ok is True
                     assert len(notes) == 0
+                    assert mock_exec.call_args_list[0][0] == ("black", "--check", ".")
     
     @pytest.mark.asyncio
     async def test_process_task_success(self):
@@ -95,13 +118,14 @@ class TestCodingAgent:
             path="src/hello.py",
             kind="ADD",
             blob_ids=[],
-            complexity="trivial"
+            complexity="trivial",
+            base_commit_sha="base123"
         )
         
         # Mock all external dependencies
         with patch("apps.agents.coding_agent.agent.Repo") as mock_repo_cls:
             mock_repo = MagicMock()
-            mock_repo_cls.clone_from.return_value = mock_repo
+            mock_repo_cls.return_value = mock_repo
             mock_repo.working_dir = "/tmp/test"
             mock_repo.head.commit.hexsha = "abc123"
             
@@ -121,18 +145,17 @@ class TestCodingAgent:
                             mock_send = AsyncMock()
                             mock_producer.send = mock_send
                             
-                            with patch("tempfile.mkdtemp") as mock_mkdtemp:
-                                mock_mkdtemp.return_value = "/tmp/test"
+                            with patch("apps.agents.coding_agent.agent.pool", FakePool()) as pool:
+                                await process_task(task)
+                                assert pool.leased == [("src", "base123")]   # on top of its predecessor
                                 
-                                with patch("shutil.rmtree"):
-                                    await process_task(task)
-                                    
-                                    # Verify success result was sent
-                                    mock_send.assert_called_once()
-                                    topic, result = mock_send.call_args[0]
-                                    assert topic == "commit.result.out"
-                                    assert result.status == "SUCCESS"
-                                    assert result.task_id == "test-task-1"
+                                # Verify success result was sent
+                                mock_send.assert_called_once()
+                                topic, result = mock_send.call_args[0]
+                                assert topic == "commit.result.out"
+                                assert result.status == "SUCCESS"
+                                assert result.task_id == "test-task-1"
+                                assert result.notes[-1].startswith("timing: total=")
     
     @pytest.mark.asyncio
     async def test_process_task_soft_fail(self):
@@ -148,7 +171,7 @@ class TestCodingAgent:
         
         with patch("apps.agents.coding_agent.agent.Repo") as mock_repo_cls:
             mock_repo = MagicMock()
-            mock_repo_cls.clone_from.return_value = mock_repo
+            mock_repo_cls.return_value = mock_repo
             mock_repo.working_dir = "/tmp/test"
             
             with patch("apps.agents.coding_agent.agent.llm_patch") as mock_llm:
@@ -161,14 +184,119 @@ class TestCodingAgent:
                         mock_send = AsyncMock()
                         mock_producer.send = mock_send
                         
-                        with patch("tempfile.mkdtemp") as mock_mkdtemp:
-                            mock_mkdtemp.return_value = "/tmp/test"
+                        with patch("apps.agents.coding_agent.agent.pool", FakePool()):
+                            await process_task(task)
                             
-                            with patch("shutil.rmtree"):
-                                await process_task(task)
-                                
-                                # Verify soft fail result
-                                mock_send.assert_called_once()
-                                topic, result = mock_send.call_args[0]
-                                assert result.status == "SOFT_FAIL"
-                                assert result.task_id == "test-task-2"
\ No newline at end of file
+                            # Verify soft fail result
+                            mock_send.assert_called_once()
+                            topic, result = mock_send.call_args[0]
+                            assert result.status == "SOFT_FAIL"
+                            assert result.task_id == "test-task-2"
+    
+    @pytest.mark.asyncio
+    async def test_speculative_first_passing_candidate_wins(self):
+        """Candidates race; the first to pass is committed and the slow one cancelled"""
+        from apps.agents.coding_agent import agent
+        
+        task = CodingTask(id="test-task-3", goal="Add function", path="src/test.py", kind="ADD")
+        delays = {0.1: 0.02, 0.4: 0.0, 0.7: 5.0}
+        
+        async def fake_llm(task, ctx_text, temperature=0.1):
+            await asyncio.sleep(delays[temperature])
+            return {"diff": f"diff@{temperature}", "reasoning": ""}
+        
+        async def fake_validate(repo, workdir, diff, applied=None):
+            return diff == "diff@0.1", ["check failed"]
+        
+        committed = CommitResult(task_id=task.id, commit_sha="abc123", status="SUCCESS")
+        with patch.object(agent, "CANDIDATES", 3), \
+             patch.object(agent, "llm_patch", fake_llm), \
+             patch.object(agent, "_validate", fake_validate), \
+             patch.object(agent, "spec_pool", FakePool()), \
+             patch.object(agent, "_spec_base", AsyncMock(return_value=(None, None))), \
+             patch.object(agent, "Repo"), \
+             patch.object(agent, "_commit", AsyncMock(return_value=committed)) as mock_commit, \
+             patch.object(agent, "producer") as mock_producer:
+            mock_producer.send = AsyncMock()
+            t0 = asyncio.get_running_loop().time()
+            await agent.process_task(task)
+            assert asyncio.get_running_loop().time() - t0 < 1
+        
+        mock_commit.assert_awaited_once()
+        topic, result = mock_producer.send.call_args[0]
+        assert result.status == "SUCCESS" and result.commit_sha == "abc123"
+    
+    @pytest.mark.asyncio
+    async def test_speculative_candidates_screened_in_memory(self, tmp_path):
+        """A candidate that does not apply against the shared base never gets a worktree"""
+        import subprocess
+        from apps.agents.coding_agent import agent, patching
+        
+        (tmp_path / "f.py").write_text("a = 1\n")
+        for cmd in (["init", "-q"], ["add", "-A"],
+                    ["-c", "user.email=t@example.com", "-c", "user.name=t", "commit", "-q", "-m", "init"]):
+            subprocess.run(["git", *cmd], cwd=tmp_path, check=True)
+        task = CodingTask(id="test-task-4", goal="Change a", path="f.py", kind="EDIT")
+        diffs = {0.1: "--- a/f.py\n+++ b/f.py\n@@ -1 +1 @@\n-b = 2\n+b = 3\n",
+                 0.4: "--- a/f.py\n+++ b/f.py\n@@ -1 +1 @@\n-a = 1\n+a = 2\n"}
+        
+        async def fake_llm(task, ctx_text, temperature=0.1):
+            return {"diff": diffs[temperature], "reasoning": ""}
+        
+        validated = []
+        async def fake_validate(repo, workdir, diff, applied=None):
+            validated.append(applied.files)
+            return True, []
+        
+        pool = FakePool()
+        base = ("sha1", patching.Base(str(tmp_path)))
+        committed = CommitResult(task_id=task.id, commit_sha="abc123", status="SUCCESS")
+        with patch.object(agent, "CANDIDATES", 2), \
+             patch.object(agent, "llm_patch", fake_llm), \
+             patch.object(agent, "_validate", fake_validate), \
+             patch.object(agent, "spec_pool", pool), \
+             patch.object(agent, "_spec_base", AsyncMock(return_value=base)), \
+             patch.object(agent, "Repo"), \
+             patch.object(agent, "_commit", AsyncMock(return_value=committed)), \
+             patch.object(agent, "producer") as mock_producer:
+            mock_producer.send = AsyncMock()
+            await agent.process_task(task)
+        
+        assert pool.leased == [("main", "sha1")]
+        assert validated == [{"f.py": b"a = 2\n"}]
+        assert mock_producer.send.call_args[0][1].status == "SUCCESS"
+    
+    @pytest.mark.asyncio
+    async def test_speculative_candidate_error_does_not_sink_round(self):
+        """A candidate that raises is noted and skipped; a sibling that passes still commits"""
+        from apps.agents.coding_agent import agent
+        
+        task = CodingTask(id="test-task-5", goal="Add function", path="src/test.py", kind="ADD")
+        broken = set()
+        
+        async def fake_llm(task, ctx_text, temperature=0.1):
+            if temperature in broken:
+                raise RuntimeError("llm down")
+            await asyncio.sleep(0.01)
+            return {"diff": f"diff@{temperature}", "reasoning": ""}
+        
+        async def fake_validate(repo, workdir, diff, applied=None):
+            return True, []
+        
+        committed = CommitResult(task_id=task.id, commit_sha="abc123", status="SUCCESS")
+        with patch.object(agent, "CANDIDATES", 2), \
+             patch.object(agent, "llm_patch", fake_llm), \
+             patch.object(agent, "_validate", fake_validate), \
+             patch.object(agent, "spec_pool", FakePool()), \
+             patch.object(agent, "_spec_base", AsyncMock(return_value=(None, None))), \
+             patch.object(agent, "Repo"), \
+             patch.object(agent, "_commit", AsyncMock(return_value=committed)), \
+             patch.object(agent, "producer") as mock_producer:
+            mock_producer.send = AsyncMock()
+            broken.add(0.1)
+            await agent.process_task(task)
+            assert mock_producer.send.call_args[0][1].status == "SUCCESS"
+            
+            broken.add(0.4)                     # every candidate raises: a hard failure
+            await agent.process_task(task)
+            assert mock_producer.send.call_args[0][1].status == "HARD_FAIL"
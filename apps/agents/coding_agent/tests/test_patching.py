@@ -0,0 +1,89 @@
+import subprocess
+import pytest
+
+from apps.agents.coding_agent import patching
+from apps.agents.coding_agent.patching import Base
+
+
+LINES = "".join(f"line {i}\n" for i in range(1, 21))
+
+
+@pytest.fixture
+def repo(tmp_path):
+    (tmp_path / "f.txt").write_text(LINES)
+    (tmp_path / "crlf.txt").write_bytes(b"a\r\nb\r\nc\r\n")
+    for cmd in (["init", "-q"], ["add", "-A"],
+                ["-c", "user.email=t@example.com", "-c", "user.name=t", "commit", "-q", "-m", "init"]):
+        subprocess.run(["git", *cmd], cwd=tmp_path, check=True)
+    return tmp_path
+
+
+def _diff(hunks, path="f.txt"):
+    return f"--- a/{path}\n+++ b/{path}\n" + hunks
+
+
+def test_exact_and_in_memory_only(repo):
+    d = _diff("@@ -2,3 +2,3 @@\n line 2\n-line 3\n+LINE 3\n line 4\n")
+    res = patching.apply(Base(str(repo)), d)
+    assert res.ok and [(h.offset, h.fuzz) for h in res.hunks] == [(0, 0)]
+    assert (repo / "f.txt").read_text() == LINES          # nothing written yet
+    res.materialize(str(repo))
+    assert (repo / "f.txt").read_text() == LINES.replace("line 3\n", "LINE 3\n")
+
+
+def test_offset_and_fuzz(repo):
+    # stated 5 lines too early, and the trailing context is wrong
+    d = _diff("@@ -5,4 +5,4 @@\n line 9\n line 10\n-line 11\n+LINE 11\n line twelve\n")
+    res = patching.apply(Base(str(repo)), d)
+    assert res.ok
+    h = res.hunks[0]
+    assert h.offset == 4 and h.fuzz == 1
+    assert res.files["f.txt"].decode() == LINES.replace("line 11\n", "LINE 11\n")
+
+
+def test_per_hunk_failure_reported(repo):
+    d = _diff("@@ -1,2 +1,2 @@\n-line 1\n+LINE 1\n line 2\n"
+              "@@ -15,2 +15,2 @@\n-no such line\n+x\n line 16\n")
+    res = patching.apply(Base(str(repo)), d)
+    assert not res.ok
+    assert [h.ok for h in res.hunks] == [True, False]
+    assert res.failures() == ["f.txt hunk #2: FAILED (context at line 15 not found)"]
+
+
+def test_keeps_crlf_and_missing_newline(repo):
+    d = _diff("@@ -2,2 +2,2 @@\n b\n-c\n+C\n\\ No newline at end of file\n", "crlf.txt")
+    res = patching.apply(Base(str(repo)), d)
+    assert res.ok and res.files["crlf.txt"] == b"a\r\nb\r\nC"
+
+
+def test_fuzz_at_file_start_does_not_duplicate(repo):
+    # the leading context line is bogus and the match is at line 1: nothing precedes it
+    d = _diff("@@ -1,3 +1,3 @@\n zzz\n line 1\n-line 2\n+LINE 2\n")
+    res = patching.apply(Base(str(repo)), d)
+    assert res.ok and res.hunks[0].fuzz == 1
+    assert res.files["f.txt"].decode() == LINES.replace("line 2\n", "LINE 2\n")
+
+
+def test_candidates_share_one_base(repo):
+    base = Base(str(repo))
+    bad = _diff("@@ -1,1 +1,1 @@\n-nope\n+x\n")
+    good = _diff("@@ -20,1 +20,2 @@\n line 20\n+line 21\n")
+    new_file = "--- /dev/null\n+++ b/new.py\n@@ -0,0 +1 @@\n+x = 1\n"
+    results = [patching.apply(base, d) for d in (bad, good, new_file)]
+    assert [r.ok for r in results] == [False, True, True]
+    assert results[2].files == {"new.py": b"x = 1\n"}
+    assert list(base._blobs) == ["f.txt", "new.py"]        # f.txt read once for both candidates
+
+
+def test_add_and_delete_only_from_dev_null(repo):
+    base = Base(str(repo))
+    # a lone @@ -0,0 hunk on an existing file inserts, it does not replace the file
+    res = patching.apply(base, _diff("@@ -0,0 +1 @@\n+line 0\n"))
+    assert res.ok and res.files["f.txt"].decode() == "line 0\n" + LINES
+    # emptying a file leaves it in place
+    res = patching.apply(base, _diff("@@ -1,3 +0,0 @@\n-a\n-b\n-c\n", "crlf.txt"))
+    assert res.ok and res.files == {"crlf.txt": b""}
+    added = patching.apply(base, "--- /dev/null\n+++ b/f.txt\n@@ -0,0 +1 @@\n+x = 1\n")
+    assert not added.ok and added.failures() == ["f.txt: cannot add, already in the base"]
+    gone = patching.apply(base, "--- a/f.txt\n+++ /dev/null\n@@ -1,20 +0,0 @@\n" + "".join(f"-{l}\n" for l in LINES.splitlines()))
+    assert gone.ok and gone.files == {"f.txt": None}
@@ -0,0 +1,76 @@
+import asyncio
+import pytest
+from unittest.mock import patch
+
+from apps.core_contracts_pb2 import CodingTask
+from apps.agents.coding_agent.prefetch import Prefetcher
+
+
+class Fetches:
+    def __init__(self, fail=()):
+        self.calls = []
+        self.fail = set(fail)
+
+    async def snippet(self, point_id, radius=30):
+        self.calls.append(("snippet", point_id))
+        await asyncio.sleep(0.01)
+        if point_id in self.fail or point_id == "bad":
+            raise RuntimeError("rag down")
+        return f"snippet {point_id}"
+
+    async def read_file(self, repo_url, ref, path):
+        self.calls.append(("file", ref, path))
+        await asyncio.sleep(0.01)
+        return b"def f():\n    pass\n"
+
+
+@pytest.fixture
+def fetches():
+    f = Fetches(fail={"3"})
+    with patch("clients.rag_client.snippet", f.snippet), patch("clients.git_client.read_file", f.read_file):
+        yield f
+
+
+@pytest.mark.asyncio
+async def test_shared_fetches_are_deduplicated(fetches):
+    p = Prefetcher("repo", tokens=2000, model="gpt-4o-mini")
+    a = CodingTask(id="a", path="src/x.py", blob_ids=["1", "2"])
+    b = CodingTask(id="b", path="src/x.py", blob_ids=["2", "3"])
+    ctx_a, ctx_b = await asyncio.gather(p.start(a, "main"), p.start(b, "main"))
+    assert ctx_a == "# src/x.py (current)\ndef f():\n    pass\n\n\nsnippet 1\n\nsnippet 2"
+    assert ctx_b.endswith("snippet 2")                  # the failed snippet is left out
+    assert sorted(fetches.calls) == [("file", "main", "src/x.py"), ("snippet", "1"), ("snippet", "2"), ("snippet", "3")]
+    # cached for later tasks, except the failure, which is retried
+    await p.start(CodingTask(id="c", blob_ids=["1", "3"]), "main")
+    assert fetches.calls.count(("snippet", "1")) == 1 and fetches.calls.count(("snippet", "3")) == 2
+
+
+@pytest.mark.asyncio
+async def test_done_task_does_not_cancel_shared_fetch(fetches):
+    p = Prefetcher("repo", tokens=2000, model="gpt-4o-mini")
+    a = CodingTask(id="a", blob_ids=["1"])
+    p.start(a, "main")
+    b = p.start(CodingTask(id="b", blob_ids=["1"]), "main")
+    await asyncio.sleep(0)
+    p.done("a")
+    assert await b == "snippet 1"
+    assert p.start(a, "main") is not b and fetches.calls == [("snippet", "1")]
+
+
+@pytest.mark.asyncio
+async def test_non_numeric_ids_and_failures_are_skipped(fetches):
+    p = Prefetcher("repo", tokens=2000, model="gpt-4o-mini")
+    ctx = await p.start(CodingTask(id="a", blob_ids=["blob1", "bad"]), "main")
+    assert ctx == "snippet blob1"
+    assert fetches.calls == [("snippet", "blob1"), ("snippet", "bad")]
+
+
+@pytest.mark.asyncio
+async def test_branch_reads_are_not_cached(fetches):
+    p = Prefetcher("repo", tokens=2000, model="gpt-4o-mini")
+    sha = "a" * 40
+    for tid in ("a", "b"):
+        await p.start(CodingTask(id=tid, path="src/x.py"), "main")
+        await p.start(CodingTask(id=tid + "@sha", path="src/x.py"), sha)
+    assert fetches.calls.count(("file", "main", "src/x.py")) == 2   # the branch may have moved
+    assert fetches.calls.count(("file", sha, "src/x.py")) == 1
@@ -0,0 +1,68 @@
+import pytest
+from unittest.mock import AsyncMock, patch
+
+from apps.agents.coding_agent import selfcheck
+from apps.agents.coding_agent.selfcheck import ImportGraph
+
+
+def _tree(root, files):
+    for path, src in files.items():
+        p = root / path
+        p.parent.mkdir(parents=True, exist_ok=True)
+        p.write_text(src)
+
+
+def test_tests_selected_through_imports(tmp_path):
+    _tree(tmp_path, {
+        "pkg/__init__.py": "",
+        "pkg/core.py": "",
+        "pkg/util.py": "from . import core\n",
+        "pkg/other.py": "",
+        "tests/test_util.py": "from pkg.util import thing\n",
+        "tests/test_other.py": "import pkg.other\n",
+        "tests/test_core_direct.py": "from pkg import core\n",
+    })
+    g = ImportGraph.build(str(tmp_path))
+    assert g.tests_for(["pkg/core.py"]) == ["tests/test_core_direct.py", "tests/test_util.py"]
+    assert g.tests_for(["pkg/other.py"]) == ["tests/test_other.py"]
+    assert g.tests_for(["tests/test_other.py"]) == ["tests/test_other.py"]
+    assert g.tests_for(["README.md"]) == []
+
+
+def test_graph_uses_base_source_of_touched_files(tmp_path):
+    _tree(tmp_path, {"a.py": "", "b.py": "", "test_b.py": "import b\n"})
+    # the patch made test_b import a; the cached graph must not learn that
+    g = ImportGraph.build(str(tmp_path), {"test_b.py": "import b\n", "new.py": None})
+    (tmp_path / "test_b.py").write_text("import a\n")
+    assert g.tests_for(["a.py"]) == []
+    assert "new" not in g.files
+
+
+def test_full_suite_triggers():
+    assert selfcheck.needs_full_suite(["tests/conftest.py"])
+    assert selfcheck.needs_full_suite(["pyproject.toml"])
+    assert not selfcheck.needs_full_suite(["pkg/core.py", "README.md"])
+
+
+def test_touched_files():
+    diff = "--- a/pkg/core.py\n+++ b/pkg/core.py\n@@ -1 +1,2 @@\n x = 1\n+y = 2\n"
+    assert selfcheck.touched_files(diff) == ["pkg/core.py"]
+    assert selfcheck.touched_files("--- a/x\n+++ b/x\n@@ -1 +1 @@\nbroken\n") is None
+
+
+@pytest.mark.asyncio
+async def test_run_selfcheck_limited_to_touched(tmp_path):
+    from apps.agents.coding_agent.agent import run_selfcheck
+    _tree(tmp_path, {"pytest.ini": "", "pkg/core.py": "", "tests/test_core.py": "import pkg.core\n"})
+    g = ImportGraph.build(str(tmp_path))
+    with patch("shutil.which", return_value="/usr/bin/tool"), \
+         patch.object(selfcheck, "graph_for", return_value=g), \
+         patch("asyncio.create_subprocess_exec") as run:
+        run.return_value.communicate = AsyncMock(return_value=(b"", b""))
+        run.return_value.returncode = 0
+        ok, notes = await run_selfcheck(str(tmp_path), ["pkg/core.py"])
+    assert ok and notes == []
+    cmds = [c.args for c in run.call_args_list]
+    assert cmds[0] == ("black", "--check", "pkg/core.py")
+    assert cmds[1] == ("ruff", "check", "pkg/core.py")
+    assert cmds[2][-1] == "tests/test_core.py"
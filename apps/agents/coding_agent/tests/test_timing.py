@@ -0,0 +1,40 @@
+import asyncio
+import json
+import pytest
+
+from apps.agents.coding_agent import timing
+
+
+@pytest.mark.asyncio
+async def test_stages_summed_per_task_and_spans_linked(tmp_path, monkeypatch):
+    monkeypatch.setattr(timing, "_writer", timing.SpanWriter(str(tmp_path / "spans.jsonl")))
+    with timing.task("t1", "trivial") as timer:
+        with timing.stage("llm", temperature=0.1):
+            await asyncio.sleep(0.01)
+        with timing.stage("llm"):
+            pass
+
+        def in_thread():
+            with timing.stage("apply"):
+                pass
+        await asyncio.to_thread(in_thread)
+        timing.record("worktree", 0.5)
+    assert timer.counts == {"llm": 2, "apply": 1, "worktree": 1}
+    assert timer.totals["llm"] >= 0.01 and timer.totals["worktree"] == 0.5
+    summary = timer.summary()
+    assert summary.startswith("timing: total=") and "llm=" in summary and "(x2)" in summary
+
+    spans = [json.loads(l) for l in (tmp_path / "spans.jsonl").read_text().splitlines()]
+    root = spans[-1]
+    assert root["name"] == "coding_task" and root["parent_span_id"] is None
+    assert [s["name"] for s in spans[:-1]] == ["llm", "llm", "apply", "worktree"]
+    assert {s["parent_span_id"] for s in spans[:-1]} == {root["span_id"]}
+    assert {s["trace_id"] for s in spans} == {root["trace_id"]}
+    assert spans[0]["attributes"] == {"task.id": "t1", "task.complexity": "trivial", "temperature": 0.1}
+
+
+def test_stage_outside_task_is_noop():
+    with timing.stage("llm"):
+        pass
+    timing.record("worktree", 1.0)
+    assert timing.current() is None
@@ -0,0 +1,102 @@
+import asyncio
+import subprocess
+import pytest
+
+from apps.agents.coding_agent.workspace import WorktreePool
+
+
+def _git(*args, cwd):
+    subprocess.run(["git", *args], cwd=cwd, check=True, capture_output=True)
+
+
+@pytest.fixture
+def mirror(tmp_path):
+    """A bare origin with one commit on main, mirrored the way git_cache does"""
+    origin = tmp_path / "origin.git"
+    _git("init", "-q", "--bare", "-b", "main", str(origin), cwd=tmp_path)
+    work = tmp_path / "work"
+    _git("init", "-q", "-b", "main", str(work), cwd=tmp_path)
+    (work / "README.md").write_text("# Test\n")
+    _git("add", "README.md", cwd=work)
+    _git("-c", "user.email=t@example.com", "-c", "user.name=t", "commit", "-q", "-m", "init", cwd=work)
+    _git("push", "-q", str(origin), "main", cwd=work)
+    m = tmp_path / "mirror.git"
+    _git("clone", "-q", "--mirror", str(origin), str(m), cwd=tmp_path)
+    return origin, m
+
+
+@pytest.mark.asyncio
+async def test_worktree_reused_and_reset(tmp_path, mirror):
+    origin, m = mirror
+    pool = WorktreePool(size=1, root=str(tmp_path / "pool"), remote=str(origin), mirror=str(m))
+    async with pool.lease("main") as wt:
+        first = wt
+        assert (pool.base / "objects" / "info" / "alternates").exists()   # objects borrowed from the mirror
+        with open(f"{wt}/README.md", "a") as f:
+            f.write("dirty\n")
+        open(f"{wt}/scratch.txt", "w").write("x")
+        _git("checkout", "-q", "-b", "agt/t1", cwd=wt)
+    async with pool.lease("main") as wt:
+        assert wt == first and pool.created == 1
+        assert open(f"{wt}/README.md").read() == "# Test\n"
+        assert not (tmp_path / "pool" / "wt-1" / "scratch.txt").exists()
+    branches = subprocess.run(["git", "branch", "--list", "agt/*"], cwd=pool.base,
+                              capture_output=True, text=True).stdout
+    assert branches.strip() == ""
+
+
+@pytest.mark.asyncio
+async def test_lease_is_bounded(tmp_path, mirror):
+    origin, m = mirror
+    pool = WorktreePool(size=2, root=str(tmp_path / "pool"), remote=str(origin), mirror=str(m))
+    held, peak = set(), 0
+
+    async def task():
+        nonlocal peak
+        async with pool.lease("main") as wt:
+            assert wt not in held
+            held.add(wt)
+            peak = max(peak, len(held))
+            await asyncio.sleep(0.01)
+            held.discard(wt)
+
+    await asyncio.gather(*(task() for _ in range(6)))
+    assert peak == 2 and pool.created == 2
+
+
+@pytest.mark.asyncio
+async def test_without_mirror_clones_once(tmp_path, mirror):
+    origin, _ = mirror
+    pool = WorktreePool(size=1, root=str(tmp_path / "pool"), remote=str(origin))
+    async with pool.lease("main") as wt:
+        assert open(f"{wt}/README.md").read() == "# Test\n"
+
+
+@pytest.mark.asyncio
+async def test_lease_at_base_commit_pushed_after_setup(tmp_path, mirror):
+    origin, m = mirror
+    pool = WorktreePool(size=1, root=str(tmp_path / "pool"), remote=str(origin), mirror=str(m))
+    async with pool.lease("main"):
+        pass
+    # a predecessor task pushes its branch; the mirror has not synced yet
+    work = tmp_path / "work"
+    _git("checkout", "-q", "-b", "agt/t1", cwd=work)
+    (work / "README.md").write_text("# Test\nfrom t1\n")
+    _git("-c", "user.email=t@example.com", "-c", "user.name=t", "commit", "-qam", "t1", cwd=work)
+    _git("push", "-q", str(origin), "agt/t1", cwd=work)
+    sha = subprocess.run(["git", "rev-parse", "HEAD"], cwd=work, capture_output=True, text=True).stdout.strip()
+    async with pool.lease("main", base=sha) as wt:
+        assert open(f"{wt}/README.md").read() == "# Test\nfrom t1\n"
+    with pytest.raises(RuntimeError):
+        async with pool.lease("main", base="0" * 40):
+            pass
+
+
+@pytest.mark.asyncio
+async def test_resolve_matches_lease(tmp_path, mirror):
+    origin, m = mirror
+    pool = WorktreePool(size=1, root=str(tmp_path / "pool"), remote=str(origin), mirror=str(m))
+    sha = await pool.resolve("main")
+    async with pool.lease("main", base=sha) as wt:
+        head = subprocess.run(["git", "rev-parse", "HEAD"], cwd=wt, capture_output=True, text=True).stdout.strip()
+    assert head == sha
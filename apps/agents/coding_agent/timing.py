@@ -0,0 +1,113 @@
+"""Per-stage timing of coding tasks.
+
+Every stage (admission, worktree, context, llm, apply, black, ruff, pytest,
+commit, push, ...) is observed in `ca_stage_seconds{stage,complexity}` and
+summed per task; the sums go into the CommitResult notes as one `timing:`
+line.  With CA_SPANS_FILE set, each stage is also written as an
+OpenTelemetry-style span (one JSON object per line) whose trace id derives
+from the Kafka trace, so every span of one change request shares it.
+
+The task's timer lives in a context variable: stages nested anywhere below
+`process_task`, including in speculative candidates and worker threads,
+record to it without being passed it.  Concurrent candidates add up, so a
+stage's sum can exceed the task's wall time.
+"""
+from __future__ import annotations
+import contextvars, hashlib, json, os, threading, time, uuid
+from contextlib import contextmanager
+from prometheus_client import Histogram
+from clients.kafka_utils import tracing
+
+STAGE_LAT = Histogram("ca_stage_seconds", "Coding task time per stage", ["stage", "complexity"],
+                      buckets=(.01, .05, .1, .25, .5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600))
+
+SPANS_FILE = os.getenv("CA_SPANS_FILE")                  # unset: no spans
+
+_timer: contextvars.ContextVar["TaskTimer|None"] = contextvars.ContextVar("ca_timer", default=None)
+_span: contextvars.ContextVar[str|None] = contextvars.ContextVar("ca_span", default=None)
+
+class SpanWriter:
+    def __init__(self, path:str):
+        self._f = open(path, "a", buffering=1)
+        self._lock = threading.Lock()
+
+    def write(self, span:dict):
+        line = json.dumps(span, separators=(",", ":"))
+        with self._lock:
+            self._f.write(line + "\n")
+
+_writer = SpanWriter(SPANS_FILE) if SPANS_FILE else None
+
+class TaskTimer:
+    def __init__(self, task_id:str, complexity:str=""):
+        self.task_id = task_id
+        self.complexity = complexity or "unknown"
+        trace = tracing.current() or task_id
+        self.trace_id = hashlib.md5(trace.encode()).hexdigest()
+        self.totals: dict[str, float] = {}
+        self.counts: dict[str, int] = {}
+        self.started = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def add(self, name:str, seconds:float):
+        STAGE_LAT.labels(name, self.complexity).observe(seconds)
+        with self._lock:
+            self.totals[name] = self.totals.get(name, 0.0) + seconds
+            self.counts[name] = self.counts.get(name, 0) + 1
+
+    def summary(self) -> str:
+        parts = [f"total={time.perf_counter() - self.started:.2f}s"]
+        for name, sec in self.totals.items():
+            n = self.counts[name]
+            parts.append(f"{name}={sec:.2f}s" + (f"(x{n})" if n > 1 else ""))
+        return "timing: " + " ".join(parts)
+
+def _emit(timer:TaskTimer, name:str, span_id:str, parent:str|None, t0:int, t1:int, attrs:dict):
+    _writer.write({"trace_id": timer.trace_id, "span_id": span_id, "parent_span_id": parent, "name": name,
+                   "start_time_unix_nano": t0, "end_time_unix_nano": t1,
+                   "attributes": {"task.id": timer.task_id, "task.complexity": timer.complexity, **attrs}})
+
+@contextmanager
+def task(task_id:str, complexity:str=""):
+    """Time one task; yields its TaskTimer and makes it current for `stage()`."""
+    timer = TaskTimer(task_id, complexity)
+    tok, span_tok = _timer.set(timer), _span.set(uuid.uuid4().hex[:16])
+    t0 = time.time_ns()
+    try:
+        yield timer
+    finally:
+        if _writer:
+            _emit(timer, "coding_task", _span.get(), None, t0, time.time_ns(), {})
+        _span.reset(span_tok)
+        _timer.reset(tok)
+
+@contextmanager
+def stage(name:str, **attrs):
+    """Time a stage of the current task; a no-op outside `task()`."""
+    timer = _timer.get()
+    if timer is None:
+        yield
+        return
+    parent, span_id = _span.get(), uuid.uuid4().hex[:16]
+    tok = _span.set(span_id)
+    t0, w0 = time.perf_counter(), time.time_ns()
+    try:
+        yield
+    finally:
+        timer.add(name, time.perf_counter() - t0)
+        if _writer:
+            _emit(timer, name, span_id, parent, w0, time.time_ns(), attrs)
+        _span.reset(tok)
+
+def record(name:str, seconds:float, **attrs):
+    """Add a stage timed by the caller, e.g. the wait to enter an `async with`."""
+    timer = _timer.get()
+    if timer is None:
+        return
+    timer.add(name, seconds)
+    if _writer:
+        t1 = time.time_ns()
+        _emit(timer, name, uuid.uuid4().hex[:16], _span.get(), t1 - int(seconds * 1e9), t1, attrs)
+
+def current() -> TaskTimer|None:
+    return _timer.get()
@@ -0,0 +1,151 @@
+"""Pool of reusable git worktrees for coding tasks.
+
+The git_cache sidecar keeps a bare mirror of the repository on a shared,
+read-only volume.  The pool makes one local bare repository that borrows the
+mirror's objects (`clone --bare --shared`, nothing is copied) and adds
+worktrees to it; the local repository holds the worktree metadata and task
+branches the read-only mirror cannot.  Pushes still go to REMOTE_REPO.
+Without a mirror the local repository is cloned from REMOTE_REPO once, so
+only the first task pays for the clone.
+
+A leased worktree is reset to `origin/<branch>`, or to a given base commit
+(the predecessor's, for a dependent task), with `checkout -f` and
+`clean -fdx`; a worktree that fails to reset is discarded and rebuilt.  A
+base commit the local repository lacks is fetched from origin, then from
+REMOTE_REPO's task branches, since the mirror may not have caught up yet.
+"""
+from __future__ import annotations
+import asyncio, logging, os, shutil, subprocess, tempfile, time
+from contextlib import asynccontextmanager
+from pathlib import Path
+
+log = logging.getLogger("coding-agent.workspace")
+
+REMOTE_REPO = os.getenv("REMOTE_REPO", "https://github.com/your-org/self-healing-code")
+REFERENCE_FILE = "/git-cache/reference-path"          # written by apps/git_cache/fetch.sh
+ROOT = os.getenv("CA_WORKTREE_ROOT", os.path.join(tempfile.gettempdir(), "ca-worktrees"))
+SIZE = int(os.getenv("CA_WORKTREES", os.getenv("CA_CONCURRENCY", "4")))
+REFRESH_SEC = float(os.getenv("CA_WORKTREE_REFRESH_SEC", "30"))   # min interval between fetches
+TASK_BRANCH = "agt/"
+
+def _git(*args, cwd=None) -> str:
+    return subprocess.run(["git", *args], cwd=cwd, check=True, capture_output=True, text=True).stdout.strip()
+
+def mirror_path() -> str|None:
+    """The git_cache mirror: GIT_CACHE_REF, else the path the sidecar published."""
+    ref = os.getenv("GIT_CACHE_REF")
+    if not (ref and Path(ref).exists()):
+        try:
+            ref = Path(REFERENCE_FILE).read_text().strip()
+        except OSError:
+            return None
+    return ref if ref and Path(ref).exists() else None
+
+class WorktreePool:
+    def __init__(self, size:int=SIZE, root:str=ROOT, remote:str=REMOTE_REPO, mirror:str|None=None):
+        self.size = size
+        self.root = Path(root)
+        self.remote = remote
+        self.mirror = mirror
+        self.base = self.root / "base.git"
+        self.free: list[Path] = []
+        self.created = 0
+        self.fetched = 0.0
+        self._sem = asyncio.Semaphore(size)
+        self._lock = asyncio.Lock()              # base setup and fetches
+        self._ready = False
+
+    def _setup(self):
+        mirror = self.mirror or mirror_path()
+        if not (self.base / "HEAD").exists():
+            self.root.mkdir(parents=True, exist_ok=True)
+            if mirror:
+                _git("clone", "--bare", "--shared", mirror, str(self.base))
+            else:
+                _git("clone", "--bare", self.remote, str(self.base))
+        elif mirror:
+            _git("remote", "set-url", "origin", mirror, cwd=self.base)
+        _git("config", "remote.origin.fetch", "+refs/heads/*:refs/remotes/origin/*", cwd=self.base)
+        _git("config", "remote.origin.pushurl", self.remote, cwd=self.base)
+        # worktrees left by a previous process are stale; start clean
+        for old in self.root.glob("wt-*"):
+            shutil.rmtree(old, ignore_errors=True)
+        _git("worktree", "prune", cwd=self.base)
+        _git("fetch", "-q", "--prune", "origin", cwd=self.base)
+        self.fetched = time.monotonic()
+        log.info("worktree pool at %s (mirror: %s)", self.root, mirror or "none")
+
+    async def _prepare(self):
+        async with self._lock:
+            if not self._ready:
+                await asyncio.to_thread(self._setup)
+                self._ready = True
+            elif time.monotonic() - self.fetched > REFRESH_SEC:
+                await asyncio.to_thread(_git, "fetch", "-q", "--prune", "origin", cwd=self.base)
+                self.fetched = time.monotonic()
+
+    def _has(self, sha:str) -> bool:
+        return subprocess.run(["git", "cat-file", "-e", f"{sha}^{{commit}}"], cwd=self.base,
+                              capture_output=True).returncode == 0
+
+    def _ensure(self, sha:str):
+        if self._has(sha):
+            return
+        _git("fetch", "-q", "--prune", "origin", cwd=self.base)
+        self.fetched = time.monotonic()
+        if not self._has(sha):
+            _git("fetch", "-q", self.remote, f"+refs/heads/{TASK_BRANCH}*:refs/remotes/origin/{TASK_BRANCH}*",
+                 cwd=self.base)
+        if not self._has(sha):
+            raise RuntimeError(f"base commit {sha} not found in origin or {self.remote}")
+
+    def _add(self, ref:str) -> Path:
+        self.created += 1
+        path = self.root / f"wt-{self.created}"
+        _git("worktree", "add", "-q", "--detach", str(path), ref, cwd=self.base)
+        return path
+
+    def _reset(self, path:Path, ref:str):
+        branch = subprocess.run(["git", "symbolic-ref", "-q", "--short", "HEAD"], cwd=path,
+                                capture_output=True, text=True).stdout.strip()
+        _git("checkout", "-q", "-f", "--detach", ref, cwd=path)
+        _git("clean", "-q", "-fdx", cwd=path)
+        if branch.startswith(TASK_BRANCH):       # pushed (or abandoned) by the previous task
+            _git("branch", "-q", "-D", branch, cwd=path)
+
+    def _discard(self, path:Path):
+        subprocess.run(["git", "worktree", "remove", "--force", str(path)], cwd=self.base, capture_output=True)
+        shutil.rmtree(path, ignore_errors=True)
+
+    async def resolve(self, branch:str="main", base:str|None=None) -> str:
+        """The commit a lease of `branch` (or `base`) starts from, present in the local repository."""
+        await self._prepare()
+        async with self._lock:
+            if base:
+                await asyncio.to_thread(self._ensure, base)
+            return await asyncio.to_thread(_git, "rev-parse", f"{base or 'origin/' + branch}^{{commit}}",
+                                           cwd=self.base)
+
+    @asynccontextmanager
+    async def lease(self, branch:str="main", base:str|None=None):
+        """Yield the path of a clean worktree at `base`, else `origin/<branch>`; at most `size` are out at once."""
+        async with self._sem:
+            await self._prepare()
+            ref = base or f"origin/{branch}"
+            if base:
+                async with self._lock:
+                    await asyncio.to_thread(self._ensure, base)
+            path = self.free.pop() if self.free else None
+            if path is not None:
+                try:
+                    await asyncio.to_thread(self._reset, path, ref)
+                except subprocess.CalledProcessError as e:
+                    log.warning("discarding worktree %s: %s", path, e.stderr.strip())
+                    await asyncio.to_thread(self._discard, path)
+                    path = None
+            if path is None:
+                path = await asyncio.to_thread(self._add, ref)
+            try:
+                yield str(path)
+            finally:
+                self.free.append(path)
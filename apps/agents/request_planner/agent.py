@@ -7,15 +7,15 @@ from clients.rag_client import RagClient
 from .prompt import build_prompt
 from apps.orchestrator import topics as T
 from clients.llm_client import json_chat
-from clients.kafka_utils import produce, subscribe
+from clients.kafka_utils import produce, serve
 
 GROUP = "request-planner"
+CONCURRENCY = int(os.getenv("RP_CONCURRENCY", "4"))
 
 log = logging.getLogger("request-planner")
 
 # Prometheus metrics
 PLANS = Counter("rp_plans_total","plans emitted")
-start_http_server(9400)
 
 srm = SRMClient("srm", 9090)
 rag = RagClient("rag_service", 9100)
@@ -24,18 +24,22 @@ RESERVE_RE = re.compile(r"\b([a-zA-Z_][a-zA-Z0-9_]*)\s*\(")  # simple fn capture
 
 async def process_change(cr):
     ctx_snips = await rag.hybrid_search(cr.description, k=8, alpha=.3)
-    prompt = build_prompt(cr, ctx_snips)
+    model = os.getenv("PLANNER_MODEL","gpt-4o-mini")
+    prompt = build_prompt(cr, ctx_snips, model)
     llm_json_str = await json_chat(
         messages=[
             {"role": "system", "content": "You are Request-Planner v1. Return ONLY valid JSON with keys: steps: [{goal, kind, path}], rationale: [...]"},
             {"role": "user", "content": prompt}
         ],
-        model=os.getenv("PLANNER_MODEL","gpt-4o-mini")
+        model=model,
+        call_type="plan",
+        semantic_key=cr.description
     )
     llm_json = json.loads(llm_json_str)
     plan = Plan(
         id=str(uuid.uuid4()),
         parent_request_id=cr.id,
+        correlation_id=cr.id,
         rationale=llm_json["rationale"]
     )
     # steps
@@ -58,8 +62,11 @@ async def process_change(cr):
     PLANS.inc()
 
 async def main_loop():
-    async for topic, msg in subscribe(GROUP, [T.CRQ], proto_map={T.CRQ: ChangeRequest}):
-        await process_change(msg)
+    start_http_server(9400)
+    async def handle(topic, cr):
+        await process_change(cr)
+    await serve(GROUP, [T.CRQ], handle,
+                concurrency=CONCURRENCY, key=lambda t, cr: cr.id)
 
 if __name__ == "__main__":
     asyncio.run(main_loop())
\ No newline at end of file
@@ -1,5 +1,9 @@
-def build_prompt(cr, snippets):
-    ctx = "\n\n".join(snippets)
+from clients.llm_client.tokens import budget_for, count_tokens, pack
+
+def build_prompt(cr, snippets, model="gpt-4o-mini", budget=None):
+    # snippets arrive ranked best-first; keep as many as fit next to the request text
+    budget = (budget or budget_for(model)) - count_tokens(cr.description, model)
+    ctx = "\n\n".join(pack(snippets, max(budget, 0), model))
     return f"""# CHANGE REQUEST
 {cr.description}
 
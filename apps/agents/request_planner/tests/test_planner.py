@@ -16,4 +16,15 @@ async def test_build_prompt():
     assert "Add a greeting function" in result
     assert "CONTEXT" in result
     assert "def hello():" in result
-    assert "Return plan JSON." in result
\ No newline at end of file
+    assert "Return plan JSON." in result
+
+def test_build_prompt_budget():
+    class MockCR:
+        description = "Add a greeting function"
+
+    snippets = ["keep me", "x " * 5000, "also kept"]
+    result = prompt.build_prompt(MockCR(), snippets, budget=200)
+
+    assert "keep me" in result
+    assert "also kept" in result
+    assert "x x x" not in result
\ No newline at end of file
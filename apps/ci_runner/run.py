@@ -7,11 +7,13 @@ import logging
 import pathlib
 import tarfile
 from pathlib import Path
-from confluent_kafka import Consumer, Producer, KafkaError
+from clients.kafka_utils.backend import Consumer, KafkaError
 from prometheus_client import Counter, Histogram, start_http_server
 
-from apps.core_contracts_pb2 import CommitResult, BuildReport
+from apps.core_contracts_pb2 import BuildReport
 from apps.orchestrator import topics as T
+from clients.kafka_utils import get_producer, tracing
+from clients.kafka_utils.codec import decode
 
 BOOT = os.getenv("KAFKA_BOOTSTRAP", "kafka:9092")
 REMOTE_REPO = os.getenv("REMOTE_REPO")
@@ -36,7 +38,8 @@ consumer = Consumer({
 })
 consumer.subscribe([T.CRES])  # CommitResult SUCCESS
 
-producer = Producer({"bootstrap.servers": BOOT})
+producer = get_producer()
+tracing.set_origin("ci-runner")
 
 
 def run(cmd: list, cwd: str | Path, check=True):
@@ -110,6 +113,11 @@ def build(commit_sha: str, branch: str) -> BuildReport:
             shutil.rmtree(work, ignore_errors=True)
 
 
+def _log_delivery(fut):
+    if fut.exception() is not None:
+        log.error(f"BuildReport delivery failed: {fut.exception()}")
+
+
 def main():
     log.info("CI Runner started, waiting for CommitResult messages...")
     
@@ -122,18 +130,19 @@ def main():
             continue
             
         try:
-            cres = CommitResult.FromString(msg.value())
+            cres = decode(msg.value(), topic=T.CRES)
+            tracing.set_current(tracing.observe(T.CRES, msg.headers()).get(tracing.TRACE))
             if cres.status != "SUCCESS":
                 log.info(f"Skipping non-successful commit: {cres.commit_sha}")
                 continue  # ignore failed tasks
             
             log.info(f"Building commit {cres.commit_sha} from branch {cres.branch_name}")
             br = build(cres.commit_sha, cres.branch_name)
+            br.correlation_id = cres.correlation_id
             
             log.info(f"Build {br.status} for {br.commit_sha}, coverage: {br.line_coverage:.1f}%")
             
-            producer.produce(T.BREPORT, br.SerializeToString())
-            producer.flush()
+            producer.produce(T.BREPORT, br).add_done_callback(_log_delivery)
         except Exception as e:
             log.error(f"Error processing message: {e}")
 
@@ -1,85 +1,138 @@
-import asyncio, json, os, uuid
+import asyncio, json, os, time, uuid
 from datetime import datetime
-from confluent_kafka import Producer, Consumer, KafkaError
-from apps.orchestrator.state_machine import OrchestratorFSM, Stage
+from clients.kafka_utils.backend import Consumer, KafkaError, TopicPartition
+from clients.kafka_utils import get_producer, tracing
+from clients.kafka_utils.codec import decode
+from apps.orchestrator.state_machine import Stage
+from apps.orchestrator.pipelines import Pipelines
+from apps.orchestrator.store import StateStore
 from apps.orchestrator import topics as T
-from apps import core_contracts_pb2 as pb
-from prometheus_client import Counter, Histogram, start_http_server
+from prometheus_client import Counter, Gauge, Histogram, start_http_server
 
 BOOTSTRAP = os.getenv("KAFKA_BOOTSTRAP","kafka:9092")
 
-producer = Producer({"bootstrap.servers": BOOTSTRAP})
+producer = get_producer()
+tracing.set_origin("orchestrator")
 consumer = Consumer({
     "bootstrap.servers": BOOTSTRAP,
     "group.id": "orchestrator",
-    "auto.offset.reset": "earliest"
+    "auto.offset.reset": "earliest",
+    # offsets are committed with each state snapshot, never ahead of it
+    "enable.auto.commit": False
 })
 SUBS = [T.CRQ, T.PLAN, T.TASK, T.CRES, T.BREPORT, T.TSPEC, T.GTRES]
-consumer.subscribe(SUBS)
-
-fsm = OrchestratorFSM()
-current_request_id = None
-pending_tasks = set()
 
 STAGE_METRIC = Counter("orch_stage_total","increment per stage",["stage"])
+# enqueue time of each stage's message relative to its change request; the
+# difference between consecutive topics is the time spent in that stage
+PIPE_LAT = Histogram("orch_pipeline_latency_sec","time since change request, per stage topic",["topic"],
+                     buckets=(1,5,15,30,60,120,300,600,1200,1800,3600))
+ACTIVE = Gauge("orch_pipelines_active","change requests in flight")
+EXPIRED = Counter("orch_pipelines_expired_total","pipelines dropped after ORCH_PIPELINE_TTL_SEC idle")
 start_http_server(9300)
 
-def update_metric():
-    STAGE_METRIC.labels(fsm.state).inc()
+pipelines = Pipelines(on_state=lambda p: STAGE_METRIC.labels(p.state).inc())
+SWEEP_SEC = float(os.getenv("ORCH_SWEEP_SEC", "30"))
+SNAPSHOT_SEC = float(os.getenv("ORCH_SNAPSHOT_SEC", "5"))
+SNAPSHOT_EVERY = int(os.getenv("ORCH_SNAPSHOT_EVERY", "500"))     # messages
+FLUSH_SEC = float(os.getenv("ORCH_FLUSH_SEC", "10"))               # wait for deliveries before a snapshot
+
+# restore the last snapshot and resume right after it: only the tail is replayed
+_t0 = time.perf_counter()
+store = StateStore()
+_restored, offsets = store.load()
+pipelines.restore(_restored)
+print(f"Restored {len(_restored)} pipelines in {time.perf_counter() - _t0:.2f}s")
+
+def _on_assign(c, parts):
+    for tp in parts:
+        off = offsets.get((tp.topic, tp.partition))
+        if off is not None:
+            tp.offset = off
+    c.assign(parts)
+
+consumer.subscribe(SUBS, on_assign=_on_assign)
+
+# records emitted since the last snapshot; a snapshot marks them dispatched, so
+# it is only written once the broker has acknowledged every one of them
+unacked: list[tuple] = []
+
+def _delivered() -> bool:
+    producer.flush(FLUSH_SEC)
+    failed, waiting = [], []
+    for fut, topic, msg, key in unacked:
+        if not fut.done():
+            waiting.append((fut, topic, msg, key))
+        elif fut.exception() is not None:
+            print("Delivery failed on", topic, fut.exception(), "- re-sending")
+            failed.append((topic, msg, key))
+    unacked[:] = waiting
+    for topic, msg, key in failed:
+        emit(topic, msg, key)
+    return not unacked
+
+def snapshot():
+    if not _delivered():
+        print(f"Snapshot deferred: {len(unacked)} records not yet delivered")
+        return None
+    n = store.snapshot(pipelines, offsets)
+    if offsets:
+        consumer.commit(offsets=[TopicPartition(t, p, o) for (t, p), o in offsets.items()],
+                        asynchronous=True)
+    return n
 
-def emit(topic:str, msg):
-    producer.produce(topic, msg)
-    producer.poll(0)
+def emit(topic:str, msg, key:str|None=None):
+    # delivery is tracked by the shared producer's poll thread and checked at the next snapshot
+    unacked.append((producer.produce(topic, msg, key), topic, msg, key))
 
-def handle_change_request(msg):
-    global current_request_id
-    cr = pb.ChangeRequest.FromString(msg.value())
-    current_request_id = cr.id
-    fsm.crq()
-    update_metric()
-    print("Request accepted", cr.id)
-    # forward to Architect / Planner
-    emit(T.DEEP, msg.value())
+def on_message(topic:str, obj, raw:bytes, hdr:dict):
+    enq = int(hdr.get(tracing.ENQUEUED, 0)) / 1000 or time.time()
+    p, out = pipelines.handle(topic, obj, raw, enq)
+    if p is None:
+        return
+    if topic == T.CRQ:
+        print("Request accepted", p.request_id)
+    else:
+        PIPE_LAT.labels(topic).observe(max(enq - p.started, 0.0))
+    for t, msg, key in out:
+        emit(t, msg, key)
+    if p.state == Stage.DONE.value:
+        print("✓ Pipeline complete for", p.request_id)
+    ACTIVE.set(len(pipelines))
 
 async def main_loop():
-    while True:
-        msg = consumer.poll(0.2)
-        if msg is None: 
-            await asyncio.sleep(0.1); continue
-        if msg.error() and msg.error().code() != KafkaError._PARTITION_EOF:
-            print("Kafka error", msg.error()); continue
-        topic = msg.topic()
-        if topic == T.CRQ: handle_change_request(msg)
-        elif topic == T.PLAN:
-            fsm.plan(); update_metric(); emit(T.TASK, msg.value())
-        elif topic == T.CRES:
-            res = pb.CommitResult.FromString(msg.value())
-            if res.status == "SUCCESS":
-                pending_tasks.discard(res.task_id)
-            if not pending_tasks:
-                fsm.code_ok(); update_metric()
-        elif topic == T.BREPORT:
-            rep = pb.BuildReport.FromString(msg.value())
-            if rep.status == "PASSED":
-                if fsm.state == Stage.BUILD1.value: 
-                    fsm.build_ok(); update_metric()
-                elif fsm.state == Stage.BUILD2.value: 
-                    fsm.build2_ok(); update_metric()
-            else:
-                fsm.build_fail(); update_metric(); emit(T.REG, b"regression")
-        elif topic == T.TSPEC: 
-            fsm.tspec(); update_metric()
-        elif topic == T.GTRES:
-            gtr = pb.GeneratedTests.FromString(msg.value())
-            if gtr.precheck == "PASSED": 
-                fsm.gt_ok(); update_metric()
-            else: 
-                fsm.gt_fail(); update_metric()
-        else:
-            print("unrouted topic", topic)
-        # done?
-        if fsm.state == Stage.DONE.value:
-            print("✓ Pipeline complete for", current_request_id)
-            fsm.to_idle()   # reset
-            update_metric()
-        producer.flush(0)
\ No newline at end of file
+    last_sweep = last_snap = time.monotonic()
+    since_snap = 0
+    try:
+        while True:
+            now = time.monotonic()
+            if now - last_sweep >= SWEEP_SEC:
+                last_sweep = now
+                for p in pipelines.expire():
+                    EXPIRED.inc()
+                    print("Pipeline expired in", p.state, p.request_id)
+                ACTIVE.set(len(pipelines))
+            if since_snap and (since_snap >= SNAPSHOT_EVERY or now - last_snap >= SNAPSHOT_SEC):
+                if snapshot() is not None:        # deferred: retry after SNAPSHOT_SEC
+                    since_snap = 0
+                last_snap = now
+            msg = consumer.poll(0.2)
+            if msg is None: 
+                await asyncio.sleep(0.1); continue
+            if msg.error() and msg.error().code() != KafkaError._PARTITION_EOF:
+                print("Kafka error", msg.error()); continue
+            topic = msg.topic()
+            offsets[(topic, msg.partition())] = msg.offset() + 1
+            since_snap += 1
+            # parsed once per message via the topic registry; forwards reuse the raw bytes
+            try:
+                obj = decode(msg.value(), topic=topic)
+            except Exception as e:
+                print("undecodable message on", topic, e); continue
+            hdr = tracing.observe(topic, msg.headers())
+            tracing.set_current(hdr.get(tracing.TRACE))   # forwarded records keep the trace
+            on_message(topic, obj, msg.value(), hdr)
+    finally:
+        snapshot()
+        consumer.close()
+        store.close()
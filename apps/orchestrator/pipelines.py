@@ -0,0 +1,217 @@
+"""Per-request pipeline state for the orchestrator.
+
+One `OrchestratorFSM` per change request, keyed by request id.  Events are
+routed by `correlation_id` (set on Plan, TaskBundle, CommitResult and
+BuildReport); TestSpec and GeneratedTests carry no correlation id, so they
+are routed through the commit sha / spec id they reference.  `handle()` only
+updates state and returns the records to emit, so the Kafka loop in `main`
+stays thin and this module stays testable without a broker.
+
+Coding tasks from TaskBundles are released one record per task through a
+`TaskDAG`: independent tasks go out together, dependent ones as their
+predecessors commit.
+"""
+from __future__ import annotations
+import logging, os, time
+from apps.orchestrator.state_machine import OrchestratorFSM, Stage, TransitionError
+from apps.orchestrator.scheduler import TaskDAG
+from apps.orchestrator import topics as T
+from apps import core_contracts_pb2 as pb
+
+log = logging.getLogger("orchestrator.pipelines")
+
+TTL = float(os.getenv("ORCH_PIPELINE_TTL_SEC", "3600"))    # idle time before a pipeline is dropped
+
+_TERMINAL = {Stage.DONE.value, Stage.REGRESS.value}
+
+class Pipeline:
+    __slots__ = ("request_id", "fsm", "pending_tasks", "failed_tasks", "bundled", "dag",
+                 "builds", "reported", "commits", "specs", "started", "touched")
+
+    def __init__(self, request_id:str, started:float|None=None):
+        self.request_id = request_id
+        self.fsm = OrchestratorFSM()
+        self.pending_tasks: set[str] = set()     # from TaskBundles, cleared by CommitResults
+        self.failed_tasks: set[str] = set()
+        self.bundled = False                     # a TaskBundle has been seen
+        self.dag = TaskDAG()
+        self.builds: set[str] = set()            # successful commits awaiting a BuildReport
+        self.reported: set[str] = set()          # commits whose report came in first
+        self.commits: set[str] = set()
+        self.specs: set[str] = set()
+        self.started = started if started is not None else time.time()
+        self.touched = time.monotonic()
+
+    @property
+    def state(self) -> str:
+        return self.fsm.state
+
+    def dump(self) -> dict:
+        return {"state": self.state, "pending": sorted(self.pending_tasks), "failed": sorted(self.failed_tasks),
+                "bundled": self.bundled, "dag": self.dag.dump(), "builds": sorted(self.builds),
+                "reported": sorted(self.reported), "commits": sorted(self.commits),
+                "specs": sorted(self.specs), "started": self.started,
+                "idle": time.monotonic() - self.touched}
+
+    @classmethod
+    def load(cls, request_id:str, d:dict) -> "Pipeline":
+        p = cls(request_id, d["started"])
+        p.fsm.state = d["state"]
+        p.pending_tasks, p.failed_tasks = set(d["pending"]), set(d["failed"])
+        p.bundled, p.builds, p.reported = d["bundled"], set(d["builds"]), set(d["reported"])
+        p.dag = TaskDAG.load(d["dag"])
+        p.commits, p.specs = set(d["commits"]), set(d["specs"])
+        p.touched = time.monotonic() - d["idle"]
+        return p
+
+class Pipelines:
+    def __init__(self, ttl:float=TTL, on_state=None):
+        self.ttl = ttl
+        self.on_state = on_state                 # called with the pipeline after each transition
+        self.by_id: dict[str, Pipeline] = {}
+        self.by_commit: dict[str, str] = {}
+        self.by_spec: dict[str, str] = {}
+        self.dirty: set[str] = set()             # changed since the last snapshot
+        self.dropped: set[str] = set()           # ... and removed since then
+
+    def __len__(self):
+        return len(self.by_id)
+
+    def route(self, topic:str, obj) -> Pipeline|None:
+        if topic == T.CRQ:
+            rid = obj.id
+        elif topic == T.TSPEC:
+            rid = self.by_commit.get(obj.parent_commit_sha)
+        elif topic == T.GTRES:
+            rid = self.by_spec.get(obj.spec_id)
+        else:
+            rid = getattr(obj, "correlation_id", "") or getattr(obj, "parent_request_id", "")
+            if not rid and topic == T.BREPORT:
+                rid = self.by_commit.get(obj.commit_sha)
+        return self.by_id.get(rid) if rid else None
+
+    def _fire(self, p:Pipeline, event:str) -> bool:
+        try:
+            getattr(p.fsm, event)()
+        except TransitionError:
+            log.warning("%s: ignoring %s in state %s", p.request_id, event, p.state)
+            return False
+        if self.on_state:
+            self.on_state(p)
+        return True
+
+    def _regress(self, p:Pipeline, summary:str) -> list:
+        self._fire(p, "build_fail")
+        return [(T.REG, pb.RegressionTicket(id=p.request_id, summary=summary), p.request_id)]
+
+    def _code_done(self, p:Pipeline) -> list:
+        if not p.bundled or p.pending_tasks or p.state != Stage.CODE.value:
+            return []
+        if p.failed_tasks:
+            return self._regress(p, f"tasks failed: {', '.join(sorted(p.failed_tasks))}")
+        if self._fire(p, "code_ok") and not p.builds:
+            self._fire(p, "build_ok")            # every commit was built while coding finished
+        return []
+
+    @staticmethod
+    def _dispatch(p:Pipeline, tasks) -> list:
+        out = []
+        for t in tasks:
+            t.correlation_id = p.request_id
+            out.append((T.CTASK, t, t.id))       # keyed by task: spread over partitions
+        return out
+
+    def handle(self, topic:str, obj, raw:bytes|None=None, enqueued:float|None=None) -> tuple[Pipeline|None, list]:
+        """Apply one event; return the pipeline it touched and the (topic, msg, key) records to emit."""
+        if topic == T.CRQ:
+            if obj.id in self.by_id:                 # redelivered
+                return self.by_id[obj.id], []
+            p = self.by_id[obj.id] = Pipeline(obj.id, enqueued)
+            self.dirty.add(p.request_id)
+            self._fire(p, "crq")
+            # forward to Architect / Planner
+            return p, [(T.DEEP, raw if raw is not None else obj, p.request_id)]
+
+        p = self.route(topic, obj)
+        if p is None:
+            log.debug("no pipeline for %s record", topic)
+            return None, []
+        p.touched = time.monotonic()
+        self.dirty.add(p.request_id)
+        out = []
+        if topic == T.PLAN:
+            if p.state == Stage.PLAN.value:      # a TaskBundle may already have moved it on
+                self._fire(p, "plan")
+        elif topic == T.TASK:
+            if p.state == Stage.PLAN.value:      # tasks imply a plan, whichever topic was read first
+                self._fire(p, "plan")
+            p.bundled = True
+            new = [t for t in obj.tasks if t.id not in p.dag.tasks]
+            p.pending_tasks.update(t.id for t in new)
+            p.dag.add(new)
+            out += self._dispatch(p, p.dag.ready())
+            out += self._code_done(p)
+        elif topic == T.CRES:
+            p.pending_tasks.discard(obj.task_id)
+            if obj.status == "SUCCESS":
+                if obj.commit_sha not in p.reported:
+                    p.builds.add(obj.commit_sha)
+                self._index_commit(p, obj.commit_sha)
+                out += self._dispatch(p, p.dag.complete(obj.task_id, obj.commit_sha))
+            else:
+                p.failed_tasks.add(obj.task_id)
+                # dependents will never be dispatched; stop waiting for them
+                p.pending_tasks -= p.dag.fail(obj.task_id)
+            out += self._code_done(p)
+        elif topic == T.BREPORT:
+            if obj.status != "PASSED":
+                out += self._regress(p, f"build {obj.status} at {obj.commit_sha}")
+            elif p.state == Stage.BUILD2.value:
+                self._fire(p, "build2_ok")
+            else:
+                if obj.commit_sha not in p.builds:
+                    p.reported.add(obj.commit_sha)   # ahead of its CommitResult
+                p.builds.discard(obj.commit_sha)
+                if not p.builds and p.state == Stage.BUILD1.value:
+                    self._fire(p, "build_ok")
+        elif topic == T.TSPEC:
+            p.specs.add(obj.id)
+            self.by_spec[obj.id] = p.request_id
+            self._fire(p, "tspec")
+        elif topic == T.GTRES:
+            self._index_commit(p, obj.commit_sha)
+            self._fire(p, "gt_ok" if obj.precheck == "PASSED" else "gt_fail")
+        if p.state in _TERMINAL:
+            self.drop(p.request_id)
+        return p, out
+
+    def _index_commit(self, p:Pipeline, sha:str):
+        if sha:
+            p.commits.add(sha)
+            self.by_commit[sha] = p.request_id
+
+    def drop(self, request_id:str) -> Pipeline|None:
+        p = self.by_id.pop(request_id, None)
+        if p is not None:
+            self.dirty.discard(request_id)
+            self.dropped.add(request_id)
+            for sha in p.commits:
+                self.by_commit.pop(sha, None)
+            for sid in p.specs:
+                self.by_spec.pop(sid, None)
+        return p
+
+    def restore(self, pipelines:list[Pipeline]):
+        """Load snapshotted pipelines and rebuild the commit/spec indexes."""
+        for p in pipelines:
+            self.by_id[p.request_id] = p
+            for sha in p.commits:
+                self.by_commit[sha] = p.request_id
+            for sid in p.specs:
+                self.by_spec[sid] = p.request_id
+
+    def expire(self, now:float|None=None) -> list[Pipeline]:
+        """Drop pipelines with no event for `ttl` seconds."""
+        now = time.monotonic() if now is None else now
+        stale = [rid for rid, p in self.by_id.items() if now - p.touched > self.ttl]
+        return [self.drop(rid) for rid in stale]
@@ -0,0 +1,94 @@
+"""Step-dependency scheduling of coding tasks.
+
+Tasks touching the same path are chained in `step_number` order, since
+their patches would conflict if they ran side by side; a task without a path
+may touch anything, so it is a barrier between the steps before and after
+it.  Everything else is independent and is dispatched at once.  The graph is
+rebuilt from the tasks themselves, so only tasks and progress need to be
+persisted.
+
+A dependent task is based on its predecessor's commit (`base_commit_sha`),
+so it is patched on top of that change rather than next to it.  Where a
+barrier has several predecessors, the one of the latest step is its base.
+"""
+from __future__ import annotations
+import base64
+import networkx as nx
+from apps import core_contracts_pb2 as pb
+
+class TaskDAG:
+    def __init__(self):
+        self.g = nx.DiGraph()
+        self.tasks: dict[str, pb.CodingTask] = {}
+        self.dispatched: set[str] = set()
+        self.done: set[str] = set()
+        self.blocked: set[str] = set()          # a dependency failed
+        self.shas: dict[str, str] = {}          # done task -> its commit
+
+    def add(self, tasks):
+        for t in tasks:
+            self.tasks[t.id] = t
+        self._build()
+
+    def _build(self):
+        g = nx.DiGraph()
+        g.add_nodes_from(self.tasks)
+        last_by_path: dict[str, str] = {}
+        since_barrier: list[str] = []
+        barrier = None
+        for t in sorted(self.tasks.values(), key=lambda t: (t.step_number, t.id)):
+            if not t.path:
+                g.add_edges_from((u, t.id) for u in since_barrier)
+                if barrier and not since_barrier:
+                    g.add_edge(barrier, t.id)
+                barrier, since_barrier, last_by_path = t.id, [], {}
+                continue
+            prev = last_by_path.get(t.path) or barrier
+            if prev:
+                g.add_edge(prev, t.id)
+            last_by_path[t.path] = t.id
+            since_barrier.append(t.id)
+        self.g = g
+
+    def ready(self) -> list[pb.CodingTask]:
+        """Tasks whose dependencies are done; marks them dispatched."""
+        out = []
+        for tid in nx.topological_sort(self.g):
+            if tid in self.dispatched or tid in self.blocked:
+                continue
+            preds = list(self.g.predecessors(tid))
+            if all(p in self.done for p in preds):
+                self.dispatched.add(tid)
+                t = self.tasks[tid]
+                if preds:
+                    last = max(preds, key=lambda p: (self.tasks[p].step_number, p))
+                    t.base_commit_sha = self.shas.get(last, "")
+                out.append(t)
+        return out
+
+    def complete(self, task_id:str, commit_sha:str="") -> list[pb.CodingTask]:
+        self.done.add(task_id)
+        if commit_sha:
+            self.shas[task_id] = commit_sha
+        return self.ready()
+
+    def fail(self, task_id:str) -> set[str]:
+        """Block everything downstream of a failed task; returns the blocked ids."""
+        if task_id not in self.g:
+            return set()
+        down = nx.descendants(self.g, task_id) - self.done
+        self.blocked |= down
+        return down
+
+    def dump(self) -> dict:
+        return {"tasks": [base64.b64encode(t.SerializeToString()).decode() for t in self.tasks.values()],
+                "dispatched": sorted(self.dispatched), "done": sorted(self.done),
+                "blocked": sorted(self.blocked), "shas": self.shas}
+
+    @classmethod
+    def load(cls, d:dict) -> "TaskDAG":
+        dag = cls()
+        dag.add(pb.CodingTask.FromString(base64.b64decode(s)) for s in d["tasks"])
+        dag.dispatched, dag.done, dag.blocked = set(d["dispatched"]), set(d["done"]), set(d["blocked"])
+        dag.shas = dict(d.get("shas", {}))
+        return dag
@@ -1,4 +1,3 @@
-from transitions import Machine, State
 from enum import Enum
 
 class Stage(str, Enum):
@@ -6,16 +5,54 @@ class Stage(str, Enum):
     BUILD1="build1"; TESTPLAN="test_plan"; TESTBUILD="test_build"
     BUILD2="build2"; DONE="done"; REGRESS="regress"
 
+ANY = "*"
+
+# (event, source, dest); ANY matches every stage
+TRANSITIONS = (
+    ("crq",        Stage.IDLE,      Stage.PLAN),
+    ("plan",       Stage.PLAN,      Stage.CODE),
+    ("code_ok",    Stage.CODE,      Stage.BUILD1),
+    ("build_ok",   Stage.BUILD1,    Stage.TESTPLAN),
+    ("build_fail", ANY,             Stage.REGRESS),
+    ("tspec",      Stage.TESTPLAN,  Stage.TESTBUILD),
+    ("gt_ok",      Stage.TESTBUILD, Stage.BUILD2),
+    ("gt_fail",    Stage.TESTBUILD, Stage.REGRESS),
+    ("build2_ok",  Stage.BUILD2,    Stage.DONE),
+)
+
+# (event, state) -> next state; built once and shared by every instance
+_TABLE: dict[tuple[str, str], str] = {}
+for _ev, _src, _dst in TRANSITIONS:
+    for _s in (Stage if _src == ANY else (_src,)):
+        _TABLE[(_ev, _s.value)] = _dst.value
+
+class TransitionError(Exception):
+    """Event not allowed in the current state."""
+
 class OrchestratorFSM:
-    states = [State(s.value) for s in Stage]
-    def __init__(self):
-        self.machine = Machine(model=self, states=self.states, initial=Stage.IDLE.value)
-        self.machine.add_transition("crq",  Stage.IDLE.value,   Stage.PLAN.value)
-        self.machine.add_transition("plan", Stage.PLAN.value,   Stage.CODE.value)
-        self.machine.add_transition("code_ok", Stage.CODE.value, Stage.BUILD1.value)
-        self.machine.add_transition("build_ok", Stage.BUILD1.value, Stage.TESTPLAN.value)
-        self.machine.add_transition("build_fail", "*", Stage.REGRESS.value)
-        self.machine.add_transition("tspec", Stage.TESTPLAN.value, Stage.TESTBUILD.value)
-        self.machine.add_transition("gt_ok", Stage.TESTBUILD.value, Stage.BUILD2.value)
-        self.machine.add_transition("gt_fail", Stage.TESTBUILD.value, Stage.REGRESS.value)
-        self.machine.add_transition("build2_ok", Stage.BUILD2.value, Stage.DONE.value)
\ No newline at end of file
+    """Pipeline state machine: one string of state per instance, one dict lookup per event."""
+    __slots__ = ("state",)
+    states = [s.value for s in Stage]
+    events = tuple(dict.fromkeys(ev for ev, _, _ in TRANSITIONS))
+
+    def __init__(self, state:str=Stage.IDLE.value):
+        self.state = state
+
+    def trigger(self, event:str) -> bool:
+        try:
+            self.state = _TABLE[(event, self.state)]
+        except KeyError:
+            raise TransitionError(f"can't trigger {event} from state {self.state}") from None
+        return True
+
+    def may(self, event:str) -> bool:
+        return (event, self.state) in _TABLE
+
+def _event(name:str):
+    def fire(self) -> bool:
+        return self.trigger(name)
+    fire.__name__ = name
+    return fire
+
+for _ev in OrchestratorFSM.events:
+    setattr(OrchestratorFSM, _ev, _event(_ev))
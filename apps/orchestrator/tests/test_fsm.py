@@ -6,4 +6,24 @@ def test_ok_flow():
     f.code_ok()
     f.build_ok()
     f.tspec(); f.gt_ok(); f.build2_ok()
-    assert f.state == Stage.DONE.value
\ No newline at end of file
+    assert f.state == Stage.DONE.value
+
+def test_invalid_event_and_shared_table():
+    import pytest
+    from apps.orchestrator.state_machine import TransitionError
+    f = OrchestratorFSM()
+    with pytest.raises(TransitionError):
+        f.plan()
+    assert f.state == Stage.IDLE.value and not f.may("plan")
+    f.crq(); f.plan(); f.build_fail()                 # build_fail is allowed from any stage
+    assert f.state == Stage.REGRESS.value
+    assert not hasattr(f, "__dict__")
+    g = OrchestratorFSM(Stage.BUILD2.value)           # restored from a snapshot
+    g.build2_ok()
+    assert g.state == Stage.DONE.value
+
+
+def test_bench_fsm_runs():
+    from scripts.bench_fsm import run
+    res = run(50)
+    assert res["table"]["bytes_per_fsm"] < res["transitions"]["bytes_per_fsm"]
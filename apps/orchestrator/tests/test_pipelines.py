@@ -0,0 +1,50 @@
+from apps import core_contracts_pb2 as pb
+from apps.orchestrator import topics as T
+from apps.orchestrator.pipelines import Pipelines
+from apps.orchestrator.state_machine import Stage
+
+
+def _run_to_build1(ps, rid, tasks):
+    ps.handle(T.CRQ, pb.ChangeRequest(id=rid), b"raw")
+    ps.handle(T.PLAN, pb.Plan(id="p-" + rid, parent_request_id=rid, correlation_id=rid))
+    tb = pb.TaskBundle(plan_id="p-" + rid, correlation_id=rid)
+    for t in tasks:
+        tb.tasks.add(id=t)
+    ps.handle(T.TASK, tb)
+
+
+def test_interleaved_requests_complete_independently():
+    ps = Pipelines()
+    _run_to_build1(ps, "a", ["a1", "a2"])
+    _run_to_build1(ps, "b", ["b1"])
+    assert len(ps) == 2 and ps.by_id["a"].pending_tasks == {"a1", "a2"}
+
+    ps.handle(T.CRES, pb.CommitResult(task_id="b1", commit_sha="sb", status="SUCCESS", correlation_id="b"))
+    ps.handle(T.CRES, pb.CommitResult(task_id="a1", commit_sha="sa1", status="SUCCESS", correlation_id="a"))
+    assert ps.by_id["a"].state == Stage.CODE.value            # a2 still pending
+    assert ps.by_id["b"].state == Stage.BUILD1.value
+    # report for a1 arrives before a2 is committed
+    ps.handle(T.BREPORT, pb.BuildReport(commit_sha="sa1", status="PASSED", correlation_id="a"))
+    ps.handle(T.CRES, pb.CommitResult(task_id="a2", commit_sha="sa2", status="SUCCESS", correlation_id="a"))
+    assert ps.by_id["a"].state == Stage.BUILD1.value
+    ps.handle(T.BREPORT, pb.BuildReport(commit_sha="sa2", status="PASSED"))    # routed by commit
+    assert ps.by_id["a"].state == Stage.TESTPLAN.value
+
+    ps.handle(T.TSPEC, pb.TestSpec(id="s1", parent_commit_sha="sa2"))
+    ps.handle(T.GTRES, pb.GeneratedTests(spec_id="s1", commit_sha="gt", precheck="PASSED"))
+    p, _ = ps.handle(T.BREPORT, pb.BuildReport(commit_sha="gt", status="PASSED"))
+    assert p.state == Stage.DONE.value
+    assert set(ps.by_id) == {"b"} and "sa2" not in ps.by_commit
+
+
+def test_failures_regress_and_stale_pipelines_expire():
+    ps = Pipelines(ttl=10)
+    _run_to_build1(ps, "a", ["a1"])
+    p, out = ps.handle(T.CRES, pb.CommitResult(task_id="a1", status="HARD_FAIL", correlation_id="a"))
+    assert p.state == Stage.REGRESS.value and out[0][0] == T.REG and out[0][1].id == "a"
+    assert len(ps) == 0
+
+    _run_to_build1(ps, "b", ["b1"])
+    assert ps.expire(ps.by_id["b"].touched + 5) == []
+    assert [p.request_id for p in ps.expire(ps.by_id["b"].touched + 11)] == ["b"]
+    assert ps.handle(T.CRES, pb.CommitResult(task_id="b1", correlation_id="b")) == (None, [])
@@ -0,0 +1,45 @@
+from apps import core_contracts_pb2 as pb
+from apps.orchestrator import topics as T
+from apps.orchestrator.pipelines import Pipelines
+from apps.orchestrator.scheduler import TaskDAG
+
+
+def _t(tid, step, path):
+    return pb.CodingTask(id=tid, step_number=step, path=path)
+
+
+def test_same_path_chains_and_pathless_is_a_barrier():
+    dag = TaskDAG()
+    dag.add([_t("a1", 1, "a.py"), _t("b1", 2, "b.py"), _t("a2", 3, "a.py"),
+             _t("x", 4, ""), _t("c1", 5, "c.py")])
+    assert {t.id for t in dag.ready()} == {"a1", "b1"}
+    assert dag.complete("b1", "sb1") == []
+    assert [(t.id, t.base_commit_sha) for t in dag.complete("a1", "sa1")] == [("a2", "sa1")]
+    assert [(t.id, t.base_commit_sha) for t in dag.complete("a2", "sa2")] == [("x", "sa2")]
+    assert [(t.id, t.base_commit_sha) for t in dag.complete("x", "sx")] == [("c1", "sx")]
+    loaded = TaskDAG.load(dag.dump())
+    assert loaded.dispatched == dag.dispatched and loaded.shas == dag.shas
+    assert loaded.tasks["c1"].base_commit_sha == "sx"
+
+
+def test_failed_task_blocks_dependents():
+    dag = TaskDAG()
+    dag.add([_t("a1", 1, "a.py"), _t("a2", 2, "a.py"), _t("b1", 3, "b.py")])
+    dag.ready()
+    assert dag.fail("a1") == {"a2"}
+    assert dag.complete("b1") == []
+
+
+def test_pipeline_dispatches_per_task_records():
+    ps = Pipelines()
+    ps.handle(T.CRQ, pb.ChangeRequest(id="r"))
+    tb = pb.TaskBundle(plan_id="p", correlation_id="r",
+                       tasks=[_t("a1", 1, "a.py"), _t("a2", 2, "a.py"), _t("b1", 3, "b.py")])
+    _, out = ps.handle(T.TASK, tb)                  # bundle before the Plan record
+    assert [(t, m.id, k) for t, m, k in out] == [(T.CTASK, "a1", "a1"), (T.CTASK, "b1", "b1")]
+    assert out[0][1].correlation_id == "r"
+    _, out = ps.handle(T.CRES, pb.CommitResult(task_id="a1", commit_sha="s1", status="SUCCESS",
+                                               correlation_id="r"))
+    assert [(m.id, m.base_commit_sha) for _, m, _ in out] == [("a2", "s1")]
+    _, out = ps.handle(T.CRES, pb.CommitResult(task_id="a2", status="SOFT_FAIL", correlation_id="r"))
+    assert ps.by_id["r"].pending_tasks == {"b1"}
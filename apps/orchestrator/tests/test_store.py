@@ -0,0 +1,43 @@
+from apps import core_contracts_pb2 as pb
+from apps.orchestrator import topics as T
+from apps.orchestrator.pipelines import Pipelines
+from apps.orchestrator.state_machine import Stage
+from apps.orchestrator.store import StateStore
+
+
+def _start(ps, rid):
+    ps.handle(T.CRQ, pb.ChangeRequest(id=rid))
+    ps.handle(T.PLAN, pb.Plan(id="p-" + rid, correlation_id=rid))
+    ps.handle(T.TASK, pb.TaskBundle(plan_id="p-" + rid, correlation_id=rid,
+                                    tasks=[pb.CodingTask(id=rid + "1"), pb.CodingTask(id=rid + "2")]))
+    ps.handle(T.CRES, pb.CommitResult(task_id=rid + "1", commit_sha="s-" + rid, status="SUCCESS",
+                                      correlation_id=rid))
+
+
+def test_snapshot_roundtrip_and_resume(tmp_path):
+    db = str(tmp_path / "orch.db")
+    store = StateStore(db)
+    assert store.db.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    ps = Pipelines()
+    _start(ps, "a"); _start(ps, "b")
+    assert store.snapshot(ps, {(T.CRES, 0): 7}) == 2
+    assert not ps.dirty
+    # only what changed is rewritten; dropped pipelines are deleted
+    ps.handle(T.CRES, pb.CommitResult(task_id="b1", status="HARD_FAIL", correlation_id="b"))
+    ps.handle(T.CRES, pb.CommitResult(task_id="b2", status="HARD_FAIL", correlation_id="b"))
+    assert store.snapshot(ps, {(T.CRES, 0): 9}) == 0
+    store.close()
+
+    pipes, offsets = StateStore(db).load()
+    assert offsets == {(T.CRES, 0): 9}
+    assert [p.request_id for p in pipes] == ["a"]
+    restored = Pipelines()
+    restored.restore(pipes)
+    a = restored.by_id["a"]
+    assert a.state == Stage.CODE.value and a.pending_tasks == {"a2"} and a.builds == {"s-a"}
+    # the tail replays onto the restored state
+    restored.handle(T.CRES, pb.CommitResult(task_id="a2", commit_sha="s-a2", status="SUCCESS",
+                                            correlation_id="a"))
+    restored.handle(T.BREPORT, pb.BuildReport(commit_sha="s-a", status="PASSED"))    # via commit index
+    restored.handle(T.BREPORT, pb.BuildReport(commit_sha="s-a2", status="PASSED", correlation_id="a"))
+    assert a.state == Stage.TESTPLAN.value
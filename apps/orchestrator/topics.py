@@ -2,8 +2,24 @@ CRQ     = "change.request.in"
 DEEP    = "deepplan.in"
 PLAN    = "plan.out"
 TASK    = "code.task.out"
+CTASK   = "code.task.dispatch"   # one CodingTask per record, released by the orchestrator's DAG
 CRES    = "commit.result.out"
 BREPORT = "build.report.out"
 TSPEC   = "test.spec.out"
 GTRES   = "generated.tests.out"
-REG     = "regression.out"
\ No newline at end of file
+REG     = "regression.out"
+
+# payload type per topic (message names in proto/core_contracts.proto);
+# kafka_utils.registry resolves these against core_contracts_pb2
+SCHEMAS = {
+    CRQ:     "ChangeRequest",
+    DEEP:    "ChangeRequest",
+    PLAN:    "Plan",
+    TASK:    "TaskBundle",
+    CTASK:   "CodingTask",
+    CRES:    "CommitResult",
+    BREPORT: "BuildReport",
+    TSPEC:   "TestSpec",
+    GTRES:   "GeneratedTests",
+    REG:     "RegressionTicket",
+}
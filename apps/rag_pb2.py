@@ -24,7 +24,7 @@ _sym_db = _symbol_database.Default()
 
 
 
-DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\trag.proto\x12\x03rag\"6\n\x0bSearchQuery\x12\r\n\x05query\x18\x01 \x01(\t\x12\t\n\x01k\x18\x02 \x01(\x05\x12\r\n\x05\x61lpha\x18\x03 \x01(\x02\":\n\x06\x44ocRef\x12\x10\n\x08point_id\x18\x01 \x01(\t\x12\x0f\n\x07snippet\x18\x02 \x01(\t\x12\r\n\x05score\x18\x03 \x01(\x02\"+\n\x0bSearchReply\x12\x1c\n\x07results\x18\x01 \x03(\x0b\x32\x0b.rag.DocRef\"2\n\x0eSnippetRequest\x12\x10\n\x08point_id\x18\x01 \x01(\t\x12\x0e\n\x06radius\x18\x02 \x01(\x05\"\x1c\n\x0cSnippetReply\x12\x0c\n\x04text\x18\x01 \x01(\t2s\n\nRagService\x12\x32\n\x0cHybridSearch\x12\x10.rag.SearchQuery\x1a\x10.rag.SearchReply\x12\x31\n\x07Snippet\x12\x13.rag.SnippetRequest\x1a\x11.rag.SnippetReplyb\x06proto3')
+DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\trag.proto\x12\x03rag\"6\n\x0bSearchQuery\x12\r\n\x05query\x18\x01 \x01(\t\x12\t\n\x01k\x18\x02 \x01(\x05\x12\r\n\x05\x61lpha\x18\x03 \x01(\x02\":\n\x06\x44ocRef\x12\x10\n\x08point_id\x18\x01 \x01(\t\x12\x0f\n\x07snippet\x18\x02 \x01(\t\x12\r\n\x05score\x18\x03 \x01(\x02\"+\n\x0bSearchReply\x12\x1c\n\x07results\x18\x01 \x03(\x0b\x32\x0b.rag.DocRef\"5\n\x10\x42\x61tchSearchQuery\x12!\n\x07queries\x18\x01 \x03(\x0b\x32\x10.rag.SearchQuery\"5\n\x10\x42\x61tchSearchReply\x12!\n\x07replies\x18\x01 \x03(\x0b\x32\x10.rag.SearchReply\"2\n\x0eSnippetRequest\x12\x10\n\x08point_id\x18\x01 \x01(\t\x12\x0e\n\x06radius\x18\x02 \x01(\x05\"\x1c\n\x0cSnippetReply\x12\x0c\n\x04text\x18\x01 \x01(\t2\xb6\x01\n\nRagService\x12\x32\n\x0cHybridSearch\x12\x10.rag.SearchQuery\x1a\x10.rag.SearchReply\x12\x41\n\x11\x42\x61tchHybridSearch\x12\x15.rag.BatchSearchQuery\x1a\x15.rag.BatchSearchReply\x12\x31\n\x07Snippet\x12\x13.rag.SnippetRequest\x1a\x11.rag.SnippetReplyb\x06proto3')
 
 _globals = globals()
 _builder.BuildMessageAndEnumDescriptors(DESCRIPTOR, _globals)
@@ -37,10 +37,14 @@ if not _descriptor._USE_C_DESCRIPTORS:
   _globals['_DOCREF']._serialized_end=132
   _globals['_SEARCHREPLY']._serialized_start=134
   _globals['_SEARCHREPLY']._serialized_end=177
-  _globals['_SNIPPETREQUEST']._serialized_start=179
-  _globals['_SNIPPETREQUEST']._serialized_end=229
-  _globals['_SNIPPETREPLY']._serialized_start=231
-  _globals['_SNIPPETREPLY']._serialized_end=259
-  _globals['_RAGSERVICE']._serialized_start=261
-  _globals['_RAGSERVICE']._serialized_end=376
+  _globals['_BATCHSEARCHQUERY']._serialized_start=179
+  _globals['_BATCHSEARCHQUERY']._serialized_end=232
+  _globals['_BATCHSEARCHREPLY']._serialized_start=234
+  _globals['_BATCHSEARCHREPLY']._serialized_end=287
+  _globals['_SNIPPETREQUEST']._serialized_start=289
+  _globals['_SNIPPETREQUEST']._serialized_end=339
+  _globals['_SNIPPETREPLY']._serialized_start=341
+  _globals['_SNIPPETREPLY']._serialized_end=369
+  _globals['_RAGSERVICE']._serialized_start=372
+  _globals['_RAGSERVICE']._serialized_end=554
 # @@protoc_insertion_point(module_scope)
@@ -39,6 +39,11 @@ class RagServiceStub(object):
                 request_serializer=rag__pb2.SearchQuery.SerializeToString,
                 response_deserializer=rag__pb2.SearchReply.FromString,
                 _registered_method=True)
+        self.BatchHybridSearch = channel.unary_unary(
+                '/rag.RagService/BatchHybridSearch',
+                request_serializer=rag__pb2.BatchSearchQuery.SerializeToString,
+                response_deserializer=rag__pb2.BatchSearchReply.FromString,
+                _registered_method=True)
         self.Snippet = channel.unary_unary(
                 '/rag.RagService/Snippet',
                 request_serializer=rag__pb2.SnippetRequest.SerializeToString,
@@ -55,6 +60,12 @@ class RagServiceServicer(object):
         context.set_details('Method not implemented!')
         raise NotImplementedError('Method not implemented!')
 
+    def BatchHybridSearch(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
     def Snippet(self, request, context):
         """Missing associated documentation comment in .proto file."""
         context.set_code(grpc.StatusCode.UNIMPLEMENTED)
@@ -69,6 +80,11 @@ def add_RagServiceServicer_to_server(servicer, server):
                     request_deserializer=rag__pb2.SearchQuery.FromString,
                     response_serializer=rag__pb2.SearchReply.SerializeToString,
             ),
+            'BatchHybridSearch': grpc.unary_unary_rpc_method_handler(
+                    servicer.BatchHybridSearch,
+                    request_deserializer=rag__pb2.BatchSearchQuery.FromString,
+                    response_serializer=rag__pb2.BatchSearchReply.SerializeToString,
+            ),
             'Snippet': grpc.unary_unary_rpc_method_handler(
                     servicer.Snippet,
                     request_deserializer=rag__pb2.SnippetRequest.FromString,
@@ -112,6 +128,33 @@ class RagService(object):
             metadata,
             _registered_method=True)
 
+    @staticmethod
+    def BatchHybridSearch(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/rag.RagService/BatchHybridSearch',
+            rag__pb2.BatchSearchQuery.SerializeToString,
+            rag__pb2.BatchSearchReply.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
     @staticmethod
     def Snippet(request,
             target,
@@ -1,29 +1,57 @@
 from fastapi import FastAPI, HTTPException, Query
-from .vector import search_dense
-from .bm25 import bm25_search, db
+from pydantic import BaseModel, Field
+from .vector import search_dense, search_dense_batch
+from .bm25 import bm25_search, contents, db, snapshot
 from .embedding import embed
-from prometheus_client import make_asgi_app, Counter
+from prometheus_client import make_asgi_app, Counter, Histogram
 
 app = FastAPI(title="RAG Service")
 SEARCH_QPS = Counter("rag_search_total","search calls")
+BATCH_SIZE = Histogram("rag_search_batch_size","queries per batch search",
+                       buckets=(1, 2, 4, 8, 16, 32, 64, 128))
+MAX_BATCH = 256
+
+class SearchQuery(BaseModel):
+    q: str
+    k: int = 8
+    alpha: float = 0.25
+
+class BatchSearch(BaseModel):
+    queries: list[SearchQuery] = Field(..., max_length=MAX_BATCH)
+
+def _fuse(dense, sparse, k, alpha):
+    scores = {}
+    for p in dense: scores[p.id] = alpha * p.score
+    for row in sparse:
+        scores[row["point_id"]] = scores.get(row["point_id"],0) + (1-alpha)/row["score"]
+    return [pid for pid,_ in sorted(scores.items(), key=lambda x: -x[1])[:k]]
 
 @app.get("/search")
 async def http_search(q: str = Query(...), k: int = 8, alpha: float = 0.25):
     SEARCH_QPS.inc()
     dense = search_dense(embed([q])[0], k*2)
     sparse = bm25_search(q, k*2)
-    # fuse
-    scores = {}
-    for p in dense: scores[p.id] = alpha * p.score
-    for row in sparse:
-        scores[row["point_id"]] = scores.get(row["point_id"],0) + (1-alpha)/row["score"]
-    top = sorted(scores.items(), key=lambda x: -x[1])[:k]
     results = []
-    for pid,_ in top:
+    for pid in _fuse(dense, sparse, k, alpha):
         snippet = db["fts"].get(pid)["content"][:200]
         results.append({"point_id": pid, "snippet": snippet})
     return {"results": results}
 
+@app.post("/search/batch")
+async def http_search_batch(req: BatchSearch):
+    """Many /search queries at once: one embedding pass, one Qdrant batch, one FTS transaction."""
+    qs = req.queries
+    SEARCH_QPS.inc(len(qs))
+    BATCH_SIZE.observe(len(qs))
+    if not qs:
+        return {"replies": []}
+    dense = search_dense_batch(embed([x.q for x in qs]), [x.k*2 for x in qs])
+    with snapshot():
+        tops = [_fuse(hits, bm25_search(x.q, x.k*2), x.k, x.alpha) for x, hits in zip(qs, dense)]
+        text = contents(pid for top in tops for pid in top)
+    return {"replies": [{"results": [{"point_id": pid, "snippet": text[pid][:200]} for pid in top]}
+                        for top in tops]}
+
 @app.get("/snippet/{point_id}")
 async def http_snippet(point_id: int, radius: int = 20):
     rec = db["fts"].get(point_id)
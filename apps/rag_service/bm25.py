@@ -1,4 +1,5 @@
 import sqlite_utils, os
+from contextlib import contextmanager
 DB_PATH = os.getenv("RAG_SQLITE_PATH","bm25.db")
 db = sqlite_utils.Database(DB_PATH)
 if "fts" not in db.table_names():
@@ -14,4 +15,26 @@ def add_bm25_records(rows):
 def bm25_search(query, k):
     return list(db.query(
         "SELECT point_id, bm25(fts) AS score, snippet(fts,0,'>','<','…',10) AS snip "
-        "FROM fts WHERE fts MATCH ? ORDER BY score LIMIT ?", (query, k)))
\ No newline at end of file
+        "FROM fts WHERE fts MATCH ? ORDER BY score LIMIT ?", (query, k)))
+
+@contextmanager
+def snapshot():
+    """One read transaction: every query inside sees the same index state.
+
+    A savepoint rather than BEGIN, so it also nests inside a transaction the
+    connection already has open."""
+    db.execute("SAVEPOINT bm25_snapshot")
+    try:
+        yield
+    except BaseException:
+        db.execute("ROLLBACK TO bm25_snapshot")
+        raise
+    finally:
+        db.execute("RELEASE bm25_snapshot")
+
+def contents(point_ids):
+    ids = list(set(point_ids))
+    if not ids:
+        return {}
+    return {r["point_id"]: r["content"] for r in db.query(
+        f"SELECT point_id, content FROM fts WHERE point_id IN ({','.join('?' * len(ids))})", ids)}
\ No newline at end of file
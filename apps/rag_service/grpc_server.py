@@ -4,7 +4,7 @@ from concurrent import futures
 import sys
 sys.path.append('.')
 from proto import rag_pb2, rag_pb2_grpc
-from .api import http_search, http_snippet
+from .api import http_search, http_search_batch, http_snippet, BatchSearch, SearchQuery
 
 class RagServiceServicer(rag_pb2_grpc.RagServiceServicer):
     async def HybridSearch(self, request, context):
@@ -21,6 +21,19 @@ class RagServiceServicer(rag_pb2_grpc.RagServiceServicer):
             return reply
         except Exception as e:
             context.abort(grpc.StatusCode.INTERNAL, str(e))
+
+    async def BatchHybridSearch(self, request, context):
+        try:
+            req = BatchSearch(queries=[SearchQuery(q=q.query, k=q.k, alpha=q.alpha) for q in request.queries])
+            result = await http_search_batch(req)
+            reply = rag_pb2.BatchSearchReply()
+            for r in result["replies"]:
+                one = reply.replies.add()
+                for hit in r["results"]:
+                    one.results.add(point_id=str(hit["point_id"]), snippet=hit["snippet"], score=0.0)
+            return reply
+        except Exception as e:
+            context.abort(grpc.StatusCode.INTERNAL, str(e))
     
     async def Snippet(self, request, context):
         try:
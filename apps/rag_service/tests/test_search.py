@@ -28,4 +28,16 @@ async def test_search_flow(tmp_path):
     ingest_git_commit(sha, repo)
     async with httpx.AsyncClient(base_url="http://localhost:8000") as c:
         r = await c.get("/search", params={"q":"greet", "k":3})
-        assert r.json()["results"]
\ No newline at end of file
+        assert r.json()["results"]
+
+@pytest.mark.asyncio
+@pytest.mark.skipif(not qdrant_available(), reason="Qdrant not available")
+async def test_batch_search_matches_single():
+    async with httpx.AsyncClient(base_url="http://localhost:8000") as c:
+        qs = [{"q": "greet", "k": 3}, {"q": "print", "k": 2}]
+        r = await c.post("/search/batch", json={"queries": qs})
+        replies = r.json()["replies"]
+        assert len(replies) == 2
+        for q, reply in zip(qs, replies):
+            single = (await c.get("/search", params=q)).json()
+            assert reply["results"] == single["results"]
@@ -22,4 +22,10 @@ def upsert_vectors(ids, vectors, payloads):
 
 def search_dense(query_vec, k):
     hits = client.search(COLL, query_vector=query_vec, limit=k)
-    return hits  # id, score
\ No newline at end of file
+    return hits  # id, score
+
+def search_dense_batch(query_vecs, ks):
+    """One Qdrant round trip for many queries; a hit list per query, in order."""
+    return client.search_batch(COLL, requests=[
+        qmodels.SearchRequest(vector=v, limit=k) for v, k in zip(query_vecs, ks)
+    ])
\ No newline at end of file
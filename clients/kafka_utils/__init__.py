@@ -1,2 +1,4 @@
 from .producer import send            as produce
-from .consumer import AsyncConsumer   as subscribe
\ No newline at end of file
+from .producer import get_producer
+from .consumer import AsyncConsumer   as subscribe
+from .runtime  import serve
\ No newline at end of file
@@ -0,0 +1,24 @@
+"""Kafka client implementation used by kafka_utils and the raw-consumer services.
+
+KAFKA_BACKEND=confluent (default) is librdkafka via confluent_kafka;
+KAFKA_BACKEND=memory is the in-process broker in `memory`, for tests and
+single-process benchmarks.  `use()` switches at runtime; clients created
+afterwards pick up the new implementation.
+"""
+import os
+
+_NAMES = ("Producer", "Consumer", "TopicPartition", "KafkaError", "KafkaException")
+
+def use(name:str):
+    if name == "memory":
+        from . import memory as impl
+    elif name == "confluent":
+        import confluent_kafka as impl
+    else:
+        raise ValueError(f"unknown KAFKA_BACKEND {name!r}")
+    g = globals()
+    for n in _NAMES:
+        g[n] = getattr(impl, n)
+    g["name"] = name
+
+use(os.getenv("KAFKA_BACKEND", "confluent"))
@@ -1,13 +1,24 @@
 from __future__ import annotations
 import orjson, inspect, typing as _t
 from google.protobuf.message import Message as _Proto
+from .registry import message_type
 
 def encode(obj) -> bytes:
+    if isinstance(obj, (bytes, bytearray, memoryview)):
+        return obj                  # already serialized (e.g. forwarded as-is)
     if isinstance(obj, _Proto):
         return obj.SerializeToString()
     return orjson.dumps(obj)
 
-def decode(data:bytes, cls:_t.Type) -> object:
+def decode(data:bytes|memoryview, cls:_t.Type|None=None, topic:str|None=None) -> object:
+    """Parse `data` once into `cls`, or the registered type for `topic`.
+
+    `data` may be a memoryview over a larger buffer; both protobuf and orjson
+    read it in place, so no intermediate bytes copy is made.  Without a proto
+    type the payload is treated as JSON.
+    """
+    if cls is None and topic is not None:
+        cls = message_type(topic)
     if inspect.isclass(cls) and issubclass(cls, _Proto):
-        msg = cls(); msg.ParseFromString(data); return msg
-    return orjson.loads(data)
\ No newline at end of file
+        return cls.FromString(data)
+    return orjson.loads(data)
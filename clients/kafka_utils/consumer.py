@@ -1,28 +1,363 @@
-import os, asyncio, confluent_kafka, inspect
+import os, asyncio, threading, concurrent.futures, inspect, logging, time
+from typing import NamedTuple
+from . import backend, tracing
 from .codec import decode
-from .metrics import CONS_CNT
+from .registry import message_type
+from .metrics import CONS_CNT, BATCH_SIZE, LAG
 
 _BOOT=os.getenv("KAFKA_BOOTSTRAP","kafka:9092")
+_BATCH=int(os.getenv("KAFKA_CONSUME_BATCH","100"))      # max messages per consume()
+_QUEUE=int(os.getenv("KAFKA_CONSUME_QUEUE","4"))        # batches buffered ahead of the handler
+_TIMEOUT=float(os.getenv("KAFKA_CONSUME_TIMEOUT","0.5"))
+_COMMIT=os.getenv("KAFKA_COMMIT_MODE","batched")        # batched | after | auto (loses in-flight work on a crash)
+_COMMIT_EVERY=int(os.getenv("KAFKA_COMMIT_EVERY","100"))
+_COMMIT_MS=int(os.getenv("KAFKA_COMMIT_MS","1000"))
+_CONCURRENCY=int(os.getenv("KAFKA_CONCURRENCY","8"))     # handlers running at once
+_PAUSE_HIGH=int(os.getenv("KAFKA_PAUSE_HIGH","100"))     # in-flight records per partition before pause()
+_PAUSE_LOW=int(os.getenv("KAFKA_PAUSE_LOW","20"))        # ... and before resume()
+_DRAIN_TIMEOUT=float(os.getenv("KAFKA_DRAIN_TIMEOUT","30"))
+
+log = logging.getLogger("kafka-utils.consumer")
+
+_STOP = object()
+
+class Record(NamedTuple):
+    topic: str
+    value: object
+    partition: int
+    offset: int
+    key: bytes|None = None
+    trace: str|None = None
+
+class _Partition:
+    """Dispatch state for one assigned partition."""
+    __slots__ = ("inflight", "high", "committed", "tasks", "paused")
+
+    def __init__(self):
+        self.inflight: set[int] = set()     # offsets dispatched but not finished
+        self.high = -1                      # highest offset dispatched
+        self.committed = -1                 # next offset already handed to commit
+        self.tasks: set[asyncio.Task] = set()
+        self.paused = False
+
+    def finish(self, offset:int) -> int|None:
+        """Mark `offset` handled; return the new commit position if it advanced.
+
+        Keys may complete out of offset order inside a partition, so only the
+        contiguous prefix of finished offsets is committable.
+        """
+        self.inflight.discard(offset)
+        pos = min(self.inflight) if self.inflight else self.high + 1
+        if pos > self.committed:
+            self.committed = pos
+            return pos
+        return None
 
 class AsyncConsumer:
-    def __init__(self, group:str, topics:list[str], proto_map:dict[str,object]|None=None):
-        self._c = confluent_kafka.Consumer({
+    """Kafka consumer whose blocking `consume()` runs on a dedicated thread.
+
+    Decoded batches travel to the event loop through a bounded queue: when the
+    handler falls behind, the poll thread blocks on the full queue instead of
+    buffering without limit.  Iterate `batches()` for lists of (topic, obj), or
+    the consumer itself for one message at a time.  Payloads are parsed once,
+    into the `proto_map` type for the topic or else the one registered in
+    `registry` (JSON for unregistered topics).
+
+    `process(handler)` gives at-least-once handling: up to `concurrency`
+    handlers run at once, records sharing an ordering key (the partition by
+    default) run strictly in order, and a partition is paused while too many
+    of its records are in flight.  Offsets are committed only after the
+    handler returns -- synchronously per record (commit="after") or
+    asynchronously every `commit_every` records / `commit_ms`
+    (commit="batched", the default).  On rebalance, in-flight work for revoked partitions
+    is drained and committed before the partitions are released.
+    """
+    def __init__(self, group:str, topics:list[str], proto_map:dict[str,object]|None=None,
+                 batch_size:int=_BATCH, queue_size:int=_QUEUE, commit:str=_COMMIT,
+                 commit_every:int=_COMMIT_EVERY, commit_ms:int=_COMMIT_MS):
+        if commit not in ("auto", "after", "batched"):
+            raise ValueError(f"unknown commit mode {commit!r}")
+        self._c = backend.Consumer({
             "bootstrap.servers":_BOOT,
             "group.id": group,
-            "auto.offset.reset":"earliest"})
-        self._c.subscribe(topics)
+            "auto.offset.reset":"earliest",
+            "enable.auto.commit": commit == "auto"})
+        self._c.subscribe(topics, on_assign=self._on_assign, on_revoke=self._on_revoke)
+        tracing.set_origin(group)
         self._proto_map = proto_map or {}
+        self._types: dict[str, type] = {}          # topic -> payload type, resolved once
+        self._group = group
+        self._batch_size = batch_size
+        self._queue_size = queue_size
+        self._commit = commit
+        self._commit_every = commit_every
+        self._commit_ms = commit_ms
+        self._q: asyncio.Queue|None = None
+        self._thread: threading.Thread|None = None
+        self._stop = threading.Event()
+        self._loop: asyncio.AbstractEventLoop|None = None
+        self._assigned: frozenset|None = None      # None until the first assignment
+        self._parts: dict[tuple, _Partition] = {}
+        self._tails: dict[object, asyncio.Task] = {}   # ordering key -> last task for that key
+        self._pending: dict[tuple, int] = {}       # tp -> next offset to commit
+        self._commit_lock = asyncio.Lock()
+        self._uncommitted = 0
+        self._last_commit = time.monotonic()
+        self._error: asyncio.Future|None = None
+        self._processing: asyncio.Future|None = None
 
-    async def __aiter__(self):
-        while True:
-            msg = self._c.poll(0.3)
-            if not msg:
-                await asyncio.sleep(0.1); continue
-            if msg.error():
-                if msg.error().code() == confluent_kafka.KafkaError._PARTITION_EOF:
+    # -- poll thread ---------------------------------------------------------
+    def _decode_batch(self, msgs) -> list[Record]:
+        out, last = [], {}
+        for msg in msgs:
+            err = msg.error()
+            if err:
+                if err.code() == backend.KafkaError._PARTITION_EOF:
                     continue
-                raise RuntimeError(msg.error())
+                raise RuntimeError(err)
             topic = msg.topic()
-            cls = self._proto_map.get(topic, dict)
             CONS_CNT.labels(topic).inc()
-            yield topic, decode(msg.value(), cls)
\ No newline at end of file
+            cls = self._types.get(topic)
+            if cls is None:
+                cls = self._types[topic] = self._proto_map.get(topic) or message_type(topic) or dict
+            out.append(Record(topic, decode(msg.value(), cls),
+                              msg.partition(), msg.offset(), msg.key(),
+                              tracing.observe(topic, msg.headers()).get(tracing.TRACE)))
+            last[(topic, msg.partition())] = msg.offset()
+        self._record_lag(last)
+        return out
+
+    def _record_lag(self, last:dict):
+        for (topic, part), off in last.items():
+            try:
+                # cached=True reads the watermark from the last fetch response: no broker round trip
+                _, high = self._c.get_watermark_offsets(
+                    backend.TopicPartition(topic, part), cached=True)
+            except Exception:
+                continue
+            if high is not None and high >= 0:
+                LAG.labels(topic, str(part)).set(max(high - off - 1, 0))
+
+    def _on_assign(self, consumer, partitions):
+        self._assigned = (self._assigned or frozenset()) | {(p.topic, p.partition) for p in partitions}
+
+    def _on_revoke(self, consumer, partitions):
+        revoked = {(p.topic, p.partition) for p in partitions}
+        self._assigned = (self._assigned or frozenset()) - revoked
+        if self._loop is None or self._commit == "auto":
+            return
+        # runs inside consume() on the poll thread: block until the loop has
+        # finished in-flight work, then commit before the partitions move
+        fut = asyncio.run_coroutine_threadsafe(self._drain(revoked), self._loop)
+        try:
+            offsets = fut.result(timeout=_DRAIN_TIMEOUT)
+        except Exception as e:
+            log.warning("drain on revoke failed: %s", e); return
+        if offsets:
+            try:
+                consumer.commit(offsets=offsets, asynchronous=False)
+            except Exception as e:
+                log.warning("commit on revoke failed: %s", e)
+
+    def _put(self, loop, item) -> bool:
+        fut = asyncio.run_coroutine_threadsafe(self._q.put(item), loop)
+        while not self._stop.is_set():
+            try:
+                fut.result(timeout=_TIMEOUT); return True
+            except concurrent.futures.TimeoutError:
+                continue            # queue full: backpressure, keep waiting
+        fut.cancel(); return False
+
+    def _run(self, loop):
+        try:
+            while not self._stop.is_set():
+                msgs = self._c.consume(num_messages=self._batch_size, timeout=_TIMEOUT)
+                if not msgs:
+                    continue
+                batch = self._decode_batch(msgs)
+                if not batch:
+                    continue
+                BATCH_SIZE.labels(self._group).observe(len(batch))
+                if not self._put(loop, batch):
+                    break
+        except Exception as e:
+            self._put(loop, e)
+        finally:
+            if not self._stop.is_set():
+                self._put(loop, _STOP)
+
+    def _start(self):
+        if self._thread is None:
+            self._loop = asyncio.get_running_loop()
+            self._q = asyncio.Queue(maxsize=self._queue_size)
+            self._thread = threading.Thread(
+                target=self._run, args=(self._loop,),
+                name=f"kafka-consume-{self._group}", daemon=True)
+            self._thread.start()
+
+    # -- async side ----------------------------------------------------------
+    async def _records(self):
+        self._start()
+        while True:
+            item = await self._q.get()
+            if item is _STOP:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+
+    async def batches(self):
+        async for batch in self._records():
+            yield [(r.topic, r.value) for r in batch]
+
+    async def __aiter__(self):
+        async for batch in self._records():
+            for r in batch:
+                yield r.topic, r.value
+
+    # -- at-least-once processing ------------------------------------------
+    def _offsets(self, tps) -> list:
+        return [backend.TopicPartition(t, p, self._pending.pop((t, p)))
+                for t, p in tps if (t, p) in self._pending]
+
+    async def _done(self, tp:tuple, pos:int):
+        if self._commit == "auto":
+            return
+        self._pending[tp] = pos
+        if self._commit == "after":
+            # serialised so a slower commit can never land after a newer position
+            async with self._commit_lock:
+                offsets = self._offsets([tp])
+                if offsets:
+                    await asyncio.to_thread(self._c.commit, offsets=offsets, asynchronous=False)
+            return
+        self._uncommitted += 1
+        if self._uncommitted >= self._commit_every:
+            self._flush()
+
+    def _flush(self):
+        offsets = self._offsets(list(self._pending))
+        self._uncommitted = 0
+        self._last_commit = time.monotonic()
+        if offsets:
+            self._c.commit(offsets=offsets, asynchronous=True)
+
+    async def _flusher(self):
+        while True:
+            await asyncio.sleep(self._commit_ms / 1000)
+            if self._pending and time.monotonic() - self._last_commit >= self._commit_ms / 1000:
+                self._flush()
+
+    def _fail(self, e:Exception):
+        if self._error is not None and not self._error.done():
+            self._error.set_exception(e)
+
+    def _pause(self, tp:tuple, st:_Partition, pause:bool):
+        st.paused = pause
+        tps = [backend.TopicPartition(*tp)]
+        try:
+            self._c.pause(tps) if pause else self._c.resume(tps)
+        except Exception as e:            # partition may have been revoked meanwhile
+            log.debug("pause/resume %s failed: %s", tp, e)
+
+    async def _handle(self, r:Record, tp:tuple, st:_Partition, prev, gate, handler):
+        if prev is not None:
+            await asyncio.wait({prev})      # same key: strictly after the previous record
+        tracing.set_current(r.trace)       # task-local: records produced by the handler inherit it
+        async with gate:
+            await handler(r.topic, r.value)
+        pos = st.finish(r.offset)
+        if st.paused and len(st.inflight) <= _PAUSE_LOW and self._parts.get(tp) is st:
+            self._pause(tp, st, False)
+        if pos is not None:
+            await self._done(tp, pos)
+
+    def _dispatch(self, r:Record, handler, gate, key):
+        tp = (r.topic, r.partition)
+        st = self._parts.get(tp)
+        if st is None:
+            st = self._parts[tp] = _Partition()
+        st.inflight.add(r.offset)
+        st.high = max(st.high, r.offset)
+        k = key(r.topic, r.value) if key else tp
+        task = asyncio.ensure_future(self._handle(r, tp, st, self._tails.get(k), gate, handler))
+        self._tails[k] = task
+        st.tasks.add(task)
+
+        def _finished(t, k=k):
+            st.tasks.discard(t)
+            if self._tails.get(k) is t:
+                del self._tails[k]
+            if not t.cancelled() and t.exception() is not None:
+                self._fail(t.exception())
+        task.add_done_callback(_finished)
+        if not st.paused and len(st.inflight) >= _PAUSE_HIGH:
+            self._pause(tp, st, True)
+
+    async def _drain(self, tps) -> list:
+        for tp in tps:
+            st = self._parts.pop(tp, None)
+            if st is not None and st.tasks:
+                await asyncio.wait(set(st.tasks))
+        return self._offsets(tps)
+
+    async def process(self, handler, concurrency:int=_CONCURRENCY, key=None):
+        """Run `await handler(topic, obj)` for every record until the stream ends.
+
+        `key(topic, obj)` picks the ordering key (e.g. a plan id); records with
+        equal keys never overlap.  Without it ordering is per partition.
+        """
+        self._start()
+        self._error = self._loop.create_future()
+        self._processing = self._loop.create_future()
+        gate = asyncio.Semaphore(concurrency)
+        flusher = asyncio.ensure_future(self._flusher()) if self._commit == "batched" else None
+        records = self._records().__aiter__()
+        nxt = None
+        try:
+            while True:
+                nxt = asyncio.ensure_future(records.__anext__())
+                await asyncio.wait({nxt, self._error}, return_when=asyncio.FIRST_COMPLETED)
+                if self._error.done():
+                    nxt.cancel()
+                    self._error.result()
+                try:
+                    batch = nxt.result()
+                except StopAsyncIteration:
+                    break
+                for r in batch:
+                    if self._assigned is not None and (r.topic, r.partition) not in self._assigned:
+                        continue            # revoked while buffered; the new owner re-reads it
+                    self._dispatch(r, handler, gate, key)
+        finally:
+            if nxt is not None and not nxt.done():
+                nxt.cancel()            # cancelled while waiting for the next batch
+            if flusher:
+                flusher.cancel()
+            try:
+                if self._error.done():
+                    for st in self._parts.values():
+                        for t in st.tasks:
+                            t.cancel()
+                else:
+                    offsets = await self._drain(list(self._parts))
+                    if self._error.done():
+                        self._error.result()
+                    if offsets:
+                        await asyncio.to_thread(self._c.commit, offsets=offsets, asynchronous=False)
+            finally:
+                self._processing.set_result(None)
+
+    async def close(self):
+        self._stop.set()
+        if self._thread is not None:
+            await asyncio.to_thread(self._thread.join)
+            # buffered batches are uncommitted and will be redelivered; end the iterators
+            while self._q.full():
+                self._q.get_nowait()
+            self._q.put_nowait(_STOP)
+        if self._processing is not None:
+            # let process() drain its workers and commit before the client goes away
+            await asyncio.wait({self._processing})
+        # off the loop: close() fires the revoke callback, which needs the loop to drain
+        await asyncio.to_thread(self._c.close)
@@ -0,0 +1,339 @@
+"""In-process Kafka stand-in, selected with KAFKA_BACKEND=memory.
+
+Implements the slice of the confluent_kafka Producer/Consumer API that this
+repo uses: keyed partitioning, consumer groups with eager rebalancing,
+committed offsets, pause/resume and watermarks.  There is one broker per
+process, so every stage of a test or benchmark has to run in the same
+interpreter; `reset()` starts from an empty broker.
+"""
+from __future__ import annotations
+import itertools, os, threading, time, zlib
+from collections import deque
+
+_PARTITIONS = int(os.getenv("KAFKA_MEMORY_PARTITIONS", "3"))
+
+OFFSET_BEGINNING = -2
+OFFSET_END = -1
+OFFSET_INVALID = -1001
+TIMESTAMP_CREATE_TIME = 1
+
+class KafkaError:
+    _PARTITION_EOF = -191
+    _STATE = -172
+
+    def __init__(self, code:int, reason:str=""):
+        self._code, self._reason = code, reason
+
+    def code(self) -> int:
+        return self._code
+
+    def str(self) -> str:
+        return self._reason
+
+    def __repr__(self):
+        return f"KafkaError({self._code}, {self._reason!r})"
+
+class KafkaException(Exception):
+    pass
+
+class TopicPartition:
+    __slots__ = ("topic", "partition", "offset")
+
+    def __init__(self, topic:str, partition:int=-1, offset:int=OFFSET_INVALID):
+        self.topic, self.partition, self.offset = topic, partition, offset
+
+    def __eq__(self, other):
+        return (self.topic, self.partition, self.offset) == (other.topic, other.partition, other.offset)
+
+    def __hash__(self):
+        return hash((self.topic, self.partition))
+
+    def __repr__(self):
+        return f"TopicPartition({self.topic!r}, {self.partition}, {self.offset})"
+
+class Message:
+    __slots__ = ("_topic", "_partition", "_offset", "_key", "_value", "_headers", "_ts")
+
+    def __init__(self, topic, partition, offset, key, value, headers, ts):
+        self._topic, self._partition, self._offset = topic, partition, offset
+        self._key, self._value, self._headers, self._ts = key, value, headers, ts
+
+    def topic(self): return self._topic
+    def partition(self): return self._partition
+    def offset(self): return self._offset
+    def key(self): return self._key
+    def value(self): return self._value
+    def headers(self): return self._headers
+    def timestamp(self): return (TIMESTAMP_CREATE_TIME, self._ts)
+    def error(self): return None
+    def __len__(self): return len(self._value or b"")
+
+def _bytes(v) -> bytes|None:
+    if v is None or isinstance(v, bytes):
+        return v
+    return v.encode() if isinstance(v, str) else bytes(v)
+
+class _Group:
+    __slots__ = ("members", "committed", "generation")
+
+    def __init__(self):
+        self.members: list[Consumer] = []
+        self.committed: dict[tuple, int] = {}
+        self.generation = 0
+
+class Broker:
+    def __init__(self, partitions:int=_PARTITIONS):
+        self.partitions = partitions
+        self.cond = threading.Condition()
+        self.topics: dict[str, list[list[Message]]] = {}
+        self.groups: dict[str, _Group] = {}
+        self._rr = itertools.count()
+
+    def _topic(self, name:str) -> list[list[Message]]:
+        parts = self.topics.get(name)
+        if parts is None:
+            parts = self.topics[name] = [[] for _ in range(self.partitions)]
+        return parts
+
+    def append(self, topic:str, partition:int, key, value, headers) -> Message:
+        with self.cond:
+            parts = self._topic(topic)
+            if partition < 0:
+                partition = (zlib.crc32(key) if key is not None else next(self._rr)) % len(parts)
+            log = parts[partition]
+            msg = Message(topic, partition, len(log), key, value, headers, int(time.time() * 1000))
+            log.append(msg)
+            self.cond.notify_all()
+        return msg
+
+    def join(self, group:str, member:"Consumer"):
+        with self.cond:
+            for t in member._topics:
+                self._topic(t)
+            g = self.groups.setdefault(group, _Group())
+            if member not in g.members:
+                g.members.append(member)
+            g.generation += 1
+            self.cond.notify_all()
+
+    def leave(self, group:str, member:"Consumer"):
+        with self.cond:
+            g = self.groups.get(group)
+            if g is not None and member in g.members:
+                g.members.remove(member)
+                g.generation += 1
+                self.cond.notify_all()
+
+    def assignment(self, group:str, member:"Consumer") -> tuple[int, list[tuple]]:
+        """Round-robin each subscribed topic's partitions over its subscribers."""
+        g = self.groups[group]
+        mine = []
+        for topic in sorted({t for m in g.members for t in m._topics}):
+            subs = [m for m in g.members if topic in m._topics]
+            for p in range(len(self.topics[topic])):
+                if subs[p % len(subs)] is member:
+                    mine.append((topic, p))
+        return g.generation, mine
+
+_broker = Broker()
+
+def broker() -> Broker:
+    return _broker
+
+def reset(partitions:int=_PARTITIONS) -> Broker:
+    global _broker
+    _broker = Broker(partitions)
+    return _broker
+
+class Producer:
+    """Appends synchronously; delivery callbacks fire from poll()/flush() as in librdkafka."""
+
+    def __init__(self, conf:dict|None=None):
+        self._broker = _broker
+        self._reports: deque = deque()
+        self._cond = threading.Condition()
+
+    def produce(self, topic:str, value=None, key=None, partition:int=-1, on_delivery=None,
+                timestamp:int=0, headers=None, callback=None):
+        if isinstance(headers, dict):
+            headers = list(headers.items())
+        headers = [(k, _bytes(v)) for k, v in headers] if headers else None
+        msg = self._broker.append(topic, partition, _bytes(key), _bytes(value), headers)
+        cb = on_delivery or callback
+        if cb is not None:
+            with self._cond:
+                self._reports.append((cb, msg))
+                self._cond.notify()
+
+    def poll(self, timeout:float|None=None) -> int:
+        with self._cond:
+            if not self._reports and timeout:
+                self._cond.wait(timeout if timeout > 0 else None)
+            reports, self._reports = self._reports, deque()
+        for cb, msg in reports:
+            cb(None, msg)
+        return len(reports)
+
+    def flush(self, timeout:float|None=None) -> int:
+        self.poll(0)
+        return 0
+
+    def __len__(self):
+        return len(self._reports)
+
+class Consumer:
+    def __init__(self, conf:dict):
+        self._broker = _broker
+        self._group = conf["group.id"]
+        self._reset = conf.get("auto.offset.reset", "latest")
+        auto = conf.get("enable.auto.commit", True)
+        self._auto_commit = auto if isinstance(auto, bool) else str(auto).lower() == "true"
+        self._topics: list[str] = []
+        self._on_assign = self._on_revoke = None
+        self._gen = -1
+        self._assigned: list[tuple] = []
+        self._pos: dict[tuple, int] = {}
+        self._paused: set[tuple] = set()
+        self._next = 0                      # rotates the partition scan for fairness
+        self._closed = False
+
+    # -- group membership ----------------------------------------------------
+    def subscribe(self, topics:list[str], on_assign=None, on_revoke=None, on_lost=None):
+        self._topics = list(topics)
+        self._on_assign, self._on_revoke = on_assign, on_revoke
+        self._broker.join(self._group, self)
+
+    def _tps(self, parts, offsets=False) -> list[TopicPartition]:
+        return [TopicPartition(t, p, self._pos.get((t, p), OFFSET_INVALID) if offsets else OFFSET_INVALID)
+                for t, p in parts]
+
+    def _rebalance(self):
+        with self._broker.cond:
+            gen, parts = self._broker.assignment(self._group, self)
+        if gen == self._gen:
+            return
+        if self._assigned:
+            if self._auto_commit:
+                self.commit(asynchronous=False)
+            if self._on_revoke:
+                self._on_revoke(self, self._tps(self._assigned))
+        with self._broker.cond:
+            committed = self._broker.groups[self._group].committed
+            self._pos = {}
+            for tp in parts:
+                if tp in committed:
+                    self._pos[tp] = committed[tp]
+                else:
+                    self._pos[tp] = 0 if self._reset in ("earliest", "smallest", "beginning") \
+                        else len(self._broker.topics[tp[0]][tp[1]])
+        self._gen, self._assigned = gen, parts
+        self._paused &= set(parts)
+        if self._on_assign:
+            self._on_assign(self, self._tps(parts))
+
+    # -- fetching ------------------------------------------------------------
+    def _take(self, n:int) -> list[Message]:
+        out, parts = [], self._assigned
+        for i in range(len(parts)):
+            tp = parts[(self._next + i) % len(parts)]
+            if tp in self._paused:
+                continue
+            log = self._broker.topics[tp[0]][tp[1]]
+            pos = self._pos[tp]
+            got = log[pos:pos + n - len(out)]
+            if got:
+                out.extend(got)
+                self._pos[tp] = pos + len(got)
+            if len(out) >= n:
+                break
+        self._next += 1
+        return out
+
+    def consume(self, num_messages:int=1, timeout:float=-1) -> list[Message]:
+        if self._closed:
+            raise RuntimeError("Consumer closed")
+        deadline = time.monotonic() + timeout if timeout is not None and timeout >= 0 else None
+        while True:
+            self._rebalance()
+            with self._broker.cond:
+                out = self._take(num_messages)
+                if out:
+                    if self._auto_commit:
+                        self._store_positions()
+                    return out
+                left = None if deadline is None else deadline - time.monotonic()
+                if left is not None and left <= 0:
+                    return []
+                # wake periodically so a rebalance is noticed without new data
+                self._broker.cond.wait(0.1 if left is None else min(left, 0.1))
+
+    def poll(self, timeout:float|None=None) -> Message|None:
+        msgs = self.consume(1, -1 if timeout is None else timeout)
+        return msgs[0] if msgs else None
+
+    # -- offsets -------------------------------------------------------------
+    def _store_positions(self):
+        committed = self._broker.groups[self._group].committed
+        for tp in self._assigned:
+            committed[tp] = self._pos[tp]
+
+    def commit(self, message=None, offsets=None, asynchronous:bool=True):
+        if message is not None:
+            offsets = [TopicPartition(message.topic(), message.partition(), message.offset() + 1)]
+        with self._broker.cond:
+            if offsets is None:
+                self._store_positions()
+                offsets = self._tps(self._assigned, offsets=True)
+            else:
+                committed = self._broker.groups[self._group].committed
+                for o in offsets:
+                    committed[(o.topic, o.partition)] = o.offset
+        return None if asynchronous else offsets
+
+    def committed(self, partitions, timeout:float|None=None) -> list[TopicPartition]:
+        with self._broker.cond:
+            c = self._broker.groups[self._group].committed
+            return [TopicPartition(p.topic, p.partition, c.get((p.topic, p.partition), OFFSET_INVALID))
+                    for p in partitions]
+
+    def position(self, partitions) -> list[TopicPartition]:
+        return [TopicPartition(p.topic, p.partition, self._pos.get((p.topic, p.partition), OFFSET_INVALID))
+                for p in partitions]
+
+    def get_watermark_offsets(self, partition, timeout:float|None=None, cached:bool=False):
+        with self._broker.cond:
+            return 0, len(self._broker._topic(partition.topic)[partition.partition])
+
+    def assign(self, partitions):
+        """Set the assignment; partitions with an offset >= 0 start there (seek on assign)."""
+        parts = [(p.topic, p.partition) for p in partitions]
+        with self._broker.cond:
+            for p in partitions:
+                if p.offset >= 0:
+                    self._pos[(p.topic, p.partition)] = p.offset
+                elif (p.topic, p.partition) not in self._pos:
+                    self._pos[(p.topic, p.partition)] = 0
+        self._assigned = parts
+
+    def assignment(self) -> list[TopicPartition]:
+        return self._tps(self._assigned)
+
+    def pause(self, partitions):
+        self._paused |= {(p.topic, p.partition) for p in partitions}
+
+    def resume(self, partitions):
+        self._paused -= {(p.topic, p.partition) for p in partitions}
+        with self._broker.cond:
+            self._broker.cond.notify_all()
+
+    def close(self):
+        if self._closed:
+            return
+        if self._assigned:
+            if self._auto_commit:
+                self.commit(asynchronous=False)
+            if self._on_revoke:
+                self._on_revoke(self, self._tps(self._assigned))
+        self._assigned = []
+        self._closed = True
+        self._broker.leave(self._group, self)
@@ -1,5 +1,11 @@
-from prometheus_client import Counter, Histogram
+from prometheus_client import Counter, Gauge, Histogram
 
 PROD_CNT = Counter("kf_messages_produced_total","",["topic"])
 CONS_CNT = Counter("kf_messages_consumed_total","",["topic"])
-LAT      = Histogram("kf_produce_latency_sec","",["topic"])
\ No newline at end of file
+LAT      = Histogram("kf_produce_latency_sec","",["topic"])      # produce() -> delivery report
+PROD_ERR = Counter("kf_produce_errors_total","",["topic"])
+BATCH_SIZE = Histogram("kf_consume_batch_size","",["group"],buckets=(1,5,10,25,50,100,250,500))
+LAG      = Gauge("kf_consumer_lag","",["topic","partition"])
+# enqueued-at header -> picked up by the consumer's poll thread
+QUEUE_LAT = Histogram("kf_queue_latency_sec","",["topic"],
+                      buckets=(.005,.01,.025,.05,.1,.25,.5,1,2.5,5,10,30,60,300))
\ No newline at end of file
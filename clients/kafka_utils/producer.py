@@ -1,21 +1,113 @@
-import os, asyncio, functools, confluent_kafka, time
+import os, asyncio, atexit, concurrent.futures, threading, time
+from . import backend, tracing
 from .codec import encode
-from .metrics import PROD_CNT, LAT
+from .metrics import PROD_CNT, LAT, PROD_ERR
 
 _BOOT=os.getenv("KAFKA_BOOTSTRAP","kafka:9092")
-_producer: confluent_kafka.Producer|None = None
+_PROFILE=os.getenv("KAFKA_PRODUCER_PROFILE","balanced")
+_QUEUE_WAIT=float(os.getenv("KAFKA_QUEUE_FULL_TIMEOUT_SEC","30"))   # give up on a full local queue after this
 
-def _get():
+# librdkafka batching/compression presets; KAFKA_PRODUCER_PROFILE picks one
+PROFILES = {
+    "latency":    {"linger.ms": 1,  "batch.size": 16384,  "compression.type": "lz4"},
+    "balanced":   {"linger.ms": 5,  "batch.size": 65536,  "compression.type": "lz4"},
+    "throughput": {"linger.ms": 25, "batch.size": 524288, "compression.type": "zstd"},
+}
+
+class AsyncProducer:
+    """Shared producer: `produce()` never blocks, delivery resolves a future.
+
+    Records are stamped with trace headers (see `tracing`).  When librdkafka's
+    local queue is full, `produce()` waits for the poll thread to drain it
+    (sleeping the calling thread) and `send()` waits without blocking the
+    event loop; either raises BufferError after `queue_wait` seconds.
+
+    A background thread drives `poll()` so delivery callbacks fire without the
+    caller flushing.  The returned future is a `concurrent.futures.Future`, so
+    synchronous services can attach callbacks and async code can await it
+    through `send()`.
+    """
+    def __init__(self, profile:str=_PROFILE, queue_wait:float=_QUEUE_WAIT, **conf):
+        self._p = backend.Producer({"bootstrap.servers":_BOOT, **PROFILES[profile], **conf})
+        self.queue_wait = queue_wait
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._poll_loop, name="kafka-produce-poll", daemon=True)
+        self._thread.start()
+
+    def _poll_loop(self):
+        while not self._stop.is_set():
+            self._p.poll(0.1)
+
+    def _enqueue(self, topic:str, obj, key, headers):
+        """Build the record; returns its future and a `try_produce()` that is False while the queue is full."""
+        fut: concurrent.futures.Future = concurrent.futures.Future()
+        data = encode(obj)
+        headers = tracing.stamp(obj, headers)
+        t0 = time.perf_counter()
+
+        def _delivered(err, msg):
+            LAT.labels(topic).observe(time.perf_counter()-t0)
+            if err is not None:
+                PROD_ERR.labels(topic).inc()
+                fut.set_exception(backend.KafkaException(err))
+            else:
+                PROD_CNT.labels(topic).inc()
+                fut.set_result(msg)
+
+        def try_produce() -> bool:
+            try:
+                self._p.produce(topic, data, key, headers=headers, on_delivery=_delivered)
+                return True
+            except BufferError:
+                return False
+        return fut, try_produce
+
+    def produce(self, topic:str, obj, key:str|bytes|None=None, headers=None) -> concurrent.futures.Future:
+        fut, try_produce = self._enqueue(topic, obj, key, headers)
+        deadline = time.monotonic() + self.queue_wait
+        while not try_produce():
+            # local queue full: let the poll thread drain delivery reports
+            if time.monotonic() > deadline:
+                raise BufferError(f"producer queue still full after {self.queue_wait}s ({topic})")
+            time.sleep(0.01)
+        return fut
+
+    async def produce_async(self, topic:str, obj, key:str|bytes|None=None, headers=None) -> concurrent.futures.Future:
+        """`produce()` for the event loop: a full queue is waited out with `asyncio.sleep`."""
+        fut, try_produce = self._enqueue(topic, obj, key, headers)
+        deadline = time.monotonic() + self.queue_wait
+        while not try_produce():
+            if time.monotonic() > deadline:
+                raise BufferError(f"producer queue still full after {self.queue_wait}s ({topic})")
+            await asyncio.sleep(0.01)
+        return fut
+
+    async def send(self, topic:str, obj, key:str|bytes|None=None, headers=None):
+        """Produce and wait for the broker acknowledgement."""
+        return await asyncio.wrap_future(await self.produce_async(topic, obj, key, headers))
+
+    def flush(self, timeout:float=10.0) -> int:
+        return self._p.flush(timeout)
+
+    def close(self, timeout:float=10.0):
+        self.flush(timeout)
+        self._stop.set()
+        self._thread.join()
+
+_producer: AsyncProducer|None = None
+_lock = threading.Lock()
+
+def get_producer() -> AsyncProducer:
     global _producer
-    if _producer is None:
-        _producer = confluent_kafka.Producer({"bootstrap.servers":_BOOT})
+    with _lock:
+        if _producer is None:
+            _producer = AsyncProducer()
+            atexit.register(_producer.close)
     return _producer
 
-async def send(topic:str, obj, key:str|None=None):
-    p=_get(); data=encode(obj)
-    loop=asyncio.get_running_loop()
-    t0=time.perf_counter()
-    await loop.run_in_executor(None, p.produce, topic, data, key)
-    p.poll(0)                     # trigger delivery callbacks
-    PROD_CNT.labels(topic).inc()
-    LAT.labels(topic).observe(time.perf_counter()-t0)
\ No newline at end of file
+async def send(topic:str, obj, key:str|None=None, wait:bool=True):
+    """Send via the shared producer; with `wait=False` return the delivery future instead."""
+    fut = await get_producer().produce_async(topic, obj, key)
+    if wait:
+        return await asyncio.wrap_future(fut)
+    return fut
@@ -0,0 +1,48 @@
+"""Topic -> protobuf message type.
+
+Built from `apps.orchestrator.topics.SCHEMAS` and checked against the
+core_contracts descriptor, so a topic whose schema name drifts from the
+.proto fails loudly instead of decoding garbage.  Resolved on first lookup to
+keep `import clients.kafka_utils` free of the generated contracts.
+"""
+from __future__ import annotations
+import logging, threading
+
+log = logging.getLogger("kafka-utils.registry")
+
+_types: dict[str, type] | None = None
+_extra: dict[str, type] = {}
+_lock = threading.Lock()
+
+def _load() -> dict[str, type]:
+    try:
+        from apps.orchestrator.topics import SCHEMAS
+        from apps import core_contracts_pb2 as pb
+    except ImportError as e:                # service image without the contracts
+        log.warning("topic registry unavailable: %s", e)
+        return {}
+    known = pb.DESCRIPTOR.message_types_by_name
+    out = {}
+    for topic, name in SCHEMAS.items():
+        if name not in known:
+            raise LookupError(f"topic {topic}: {name} is not in core_contracts.proto")
+        out[topic] = getattr(pb, name)
+    return out
+
+def register(topic: str, cls: type):
+    """Map a topic outside topics.SCHEMAS (or override one)."""
+    _extra[topic] = cls
+
+def _resolved() -> dict[str, type]:
+    global _types
+    if _types is None:
+        with _lock:
+            if _types is None:
+                _types = _load()
+    return _types
+
+def message_type(topic: str) -> type | None:
+    return _extra.get(topic) or _resolved().get(topic)
+
+def schemas() -> dict[str, type]:
+    return {**_resolved(), **_extra}
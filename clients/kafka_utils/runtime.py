@@ -0,0 +1,19 @@
+from .consumer import AsyncConsumer
+
+async def serve(group:str, topics:list[str], handler, proto_map:dict[str,object]|None=None,
+                concurrency:int|None=None, key=None, **consumer_kw):
+    """Run `await handler(topic, obj)` over `topics` as consumer group `group`.
+
+    Handlers run concurrently up to `concurrency`, records with the same
+    `key(topic, obj)` stay in order, and busy partitions are paused (see
+    AsyncConsumer.process).  Returns when the stream ends; the consumer is
+    closed on the way out, including on cancellation.
+    """
+    c = AsyncConsumer(group, topics, proto_map=proto_map, **consumer_kw)
+    kw = {"key": key}
+    if concurrency is not None:
+        kw["concurrency"] = concurrency
+    try:
+        await c.process(handler, **kw)
+    finally:
+        await c.close()
@@ -1,11 +1,16 @@
 import pytest
-import sys
+import sys, importlib
 from unittest.mock import Mock
 
-# Mock dependencies before importing
-sys.modules['prometheus_client'] = Mock()
-sys.modules['confluent_kafka'] = Mock()
-sys.modules['google.protobuf.message'] = Mock()
+@pytest.fixture(autouse=True)
+def _mock_missing_deps(monkeypatch):
+    # Mock dependencies that are not installed, for these tests only: a Mock
+    # left in sys.modules breaks protobuf for every later test in the run
+    for name in ('prometheus_client', 'confluent_kafka', 'google.protobuf.message'):
+        try:
+            importlib.import_module(name)
+        except ImportError:
+            monkeypatch.setitem(sys.modules, name, Mock())
 
 def test_codec_encode():
     from clients.kafka_utils import codec
@@ -0,0 +1,215 @@
+import asyncio, threading, time
+from collections import namedtuple
+import pytest
+
+TP = namedtuple("TP", "topic partition offset", defaults=[-1])
+
+
+class FakeMsg:
+    def __init__(self, topic, value, partition=0, offset=0, key=None, headers=None):
+        self._t, self._v, self._p, self._o, self._k = topic, value, partition, offset, key
+        self._h = headers
+    def headers(self): return self._h
+    def key(self): return self._k
+    def error(self): return None
+    def topic(self): return self._t
+    def value(self): return self._v
+    def partition(self): return self._p
+    def offset(self): return self._o
+
+
+class FakeKafkaConsumer:
+    def __init__(self, conf):
+        self.conf = conf
+        self.batches = []
+        self.consume_threads = set()
+        self.closed = False
+        self.commits = []
+        self.paused, self.resumed = [], []
+    def pause(self, tps): self.paused += [(t.topic, t.partition) for t in tps]
+    def resume(self, tps): self.resumed += [(t.topic, t.partition) for t in tps]
+    def subscribe(self, topics, on_assign=None, on_revoke=None):
+        self.topics, self.on_assign, self.on_revoke = topics, on_assign, on_revoke
+    def commit(self, offsets=None, asynchronous=True):
+        self.commits.append(sorted((o.topic, o.partition, o.offset) for o in offsets))
+    def consume(self, num_messages=1, timeout=-1):
+        self.consume_threads.add(threading.get_ident())
+        if self.batches:
+            return self.batches.pop(0)[:num_messages]
+        time.sleep(0.01)
+        return []
+    def get_watermark_offsets(self, tp, cached=False): return (0, 10)
+    def close(self): self.closed = True
+
+
+@pytest.fixture
+def fake_kafka(monkeypatch):
+    from clients.kafka_utils import consumer
+    monkeypatch.setattr(consumer.backend, "Consumer", FakeKafkaConsumer)
+    monkeypatch.setattr(consumer.backend, "TopicPartition", TP)
+    return consumer
+
+
+@pytest.mark.asyncio
+async def test_batches_consumed_off_loop(fake_kafka):
+    c = fake_kafka.AsyncConsumer("g", ["t"], batch_size=3)
+    c._c.batches = [[FakeMsg("t", b'{"n": %d}' % i, offset=i) for i in range(5)]]
+    it = c.batches()
+    batch = await asyncio.wait_for(it.__anext__(), 2)
+    assert [o["n"] for _, o in batch] == [0, 1, 2]
+    assert threading.get_ident() not in c._c.consume_threads
+    await c.close()
+    assert c._c.closed
+
+
+@pytest.mark.asyncio
+async def test_bounded_queue_backpressure(fake_kafka):
+    c = fake_kafka.AsyncConsumer("g", ["t"], batch_size=1, queue_size=1)
+    c._c.batches = [[FakeMsg("t", b'{"n": %d}' % i)] for i in range(10)]
+    agen = c.__aiter__()
+    first = await asyncio.wait_for(agen.__anext__(), 2)
+    await asyncio.sleep(0.1)
+    # one batch handed over, one queued, one held by the blocked poll thread
+    assert first == ("t", {"n": 0})
+    assert len(c._c.batches) >= 6
+    await c.close()
+
+
+def _msgs(part, n, start=0):
+    return [FakeMsg("t", b'{"p": %d, "n": %d}' % (part, i), partition=part, offset=i)
+            for i in range(start, start + n)]
+
+
+async def _until(cond, task, timeout=2):
+    """Wait for `cond()`, failing instead of hanging if the consumer dies or stalls."""
+    async def poll():
+        while not cond():
+            if task.done():
+                task.result()                    # surface the consumer's error
+                pytest.fail("consumer stopped early")
+            await asyncio.sleep(0.01)
+    await asyncio.wait_for(poll(), timeout)
+
+
+@pytest.mark.asyncio
+async def test_process_orders_per_partition_and_commits_after(fake_kafka):
+    c = fake_kafka.AsyncConsumer("g", ["t"], commit="after")
+    c._c.batches = [_msgs(0, 3) + _msgs(1, 3)]
+    seen, active, peak = [], set(), [0]
+
+    async def handler(topic, obj):
+        active.add(obj["p"]); peak[0] = max(peak[0], len(active))
+        await asyncio.sleep(0.01)
+        active.discard(obj["p"])
+        seen.append((obj["p"], obj["n"]))
+
+    task = asyncio.ensure_future(c.process(handler))
+    await _until(lambda: len(seen) >= 6, task)
+    await c.close(); await asyncio.wait_for(task, 2)
+    assert [n for p, n in seen if p == 0] == [0, 1, 2]
+    assert [n for p, n in seen if p == 1] == [0, 1, 2]
+    assert peak[0] == 2                          # partitions ran concurrently
+    assert [("t", 0, 3)] in c._c.commits         # committed offset = last processed + 1
+
+
+@pytest.mark.asyncio
+async def test_batched_commit_and_handler_failure(fake_kafka):
+    c = fake_kafka.AsyncConsumer("g", ["t"], commit="batched", commit_every=2, commit_ms=60000)
+    c._c.batches = [_msgs(0, 4)]
+
+    async def handler(topic, obj):
+        if obj["n"] == 3:
+            raise ValueError("bad record")
+
+    with pytest.raises(ValueError):
+        await asyncio.wait_for(c.process(handler), 2)
+    await c.close()
+    # offsets 0-1 committed as one batch; record 3 never committed
+    assert c._c.commits == [[("t", 0, 2)]]
+
+
+@pytest.mark.asyncio
+async def test_revoke_drains_in_flight(fake_kafka):
+    c = fake_kafka.AsyncConsumer("g", ["t"], commit="batched", commit_every=100, commit_ms=60000)
+    c._c.on_assign(c._c, [TP("t", 0)])
+    c._c.batches = [_msgs(0, 2)]
+    started, release = asyncio.Event(), asyncio.Event()
+
+    async def handler(topic, obj):
+        if obj["n"] == 1:
+            started.set(); await release.wait()
+
+    task = asyncio.ensure_future(c.process(handler))
+    await asyncio.wait_for(started.wait(), 2)
+    revoke = asyncio.get_running_loop().run_in_executor(None, c._on_revoke, c._c, [TP("t", 0)])
+    await asyncio.sleep(0.05)
+    assert not revoke.done()                     # blocked on the in-flight record
+    release.set()
+    await asyncio.wait_for(revoke, 2)
+    assert c._c.commits[-1] == [("t", 0, 2)]
+    await c.close(); await asyncio.wait_for(task, 2)
+
+
+@pytest.mark.asyncio
+async def test_key_ordering_concurrency_and_pause(fake_kafka, monkeypatch):
+    monkeypatch.setattr(fake_kafka, "_PAUSE_HIGH", 4)
+    monkeypatch.setattr(fake_kafka, "_PAUSE_LOW", 0)
+    c = fake_kafka.AsyncConsumer("g", ["t"], commit="batched", commit_every=1)
+    # one partition, two interleaved plans
+    c._c.batches = [[FakeMsg("t", b'{"plan": "%s", "n": %d}' % (b"ab"[i % 2:i % 2 + 1], i), offset=i)
+                     for i in range(6)]]
+    seen, running, peak = [], [0], [0]
+
+    async def handler(topic, obj):
+        running[0] += 1; peak[0] = max(peak[0], running[0])
+        await asyncio.sleep(0.02 if obj["plan"] == "a" else 0.001)
+        running[0] -= 1
+        seen.append((obj["plan"], obj["n"]))
+
+    task = asyncio.ensure_future(c.process(handler, concurrency=2, key=lambda t, o: o["plan"]))
+    await _until(lambda: len(seen) >= 6, task)
+    await c.close(); await asyncio.wait_for(task, 2)
+    assert [n for p, n in seen if p == "a"] == [0, 2, 4]
+    assert [n for p, n in seen if p == "b"] == [1, 3, 5]
+    assert peak[0] == 2
+    assert seen.index(("b", 5)) < seen.index(("a", 4))   # b did not wait behind a
+    assert ("t", 0) in c._c.paused and ("t", 0) in c._c.resumed
+    # commit position only follows the contiguous finished prefix
+    assert c._c.commits[-1] == [("t", 0, 6)]
+    positions = [cm[0][2] for cm in c._c.commits]
+    assert positions == sorted(positions)
+
+
+@pytest.mark.asyncio
+async def test_trace_header_reaches_handler(fake_kafka):
+    import time as _time
+    from clients.kafka_utils import tracing
+    enq = str(int(_time.time() * 1000) - 2000).encode()
+    c = fake_kafka.AsyncConsumer("g", ["t"])
+    c._c.batches = [[FakeMsg("t", b'{"n": 1}', headers=[("trace-id", b"abc"), ("enqueued-at", enq)])]]
+    seen = []
+
+    async def handler(topic, obj):
+        seen.append(tracing.current())
+
+    task = asyncio.ensure_future(c.process(handler))
+    await _until(lambda: seen, task)
+    await c.close(); await asyncio.wait_for(task, 2)
+    assert seen == ["abc"]
+    assert tracing.current() is None            # set per handler task only
+
+
+@pytest.mark.asyncio
+async def test_commits_after_handling_by_default(fake_kafka):
+    c = fake_kafka.AsyncConsumer("g", ["t"])
+    assert c._c.conf["enable.auto.commit"] is False      # no offset moves before the handler ran
+    c._c.batches = [_msgs(0, 2)]
+    done = []
+
+    async def handler(topic, obj):
+        done.append(obj["n"])
+
+    task = asyncio.ensure_future(c.process(handler))
+    await _until(lambda: len(done) == 2, task)
+    await c.close(); await asyncio.wait_for(task, 2)
+    assert c._c.commits[-1] == [("t", 0, 2)]
@@ -0,0 +1,87 @@
+import asyncio
+import pytest
+from clients.kafka_utils import memory
+
+
+@pytest.fixture
+def broker():
+    return memory.reset(partitions=2)
+
+
+def _consumer(group="g", auto_commit=True):
+    return memory.Consumer({"group.id": group, "auto.offset.reset": "earliest",
+                            "enable.auto.commit": auto_commit})
+
+
+def test_keyed_partitioning_and_delivery_reports(broker):
+    p = memory.Producer({})
+    acked = []
+    for i in range(6):
+        p.produce("t", b"v%d" % i, key=b"k", headers={"h": "x"}, on_delivery=lambda e, m: acked.append(m))
+    assert p.poll(0) == 6 and not acked[0].error()
+    assert len({m.partition() for m in acked}) == 1            # one key, one partition
+    assert [m.offset() for m in acked] == list(range(6))
+    assert acked[0].headers() == [("h", b"x")]
+
+
+def test_group_splits_partitions_and_resumes_from_commit(broker):
+    p = memory.Producer({})
+    for i in range(10):
+        p.produce("t", b"%d" % i, partition=i % 2)
+    a, b = _consumer(auto_commit=False), _consumer()
+    a.subscribe(["t"]); b.subscribe(["t"])
+    got_a = a.consume(10, timeout=0.2)
+    got_b = b.consume(10, timeout=0.2)
+    assert {m.partition() for m in got_a} | {m.partition() for m in got_b} == {0, 1}
+    assert {m.partition() for m in got_a}.isdisjoint({m.partition() for m in got_b})
+    a.commit(message=got_a[1])
+    a.close()
+    # b takes over a's partition from a's committed offset
+    rest = b.consume(10, timeout=0.3)
+    assert [m.offset() for m in rest] == list(range(2, 5))
+    b.close()
+
+
+def test_pause_and_watermarks(broker):
+    p = memory.Producer({})
+    p.produce("t", b"a", partition=0); p.produce("t", b"b", partition=1)
+    c = _consumer(); c.subscribe(["t"])
+    c.consume(1, timeout=0)                                    # join + assignment
+    c.pause([memory.TopicPartition("t", 0)])
+    assert {m.partition() for m in c.consume(10, timeout=0.1)} <= {1}
+    c.resume([memory.TopicPartition("t", 0)])
+    assert c.get_watermark_offsets(memory.TopicPartition("t", 0)) == (0, 1)
+    c.close()
+
+
+@pytest.mark.asyncio
+async def test_kafka_utils_over_memory_backend(broker, monkeypatch):
+    from clients.kafka_utils import backend, producer, serve
+    monkeypatch.setattr(producer, "_producer", None)
+    for name in backend._NAMES:
+        monkeypatch.setattr(backend, name, getattr(memory, name))
+    seen = []
+
+    async def handler(topic, obj):
+        seen.append(obj["n"])
+
+    task = asyncio.ensure_future(serve("g", ["t"], handler, commit="after"))
+    for i in range(20):
+        await producer.send("t", {"n": i}, key=str(i % 3))
+    while len(seen) < 20:
+        await asyncio.sleep(0.01)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    assert sorted(seen) == list(range(20))
+    assert sum(broker.groups["g"].committed.values()) == 20
+    producer.get_producer().close()
+
+
+def test_bench_flow_end_to_end():
+    import os
+    from scripts.bench_flow import run
+    res = run(n=20, tasks=2)
+    assert res["requests"] == 20 and res["messages"] == 20 * 10
+    # CI can pin a floor to catch throughput regressions
+    assert res["requests_per_s"] >= float(os.getenv("BENCH_FLOW_MIN_RPS", "0"))
@@ -0,0 +1,102 @@
+import asyncio, threading
+import pytest
+
+
+class FakeKafkaProducer:
+    def __init__(self, conf):
+        self.conf = conf
+        self.queue, self.sent, self.headers = [], [], []
+        self.poll_threads = set()
+        self._lock = threading.Lock()
+    def produce(self, topic, value, key=None, headers=None, on_delivery=None):
+        with self._lock:
+            self.queue.append((topic, value, key, on_delivery))
+            self.headers.append(dict(headers or ()))
+    def poll(self, timeout=0):
+        self.poll_threads.add(threading.get_ident())
+        with self._lock:
+            ready, self.queue = self.queue, []
+        for topic, value, key, cb in ready:
+            self.sent.append((topic, value, key))
+            cb(None, (topic, value))
+        if not ready:
+            threading.Event().wait(min(timeout, 0.01))
+        return len(ready)
+    def flush(self, timeout=None):
+        return self.poll(0)
+
+
+@pytest.fixture
+def producer_mod(monkeypatch):
+    from clients.kafka_utils import producer
+    monkeypatch.setattr(producer.backend, "Producer", FakeKafkaProducer)
+    monkeypatch.setattr(producer, "_producer", None)
+    return producer
+
+
+@pytest.mark.asyncio
+async def test_send_resolves_on_delivery(producer_mod):
+    msg = await asyncio.wait_for(producer_mod.send("t", {"a": 1}, key="k"), 2)
+    p = producer_mod.get_producer()
+    assert msg == ("t", b'{"a":1}')
+    assert p._p.sent == [("t", b'{"a":1}', "k")]
+    # callbacks were driven by the background thread, not the caller
+    assert threading.get_ident() not in p._p.poll_threads
+    p.close()
+
+
+def test_profiles_and_sync_future(producer_mod):
+    p = producer_mod.AsyncProducer(profile="throughput")
+    assert p._p.conf["compression.type"] == "zstd"
+    assert p._p.conf["linger.ms"] == 25
+    fut = p.produce("t", b"raw-bytes")
+    assert fut.result(timeout=2) == ("t", b"raw-bytes")
+    p.close()
+
+
+def test_trace_headers_stamped(producer_mod):
+    from apps.core_contracts_pb2 import CommitResult
+    from clients.kafka_utils import tracing
+    p = producer_mod.AsyncProducer()
+    p.produce("t", CommitResult(task_id="x", correlation_id="cr-1")).result(timeout=2)
+    tracing.set_current("ctx-trace")
+    p.produce("t", b"fwd", headers={"origin": "svc"}).result(timeout=2)
+    tracing.set_current(None)
+    first, second = p._p.headers
+    assert first[tracing.TRACE] == b"cr-1"
+    assert int(first[tracing.ENQUEUED]) > 0
+    assert second[tracing.TRACE] == b"ctx-trace" and second["origin"] == "svc"
+    p.close()
+
+
+@pytest.mark.asyncio
+async def test_full_queue_does_not_block_the_loop(producer_mod):
+    p = producer_mod.AsyncProducer(queue_wait=0.2)
+    full = {"n": 3}
+    real = p._p.produce
+
+    def produce(*a, **kw):
+        if full["n"]:
+            full["n"] -= 1
+            raise BufferError
+        return real(*a, **kw)
+
+    p._p.produce = produce
+    ticks = 0
+
+    async def ticker():
+        nonlocal ticks
+        while True:
+            ticks += 1
+            await asyncio.sleep(0.001)
+
+    t = asyncio.create_task(ticker())
+    assert await asyncio.wait_for(p.send("t", b"x"), 2) == ("t", b"x")
+    assert ticks >= 3                                  # the loop kept running while the queue drained
+    full["n"] = 10**6
+    with pytest.raises(BufferError):
+        await p.send("t", b"y")
+    with pytest.raises(BufferError):
+        p.produce("t", b"z")
+    t.cancel()
+    p.close()
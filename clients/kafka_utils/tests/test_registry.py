@@ -0,0 +1,28 @@
+from apps import core_contracts_pb2 as pb
+from apps.orchestrator import topics as T
+
+
+def test_every_topic_has_a_contract_type():
+    from clients.kafka_utils import registry
+    types = registry.schemas()
+    assert set(T.SCHEMAS) <= set(types)
+    assert types[T.TASK] is pb.TaskBundle
+    assert types[T.BREPORT] is pb.BuildReport
+    assert registry.message_type("no.such.topic") is None
+
+
+def test_decode_by_topic_from_memoryview():
+    from clients.kafka_utils.codec import decode
+    bundle = pb.TaskBundle(plan_id="p1")
+    bundle.tasks.add(id="t1", goal="g")
+    buf = b"hdr" + bundle.SerializeToString()
+    out = decode(memoryview(buf)[3:], topic=T.TASK)
+    assert isinstance(out, pb.TaskBundle) and out.tasks[0].id == "t1"
+    assert decode(memoryview(b'{"a": 1}'), topic="no.such.topic") == {"a": 1}
+
+
+def test_bench_codec_runs():
+    from scripts.bench_codec import run
+    rows = run(5)
+    tb = next(r for r in rows if r["message"] == "TaskBundle")
+    assert tb["proto_bytes"] < tb["json_bytes"]
@@ -0,0 +1,63 @@
+"""Message-level trace headers.
+
+Every produced record carries `trace-id`, `enqueued-at` (epoch ms) and
+`origin` headers.  The trace id is the payload's `correlation_id` when it has
+one, else the trace of the record currently being handled (set by
+AsyncConsumer.process), else a fresh id, so one change request keeps a single
+trace across every hop.  Consumers turn `enqueued-at` into a per-topic queue
+latency histogram.
+"""
+from __future__ import annotations
+import contextvars, os, socket, time, uuid
+from .metrics import QUEUE_LAT
+
+TRACE = "trace-id"
+ENQUEUED = "enqueued-at"
+ORIGIN = "origin"
+
+_current: contextvars.ContextVar[str|None] = contextvars.ContextVar("kafka_trace", default=None)
+_origin = os.getenv("SERVICE_NAME")
+
+def set_origin(name:str, override:bool=False):
+    """Name this process in `origin` headers; SERVICE_NAME wins unless `override`."""
+    global _origin
+    if override or _origin is None:
+        _origin = name
+
+def origin() -> str:
+    return _origin or socket.gethostname()
+
+def current() -> str|None:
+    return _current.get()
+
+def set_current(trace:str|None):
+    _current.set(trace)
+
+def trace_for(obj) -> str:
+    cid = getattr(obj, "correlation_id", None)
+    return cid or _current.get() or uuid.uuid4().hex
+
+def stamp(obj, headers=None) -> list:
+    """Headers for producing `obj`; caller-supplied ones are kept and win."""
+    out = list(headers.items()) if isinstance(headers, dict) else list(headers or ())
+    have = {k for k, _ in out}
+    for k, v in ((TRACE, trace_for(obj)), (ENQUEUED, str(int(time.time() * 1000))), (ORIGIN, origin())):
+        if k not in have:
+            out.append((k, v.encode()))
+    return out
+
+def parse(headers) -> dict[str, str]:
+    if not headers:
+        return {}
+    return {k: v.decode() if isinstance(v, bytes) else v for k, v in headers}
+
+def observe(topic:str, headers) -> dict[str, str]:
+    """Record queue latency for a consumed record; return its parsed headers."""
+    h = parse(headers)
+    enq = h.get(ENQUEUED)
+    if enq:
+        try:
+            QUEUE_LAT.labels(topic).observe(max(time.time() - int(enq) / 1000, 0.0))
+        except ValueError:
+            pass
+    return h
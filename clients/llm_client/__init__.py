@@ -2,14 +2,35 @@ from .router import get_client
 import json
 
 async def chat(messages: list[dict], model: str, **kw):
-    return await get_client().chat(messages=messages, model=model, **kw)
+    cli = get_client()
+    res = await cli.chat(messages=messages, model=model, **kw)
+    from .metrics import record          # prometheus_client is imported on first call
+    record(cli.name, model, res)
+    return res
 
 # Backwards-compat helpers so existing agent code is 1-line diff
-async def json_chat(messages, model):
-    res = await chat(messages, model, json_mode=True)
+async def json_chat(messages, model, **kw):
+    res = await chat(messages, model, json_mode=True, **kw)
     return res.content   # keep same shape as previous parse_json()
 
 # Export commonly used types
 from .base import LLMResponse, BaseProvider
 
-__all__ = ["chat", "json_chat", "LLMResponse", "BaseProvider", "get_client"]
\ No newline at end of file
+# Everything else resolves on first attribute access to keep `import clients.llm_client` cheap
+_LAZY = {
+    "MultiProvider": "multi_provider",
+    "chat_batch": "batch",
+    "count_tokens": "tokens", "count_messages": "tokens", "pack": "tokens",
+    "truncate": "tokens", "budget_for": "tokens",
+}
+
+def __getattr__(name):
+    if name in _LAZY:
+        import importlib
+        val = getattr(importlib.import_module(f".{_LAZY[name]}", __name__), name)
+        globals()[name] = val
+        return val
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+__all__ = ["chat", "json_chat", "chat_batch", "LLMResponse", "BaseProvider", "get_client", "MultiProvider",
+           "count_tokens", "count_messages", "pack", "truncate", "budget_for"]
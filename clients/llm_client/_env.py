@@ -0,0 +1,13 @@
+_loaded = False
+
+def load_env():
+    """Load .env once, on first use rather than at import time."""
+    global _loaded
+    if _loaded:
+        return
+    _loaded = True
+    try:
+        from dotenv import load_dotenv
+    except ImportError:
+        return
+    load_dotenv()
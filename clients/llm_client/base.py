@@ -1,5 +1,5 @@
 from __future__ import annotations
-import abc, typing as _t
+import abc, asyncio, os, typing as _t
 from dataclasses import dataclass
 
 @dataclass
@@ -8,11 +8,15 @@ class LLMResponse:
     tokens_prompt: int = 0
     tokens_completion: int = 0
     cost_usd: float = 0.0
+    cached: bool = False        # served from the exact or semantic cache; no tokens were spent
+    provider: str = ""          # backend that answered, when a MultiProvider chose one
 
 class BaseProvider(abc.ABC):
     """All concrete providers must implement `chat`."""
 
     name: str
+    # True when the backend exposes a bulk endpoint that `chat_bulk` wraps
+    supports_bulk: bool = False
 
     @abc.abstractmethod
     async def chat(
@@ -22,4 +26,23 @@ class BaseProvider(abc.ABC):
         temperature: float = 0.1,
         json_mode: bool = False,
         **kwargs,
-    ) -> LLMResponse: ...
\ No newline at end of file
+    ) -> LLMResponse: ...
+
+    async def chat_bulk(
+        self,
+        batch: list[list[dict]],
+        model: str,
+        **kwargs,
+    ) -> list[LLMResponse | Exception]:
+        """Send many conversations in one provider request; per-item errors are returned.
+
+        Without a bulk endpoint this is one `chat` per conversation, at most
+        LLM_BATCH_CONCURRENCY at a time.
+        """
+        gate = asyncio.Semaphore(int(os.getenv("LLM_BATCH_CONCURRENCY", "8")))
+
+        async def one(messages):
+            async with gate:
+                return await self.chat(messages, model, **kwargs)
+
+        return await asyncio.gather(*(one(m) for m in batch), return_exceptions=True)
\ No newline at end of file
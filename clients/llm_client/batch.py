@@ -0,0 +1,71 @@
+"""Bulk chat: many conversations, bounded parallelism, results in input order.
+
+Identical conversations within a batch are sent once.  Providers with
+`supports_bulk` get the cache misses in chunks through `chat_bulk`; the rest
+get one `chat` per item under a semaphore.  Either way the exact-match (and,
+for a configured `call_type`, semantic) cache is shared with single calls.
+Failed items come back as exception instances, like
+`asyncio.gather(..., return_exceptions=True)`.
+"""
+from __future__ import annotations
+import asyncio, json, os
+from . import cache, semantic_cache
+from .base import BaseProvider, LLMResponse
+from .metrics import BATCH, record
+from .router import get_client
+
+_CONCURRENCY = int(os.getenv("LLM_BATCH_CONCURRENCY", "8"))
+_BULK_MAX = int(os.getenv("LLM_BULK_MAX", "64"))         # items per bulk request
+
+async def _bulk(cli: BaseProvider, items, model, call_type, **kw) -> list:
+    sem = semantic_cache.for_call(call_type, cache._dir())
+    out: list = [None] * len(items)
+    misses = []
+    for i, msgs in enumerate(items):
+        hit = cache.lookup(model, msgs, **kw) or (sem and sem.get(model, msgs, kw))
+        if hit:
+            out[i] = hit
+        else:
+            misses.append(i)
+    for start in range(0, len(misses), _BULK_MAX):
+        chunk = misses[start:start + _BULK_MAX]
+        try:
+            res = await cli.chat_bulk([items[i] for i in chunk], model, **kw)
+        except Exception as e:
+            res = [e] * len(chunk)
+        for i, r in zip(chunk, res):
+            out[i] = r
+            if isinstance(r, LLMResponse):
+                cache.store(model, items[i], r, **kw)
+                if sem:
+                    sem.put(model, items[i], kw, r)
+    return out
+
+async def chat_batch(batch: list[list[dict]], model: str, concurrency: int = _CONCURRENCY,
+                     **kw) -> list[LLMResponse | Exception]:
+    cli = get_client()
+    kw.pop("semantic_key", None)          # one key can't describe a whole batch: exact matches only
+    slots, uniq = [], {}
+    for msgs in batch:
+        slots.append(uniq.setdefault(json.dumps(msgs, sort_keys=True), len(uniq)))
+    items: list = [None] * len(uniq)
+    for msgs, s in zip(batch, slots):
+        items[s] = msgs
+    BATCH.labels(cli.name).observe(len(items))
+
+    if cli.supports_bulk:
+        call_type = kw.pop("call_type", None)
+        results = await _bulk(cli, items, model, call_type, **kw)
+    else:
+        gate = asyncio.Semaphore(concurrency)
+
+        async def one(msgs):
+            async with gate:
+                return await cli.chat(msgs, model, **kw)
+
+        results = await asyncio.gather(*(one(m) for m in items), return_exceptions=True)
+
+    for r in results:
+        if isinstance(r, LLMResponse):
+            record(cli.name, model, r)
+    return [results[s] for s in slots]
@@ -1,25 +1,44 @@
 import functools, hashlib, json, pathlib, os
-from dotenv import load_dotenv
+from ._env import load_env
 from .base import LLMResponse
+from . import semantic_cache
 
-# Load environment variables from .env file
-load_dotenv()
+_CACHE_DIR: pathlib.Path | None = None   # resolved on first use
 
-_CACHE_DIR = pathlib.Path(os.getenv("LLM_CACHE_DIR", ".llm_cache"))
-_CACHE_DIR.mkdir(exist_ok=True)
+def _dir() -> pathlib.Path:
+    global _CACHE_DIR
+    if _CACHE_DIR is None:
+        load_env()
+        _CACHE_DIR = pathlib.Path(os.getenv("LLM_CACHE_DIR", ".llm_cache"))
+        _CACHE_DIR.mkdir(exist_ok=True)
+    return _CACHE_DIR
 
 def _key(model, messages, **kw):
     data = {"m": model, "msg": messages, "kw": kw}
     h = hashlib.sha256(json.dumps(data, sort_keys=True).encode()).hexdigest()
-    return _CACHE_DIR / f"{h}.json"
+    return _dir() / f"{h}.json"
+
+def lookup(model, messages, **kw) -> LLMResponse | None:
+    k = _key(model, messages, **kw)
+    if k.exists():
+        return LLMResponse(**{**json.loads(k.read_text()), "cached": True})
+    return None
+
+def store(model, messages, res: LLMResponse, **kw):
+    _key(model, messages, **kw).write_text(json.dumps({**res.__dict__, "cached": False}))
 
 def cached(func):
     async def wrapper(self, messages, model, **kw):
-        # Create cache key
-        k = _key(model, messages, **kw)
-        if k.exists():
-            return LLMResponse(**json.loads(k.read_text()))
+        # call_type/semantic_key only drive the semantic tier; they never reach the provider
+        call_type, key = kw.pop("call_type", None), kw.pop("semantic_key", None)
+        if hit := lookup(model, messages, **kw):
+            return hit
+        sem = semantic_cache.for_call(call_type, _dir())
+        if sem and (hit := sem.get(model, messages, kw, key)):
+            return hit
         res: LLMResponse = await func(self, messages, model, **kw)
-        k.write_text(json.dumps(res.__dict__))
+        store(model, messages, res, **kw)
+        if sem:
+            sem.put(model, messages, kw, res, key)
         return res
     return wrapper
\ No newline at end of file
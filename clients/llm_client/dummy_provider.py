@@ -3,6 +3,7 @@ from .base import BaseProvider, LLMResponse
 
 class DummyProvider(BaseProvider):
     name = "dummy"
+    supports_bulk = True
     
     async def chat(self, messages, model, temperature=0.1, json_mode=False, **kw):
         # For testing, return predictable responses
@@ -19,4 +20,8 @@ class DummyProvider(BaseProvider):
                 tokens_prompt=5,
                 tokens_completion=10,
                 cost_usd=0.0
-            )
\ No newline at end of file
+            )
+
+    async def chat_bulk(self, batch, model, **kw):
+        # Local stand-in for a provider bulk endpoint: one call, many answers
+        return [await self.chat(messages, model, **kw) for messages in batch]
\ No newline at end of file
@@ -0,0 +1,15 @@
+from prometheus_client import Counter, Histogram
+
+TOKENS = Counter("llm_tokens_total","",["provider","model","kind"])
+COST   = Counter("llm_cost_usd_total","",["provider","model"])
+HITS   = Counter("llm_cache_hits_total","",["provider","model"])
+BATCH  = Histogram("llm_batch_size","",["provider"], buckets=(1,2,4,8,16,32,64,128,256))
+
+def record(provider:str, model:str, res):
+    provider = getattr(res, "provider", "") or provider
+    if getattr(res, "cached", False):       # nothing was spent on a cached answer
+        HITS.labels(provider, model).inc()
+        return
+    TOKENS.labels(provider, model, "prompt").inc(res.tokens_prompt)
+    TOKENS.labels(provider, model, "completion").inc(res.tokens_completion)
+    COST.labels(provider, model).inc(res.cost_usd)
@@ -0,0 +1,145 @@
+"""Latency-aware routing over several providers.
+
+Each backend keeps an EWMA of its latency and error rate; requests go to the
+best-scoring backend first and fail over down the ranking on errors.  With
+hedging enabled a duplicate request is fired at the runner-up once the primary
+exceeds its own latency percentile, and the first answer wins.
+
+A backend can be pinned to its own model (`models`, or "ollama:llama3" in
+LLM_BACKEND); otherwise it gets the model the caller asked for.  Stats are
+kept per backend position, so two backends of the same type are tracked
+separately.
+"""
+from __future__ import annotations
+import asyncio, logging, os, time
+from collections import deque
+from .base import BaseProvider, LLMResponse
+
+log = logging.getLogger("llm.multi")
+
+_ALPHA = float(os.getenv("LLM_EWMA_ALPHA", "0.2"))
+_HEDGE_PCT = os.getenv("LLM_HEDGE_PCT")          # e.g. "0.9" -> hedge after p90
+_HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "10"))
+_ERR_PENALTY = 10.0                               # score multiplier per unit error rate
+
+class _Stats:
+    __slots__ = ("lat", "err", "calls", "window")
+
+    def __init__(self, window: int = 100):
+        self.lat: float | None = None   # EWMA seconds
+        self.err = 0.0                  # EWMA error rate 0..1
+        self.calls = 0
+        self.window: deque[float] = deque(maxlen=window)
+
+    def ok(self, dt: float, alpha: float):
+        self.calls += 1
+        self.window.append(dt)
+        self.lat = dt if self.lat is None else alpha * dt + (1 - alpha) * self.lat
+        self.err = (1 - alpha) * self.err
+
+    def slow(self, dt: float, alpha: float):
+        # a call cancelled after `dt` would have taken at least that long;
+        # a shorter wait says nothing, so it only ever raises the estimate
+        if self.lat is None or dt > self.lat:
+            self.lat = dt if self.lat is None else alpha * dt + (1 - alpha) * self.lat
+
+    def fail(self, alpha: float):
+        self.calls += 1
+        self.err = alpha + (1 - alpha) * self.err
+
+    def score(self) -> float:
+        # untried backends score 0 so each one gets probed at least once; the
+        # additive term keeps a backend that has only ever failed out of first place
+        return (self.lat or 0.0) * (1 + _ERR_PENALTY * self.err) + self.err
+
+    def percentile(self, q: float) -> float | None:
+        if len(self.window) < _HEDGE_MIN_SAMPLES:
+            return None
+        xs = sorted(self.window)
+        return xs[min(len(xs) - 1, int(q * len(xs)))]
+
+class MultiProvider(BaseProvider):
+    """Route across `providers`, failing over on errors and optionally hedging."""
+
+    def __init__(self, providers: list[BaseProvider], alpha: float = _ALPHA,
+                 hedge_pct: float | None = float(_HEDGE_PCT) if _HEDGE_PCT else None,
+                 models: list[str | None] | None = None):
+        if not providers:
+            raise ValueError("MultiProvider needs at least one provider")
+        if models is not None and len(models) != len(providers):
+            raise ValueError("MultiProvider needs one model (or None) per provider")
+        self.providers = providers
+        self.models = list(models) if models is not None else [None] * len(providers)
+        self.name = ",".join(p.name for p in providers)
+        self.spec = ",".join(f"{p.name}:{m}" if m else p.name for p, m in zip(providers, self.models))
+        self.alpha = alpha
+        self.hedge_pct = hedge_pct
+        self.stats = [_Stats() for _ in providers]
+
+    def _order(self) -> list[int]:
+        # sort is stable, so ties keep the configured order
+        return sorted(range(len(self.providers)), key=lambda i: self.stats[i].score())
+
+    def ranked(self) -> list[BaseProvider]:
+        return [self.providers[i] for i in self._order()]
+
+    async def _call(self, i: int, messages, model, **kw) -> LLMResponse:
+        st = self.stats[i]
+        t0 = time.perf_counter()
+        try:
+            res = await self.providers[i].chat(messages, self.models[i] or model, **kw)
+        except asyncio.CancelledError:
+            # e.g. a primary that lost to its hedge: without this it would never learn it is slow
+            st.slow(time.perf_counter() - t0, self.alpha)
+            raise
+        except Exception:
+            st.fail(self.alpha)
+            raise
+        st.ok(time.perf_counter() - t0, self.alpha)
+        res.provider = res.provider or self.providers[i].name
+        return res
+
+    async def _hedged(self, primary: int, backup: int, tried: set, messages, model, **kw) -> LLMResponse:
+        delay = self.stats[primary].percentile(self.hedge_pct)
+        tried.add(primary)
+        first = asyncio.ensure_future(self._call(primary, messages, model, **kw))
+        if delay is None:
+            return await first
+        done, _ = await asyncio.wait({first}, timeout=delay)
+        if done:
+            return first.result()
+        log.debug("hedging %s -> %s after %.3fs", self.providers[primary].name, self.providers[backup].name, delay)
+        tried.add(backup)
+        second = asyncio.ensure_future(self._call(backup, messages, model, **kw))
+        pending = {first, second}
+        err: BaseException | None = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for t in done:
+                    if t.exception() is None:
+                        return t.result()
+                    err = t.exception()
+            raise err
+        finally:
+            for t in pending:
+                t.cancel()
+
+    async def chat(self, messages, model, temperature=0.1, json_mode=False, **kw):
+        kw.update(temperature=temperature, json_mode=json_mode)
+        order = self._order()
+        tried: set[int] = set()
+        last: Exception | None = None
+        for n, i in enumerate(order):
+            if i in tried:
+                continue
+            backup = next((j for j in order[n + 1:] if j not in tried), None)
+            try:
+                if self.hedge_pct is not None and backup is not None:
+                    return await self._hedged(i, backup, tried, messages, model, **kw)
+                tried.add(i)
+                return await self._call(i, messages, model, **kw)
+            except Exception as e:
+                log.warning("provider %s failed: %s", self.providers[i].name, e)
+                last = e
+        raise last
@@ -1,10 +1,10 @@
-import aiohttp, asyncio, json, os
-from dotenv import load_dotenv
+import asyncio, json, os
+from ._env import load_env
 from .base import BaseProvider, LLMResponse
 from .cache import cached
+from .tokens import count_messages, count_tokens, cost_usd
 
-# Load environment variables from .env file
-load_dotenv()
+load_env()
 
 OLLAMA_URL = os.getenv("OLLAMA_URL", "http://ollama:11434/api/chat")
 
@@ -21,9 +21,15 @@ class OllamaProvider(BaseProvider):
         }
         if json_mode:
             pay["format"] = "json"
+
+        import aiohttp
             
         async with aiohttp.ClientSession() as sess:
             r = await sess.post(OLLAMA_URL, json=pay, timeout=aiohttp.ClientTimeout(total=120))
             data = await r.json()
-        # Ollama's simple schema -> wrap
-        return LLMResponse(content=data["message"]["content"])
\ No newline at end of file
+        # Ollama's simple schema -> wrap; eval counts are absent on some versions
+        content = data["message"]["content"]
+        tp = data.get("prompt_eval_count") or count_messages(messages, model)
+        tc = data.get("eval_count") or count_tokens(content, model)
+        return LLMResponse(content=content, tokens_prompt=tp, tokens_completion=tc,
+                           cost_usd=cost_usd(model, tp, tc))
\ No newline at end of file
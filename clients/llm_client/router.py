@@ -1,10 +1,7 @@
 import os, importlib
-from dotenv import load_dotenv
+from ._env import load_env
 from .base import BaseProvider
 
-# Load environment variables from .env file
-load_dotenv()
-
 _PROVIDER_MAP = {
     "openai": "OpenAIProvider",
     "ollama": "OllamaProvider",
@@ -13,18 +10,29 @@ _PROVIDER_MAP = {
 
 _client: BaseProvider | None = None
 
+def _load(provider: str) -> BaseProvider:
+    _MODULE = f"clients.llm_client.{provider}_provider"
+    provider_class_name = _PROVIDER_MAP.get(provider, f"{provider.capitalize()}Provider")
+    module = importlib.import_module(_MODULE)
+    Provider: type[BaseProvider] = getattr(module, provider_class_name)
+    return Provider()
+
 def get_client() -> BaseProvider:
     global _client
-    provider = os.getenv("LLM_BACKEND", "openai")  # openai | ollama | anthropic …
-    
+    load_env()
+    # openai | ollama | anthropic … or a comma list ("ollama,openai") for routed fallback;
+    # in a list, "ollama:llama3" pins that backend to its own model
+    provider = os.getenv("LLM_BACKEND", "openai").replace(" ", "")
+
     # Check if we need to recreate the client due to provider change
-    if _client is not None and hasattr(_client, 'name') and _client.name != provider:
+    if _client is not None and getattr(_client, "spec", getattr(_client, "name", None)) != provider:
         _client = None
-    
+
     if _client is None:
-        _MODULE = f"clients.llm_client.{provider}_provider"
-        provider_class_name = _PROVIDER_MAP.get(provider, f"{provider.capitalize()}Provider")
-        module = importlib.import_module(_MODULE)
-        Provider: type[BaseProvider] = getattr(module, provider_class_name)
-        _client = Provider()
-    return _client
\ No newline at end of file
+        entries = [n.partition(":") for n in provider.split(",") if n]
+        if len(entries) > 1 or any(m for _, _, m in entries):
+            from .multi_provider import MultiProvider
+            _client = MultiProvider([_load(n) for n, _, _ in entries], models=[m or None for _, _, m in entries])
+        else:
+            _client = _load(provider)
+    return _client
@@ -0,0 +1,169 @@
+"""Near-duplicate LLM cache tier.
+
+Sits behind the exact-match `cached` decorator.  Prompts are canonicalized
+(whitespace collapsed, UUIDs masked) and embedded; a lookup returns the stored
+response of the most similar prompt with the same model and call options when
+cosine similarity clears the threshold.  Only call types listed in
+LLM_SEMANTIC_CACHE (comma list, e.g. "plan,complexity") use this tier, since a
+near-miss answer is only acceptable where the caller tolerates it.
+
+A similarity hit also requires the same `semantic_key`: the task-specific part
+of the prompt (e.g. the change request text), compared exactly after
+canonicalization, so two tasks sharing a large context never share an answer.
+Without a key only canonically identical prompts hit.  The jsonl file is
+rewritten from the live entries on load and whenever evictions leave it twice
+as long as the index.
+
+The default embedding is a hashed bag of word uni/bigrams, which needs no
+model and is insensitive to snippet order; pass `embed=` to use a real one.
+"""
+from __future__ import annotations
+import hashlib, json, math, os, re, threading
+from pathlib import Path
+from typing import Callable
+from .base import LLMResponse
+
+_TYPES: set[str] | None = None     # LLM_SEMANTIC_CACHE, read on first use
+_DIM = 1024
+
+_UUID_RE = re.compile(r"\b[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}\b")
+_WS_RE = re.compile(r"\s+")
+_WORD_RE = re.compile(r"\w+")
+
+def canonicalize(messages: list[dict]) -> str:
+    parts = []
+    for m in messages:
+        text = _UUID_RE.sub("<uuid>", m.get("content") or "")
+        parts.append(f"{m.get('role', '')}: {_WS_RE.sub(' ', text).strip()}")
+    return "\n".join(parts)
+
+def hash_embed(text: str) -> dict[int, float]:
+    """Sparse L2-normalised hashed uni/bigram vector."""
+    words = _WORD_RE.findall(text.lower())
+    vec: dict[int, float] = {}
+    for tok in words + [a + " " + b for a, b in zip(words, words[1:])]:
+        i = int.from_bytes(hashlib.blake2b(tok.encode(), digest_size=4).digest(), "big") % _DIM
+        vec[i] = vec.get(i, 0.0) + 1.0
+    norm = math.sqrt(sum(v * v for v in vec.values())) or 1.0
+    return {i: v / norm for i, v in vec.items()}
+
+def _cos(a, b) -> float:
+    if isinstance(a, dict):
+        if len(a) > len(b):
+            a, b = b, a
+        return sum(v * b.get(i, 0.0) for i, v in a.items())
+    return sum(x * y for x, y in zip(a, b))
+
+class SemanticCache:
+    """Brute-force in-memory vector index, appended to a jsonl file for reuse."""
+
+    def __init__(self, path: Path | None, threshold: float | None = None,
+                 embed: Callable[[str], object] = hash_embed, max_entries: int | None = None):
+        self.path = path
+        self.threshold = threshold if threshold is not None else float(os.getenv("LLM_SEMANTIC_THRESHOLD", "0.95"))
+        self.embed = embed
+        self.max_entries = max_entries or int(os.getenv("LLM_SEMANTIC_MAX", "5000"))
+        self._entries: dict[str, list[tuple]] = {}    # scope -> [(canon_hash, key_hash, vec, resp)]
+        self._lines = 0                                # records in the file, live or evicted
+        self._lock = threading.Lock()
+        self._loaded = path is None
+
+    @staticmethod
+    def _scope(model: str, kw: dict) -> str:
+        return json.dumps({"m": model, "kw": kw}, sort_keys=True)
+
+    @staticmethod
+    def _key_hash(key: str | None) -> str | None:
+        if key is None:
+            return None
+        return hashlib.sha256(canonicalize([{"content": key}]).encode()).hexdigest()
+
+    @staticmethod
+    def _record(scope: str, e: tuple) -> str:
+        h, k, vec, resp = e
+        return json.dumps({"scope": scope, "h": h, "k": k, "vec": vec, "resp": resp}) + "\n"
+
+    def _load(self):
+        if self._loaded:
+            return
+        self._loaded = True
+        if not self.path.exists():
+            return
+        for line in self.path.read_text().splitlines():
+            self._lines += 1
+            try:
+                e = json.loads(line)
+            except ValueError:
+                continue
+            vec = {int(i): v for i, v in e["vec"].items()} if isinstance(e["vec"], dict) else e["vec"]
+            bucket = self._entries.setdefault(e["scope"], [])
+            bucket.append((e["h"], e.get("k"), vec, e["resp"]))
+            if len(bucket) > self.max_entries:
+                del bucket[0]
+        if self._lines > self._live():
+            self._compact()
+
+    def _live(self) -> int:
+        return sum(len(b) for b in self._entries.values())
+
+    def _compact(self):
+        tmp = self.path.with_suffix(".tmp")
+        with tmp.open("w") as f:
+            for scope, bucket in self._entries.items():
+                for e in bucket:
+                    f.write(self._record(scope, e))
+        tmp.replace(self.path)
+        self._lines = self._live()
+
+    def get(self, model: str, messages: list[dict], kw: dict, key: str | None = None) -> LLMResponse | None:
+        canon = canonicalize(messages)
+        h = hashlib.sha256(canon.encode()).hexdigest()
+        k = self._key_hash(key)
+        with self._lock:
+            self._load()
+            entries = self._entries.get(self._scope(model, kw), [])
+            for eh, _, _, resp in entries:
+                if eh == h:
+                    return LLMResponse(**{**resp, "cached": True})
+            candidates = [(evec, resp) for _, ek, evec, resp in entries if k is not None and ek == k]
+            if not candidates:
+                return None
+            vec = self.embed(canon)
+            best, best_sim = None, self.threshold
+            for evec, resp in candidates:
+                sim = _cos(vec, evec)
+                if sim >= best_sim:
+                    best, best_sim = resp, sim
+        return LLMResponse(**{**best, "cached": True}) if best else None
+
+    def put(self, model: str, messages: list[dict], kw: dict, res: LLMResponse, key: str | None = None):
+        canon = canonicalize(messages)
+        e = (hashlib.sha256(canon.encode()).hexdigest(), self._key_hash(key), self.embed(canon), res.__dict__)
+        scope = self._scope(model, kw)
+        with self._lock:
+            self._load()
+            bucket = self._entries.setdefault(scope, [])
+            bucket.append(e)
+            if len(bucket) > self.max_entries:
+                del bucket[0]
+            if self.path is not None:
+                with self.path.open("a") as f:
+                    f.write(self._record(scope, e))
+                self._lines += 1
+                if self._lines > 2 * self._live():
+                    self._compact()
+
+_cache: SemanticCache | None = None
+
+def for_call(call_type: str | None, cache_dir: Path) -> SemanticCache | None:
+    """Return the shared semantic tier if `call_type` is configured for it."""
+    global _cache, _TYPES
+    if call_type is None:
+        return None
+    if _TYPES is None:
+        _TYPES = {t for t in os.getenv("LLM_SEMANTIC_CACHE", "").replace(" ", "").split(",") if t}
+    if call_type not in _TYPES:
+        return None
+    if _cache is None:
+        _cache = SemanticCache(cache_dir / "semantic.jsonl")
+    return _cache
@@ -0,0 +1,75 @@
+import asyncio
+import pytest
+from clients.llm_client import chat_batch, LLMResponse
+from clients.llm_client.base import BaseProvider
+
+
+@pytest.fixture
+def backend(monkeypatch, tmp_path):
+    import clients.llm_client.router as router
+    from clients.llm_client import cache
+    monkeypatch.setattr(cache, "_CACHE_DIR", tmp_path)
+
+    def use(provider):
+        monkeypatch.setattr(router, "_client", provider)
+        monkeypatch.setenv("LLM_BACKEND", provider.name)
+    yield use
+    router._client = None
+
+
+class CountingProvider(BaseProvider):
+    name = "counting"
+
+    def __init__(self):
+        self.active = self.peak = self.calls = 0
+
+    async def chat(self, messages, model, temperature=0.1, json_mode=False, **kw):
+        self.calls += 1
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        await asyncio.sleep(0.01)
+        self.active -= 1
+        if messages[0]["content"] == "boom":
+            raise RuntimeError("boom")
+        return LLMResponse(content=messages[0]["content"].upper())
+
+
+@pytest.mark.asyncio
+async def test_bounded_order_and_errors(backend):
+    p = CountingProvider()
+    backend(p)
+    batch = [[{"role": "user", "content": c}] for c in ["a", "b", "boom", "c", "a", "d"]]
+    res = await chat_batch(batch, "m", concurrency=2)
+    assert [r.content for r in res if isinstance(r, LLMResponse)] == ["A", "B", "C", "A", "D"]
+    assert isinstance(res[2], RuntimeError)
+    assert p.peak <= 2
+    assert p.calls == 5          # duplicate "a" sent once
+
+
+@pytest.mark.asyncio
+async def test_bulk_endpoint_shares_cache(backend, tmp_path):
+    from clients.llm_client.dummy_provider import DummyProvider
+    calls = []
+
+    class Bulk(DummyProvider):
+        async def chat_bulk(self, batch, model, **kw):
+            calls.append(len(batch))
+            return await super().chat_bulk(batch, model, **kw)
+
+    backend(Bulk())
+    batch = [[{"role": "user", "content": str(i)}] for i in range(5)]
+    first = await chat_batch(batch, "m")
+    assert calls == [5] and all(r.tokens_prompt == 5 for r in first)
+    # second run is served from the exact-match cache
+    await chat_batch(batch + [[{"role": "user", "content": "new"}]], "m")
+    assert calls == [5, 1]
+
+
+@pytest.mark.asyncio
+async def test_default_chat_bulk_is_bounded_gather(monkeypatch):
+    monkeypatch.setenv("LLM_BATCH_CONCURRENCY", "2")
+    p = CountingProvider()
+    batch = [[{"role": "user", "content": c}] for c in ["a", "boom", "b", "c"]]
+    res = await p.chat_bulk(batch, "m")
+    assert [r.content for r in res if isinstance(r, LLMResponse)] == ["A", "B", "C"]
+    assert isinstance(res[1], RuntimeError) and p.peak == 2
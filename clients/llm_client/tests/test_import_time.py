@@ -0,0 +1,35 @@
+"""Cold-start guard: `python -X importtime` budgets for short-lived agent workers."""
+import os, pathlib, subprocess, sys
+
+ROOT = pathlib.Path(__file__).resolve().parents[3]
+HEAVY = ("openai", "aiohttp", "backoff", "dotenv", "tiktoken")
+BUDGET_US = int(os.getenv("LLM_IMPORT_BUDGET_US", "150000"))
+
+
+def importtime(stmt: str, **env) -> dict[str, int]:
+    """Return {module: cumulative import microseconds} for running `stmt` in a fresh interpreter."""
+    r = subprocess.run([sys.executable, "-X", "importtime", "-c", stmt], cwd=ROOT,
+                       capture_output=True, text=True, check=True, env={**os.environ, **env})
+    mods = {}
+    for line in r.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        _, cum, name = line.split("|")
+        if cum.strip().isdigit():
+            mods[name.strip()] = int(cum)
+    return mods
+
+
+def _slowest(mods, n=5):
+    return sorted(mods.items(), key=lambda kv: -kv[1])[:n]
+
+
+def test_llm_client_import_is_lazy():
+    mods = importtime("import clients.llm_client")
+    assert not [m for m in mods if m.split(".")[0] in HEAVY + ("prometheus_client",)], _slowest(mods)
+    assert mods["clients.llm_client"] < BUDGET_US, _slowest(mods)
+
+
+def test_coding_agent_mock_mode_skips_openai():
+    mods = importtime("import apps.agents.coding_agent.agent", MOCK_LLM="1")
+    assert not [m for m in mods if m.split(".")[0] in HEAVY], _slowest(mods)
@@ -58,4 +58,36 @@ def test_router_provider_selection():
     router._client = None  # Clear cache
     
     client = router.get_client()
-    assert client.name == "dummy"
\ No newline at end of file
+    assert client.name == "dummy"
+
+@pytest.mark.asyncio
+async def test_cache_hits_are_not_billed(monkeypatch, tmp_path):
+    import clients.llm_client.router as router
+    from clients.llm_client import cache, metrics
+    from clients.llm_client.base import BaseProvider
+    monkeypatch.setattr(cache, "_CACHE_DIR", tmp_path)
+    seen = {}
+
+    class Counter:
+        def __init__(self, name): self.name = name
+        def labels(self, *lb): self.lb = lb; return self
+        def inc(self, v=1): seen[(self.name, *self.lb)] = seen.get((self.name, *self.lb), 0) + v
+
+    for name in ("TOKENS", "COST", "HITS"):
+        monkeypatch.setattr(metrics, name, Counter(name))
+
+    class Paid(BaseProvider):
+        name = "paid"
+        @cache.cached
+        async def chat(self, messages, model, temperature=0.1, json_mode=False, **kw):
+            return LLMResponse(content="x", tokens_prompt=7, tokens_completion=3, cost_usd=0.5)
+
+    monkeypatch.setattr(router, "_client", Paid())
+    monkeypatch.setenv("LLM_BACKEND", "paid")
+    msgs = [{"role": "user", "content": "bill me once"}]
+    first = await chat(msgs, "m")
+    second = await chat(msgs, "m")
+    assert not first.cached and second.cached and second.content == "x"
+    assert seen == {("COST", "paid", "m"): 0.5, ("TOKENS", "paid", "m", "prompt"): 7,
+                    ("TOKENS", "paid", "m", "completion"): 3, ("HITS", "paid", "m"): 1}
+    router._client = None
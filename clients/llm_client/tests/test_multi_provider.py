@@ -0,0 +1,123 @@
+import asyncio, os
+import pytest
+from clients.llm_client.base import BaseProvider, LLMResponse
+from clients.llm_client.multi_provider import MultiProvider
+
+
+class FakeProvider(BaseProvider):
+    def __init__(self, name, delay=0.0, fail=False):
+        self.name, self.delay, self.fail, self.calls = name, delay, fail, 0
+        self.models = []
+
+    async def chat(self, messages, model, temperature=0.1, json_mode=False, **kw):
+        self.calls += 1
+        self.models.append(model)
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError(f"{self.name} down")
+        return LLMResponse(content=self.name)
+
+
+@pytest.mark.asyncio
+async def test_failover_on_error():
+    bad, good = FakeProvider("bad", fail=True), FakeProvider("good")
+    mp = MultiProvider([bad, good])
+    res = await mp.chat([{"role": "user", "content": "hi"}], "m")
+    assert res.content == "good"
+    assert mp.stats[0].err > 0
+    # the failing backend is demoted on the next request
+    assert mp.ranked()[0] is good
+
+
+@pytest.mark.asyncio
+async def test_routes_to_lowest_latency():
+    slow, fast = FakeProvider("slow", delay=0.05), FakeProvider("fast", delay=0.0)
+    mp = MultiProvider([slow, fast])
+    for _ in range(3):
+        await mp.chat([], "m")
+    assert mp.ranked()[0] is fast
+    assert fast.calls >= 2
+
+
+@pytest.mark.asyncio
+async def test_all_fail_raises_last_error():
+    mp = MultiProvider([FakeProvider("a", fail=True), FakeProvider("b", fail=True)])
+    with pytest.raises(RuntimeError):
+        await mp.chat([], "m")
+
+
+@pytest.mark.asyncio
+async def test_hedge_fires_after_percentile():
+    primary, backup = FakeProvider("primary"), FakeProvider("backup", delay=0.0)
+    mp = MultiProvider([primary, backup], hedge_pct=0.5)
+    # seed primary with fast samples so its p50 is tiny, then make it stall
+    for _ in range(20):
+        mp.stats[0].ok(0.001, mp.alpha)
+    mp.stats[1].lat = 1.0
+    primary.delay = 1.0
+    before = mp.stats[0].lat
+    res = await asyncio.wait_for(mp.chat([], "m"), timeout=0.5)
+    assert res.content == "backup" and res.provider == "backup"
+    await asyncio.sleep(0)                       # let the cancelled primary unwind
+    assert mp.stats[0].lat > before              # the losing primary learns it was slow
+
+
+@pytest.mark.asyncio
+async def test_hedge_losses_demote_slow_primary():
+    primary, backup = FakeProvider("primary", delay=0.05), FakeProvider("backup", delay=0.005)
+    mp = MultiProvider([primary, backup], hedge_pct=0.5)
+    for _ in range(20):
+        mp.stats[0].ok(0.001, mp.alpha)
+    for _ in range(20):
+        await mp.chat([], "m")
+        if mp.ranked()[0] is backup:
+            break
+    assert mp.ranked()[0] is backup              # no longer hedging on every request
+
+
+@pytest.mark.asyncio
+async def test_each_backend_gets_its_own_model():
+    local, cloud = FakeProvider("ollama", fail=True), FakeProvider("openai")
+    mp = MultiProvider([local, cloud], models=["llama3", None])
+    await mp.chat([], "gpt-4o-mini")
+    assert local.models == ["llama3"] and cloud.models == ["gpt-4o-mini"]
+
+
+@pytest.mark.asyncio
+async def test_same_type_backends_tracked_separately():
+    down, up = FakeProvider("ollama", fail=True), FakeProvider("ollama")
+    mp = MultiProvider([down, up])
+    res = await mp.chat([], "m")
+    assert res.content == "ollama" and down.calls == up.calls == 1
+    assert mp.stats[0].err > 0 and mp.stats[1].err == 0
+    assert mp.ranked()[0] is up
+
+
+def test_router_builds_multi_from_comma_list(monkeypatch):
+    import clients.llm_client.router as router
+    monkeypatch.setenv("LLM_BACKEND", "dummy, dummy")
+    router._client = None
+    client = router.get_client()
+    assert isinstance(client, MultiProvider)
+    assert client is router.get_client()
+    monkeypatch.setenv("LLM_BACKEND", "dummy:small,dummy")
+    pinned = router.get_client()
+    assert pinned is not client and pinned.models == ["small", None]
+    assert pinned is router.get_client()
+    router._client = None
+
+
+@pytest.mark.asyncio
+async def test_metrics_labelled_with_answering_backend(monkeypatch):
+    from clients.llm_client import metrics
+    seen = []
+
+    class Counter:
+        def labels(self, *lb): seen.append(lb[0]); return self
+        def inc(self, v=1): pass
+
+    for name in ("TOKENS", "COST", "HITS"):
+        monkeypatch.setattr(metrics, name, Counter())
+    mp = MultiProvider([FakeProvider("a", fail=True), FakeProvider("b")])
+    metrics.record(mp.name, "m", await mp.chat([], "m"))
+    assert set(seen) == {"b"}
@@ -0,0 +1,80 @@
+import pytest
+from clients.llm_client.base import LLMResponse
+from clients.llm_client import semantic_cache as sc
+
+
+def _msgs(text):
+    return [{"role": "system", "content": "You are Request-Planner."},
+            {"role": "user", "content": text}]
+
+
+def test_canonicalize_masks_uuid_and_whitespace():
+    a = sc.canonicalize(_msgs("plan  for\n\n 123e4567-e89b-12d3-a456-426614174000"))
+    b = sc.canonicalize(_msgs("plan for 0f0f0f0f-aaaa-bbbb-cccc-222222222222"))
+    assert a == b
+
+
+def test_near_duplicate_hit(tmp_path):
+    cache = sc.SemanticCache(tmp_path / "sem.jsonl", threshold=0.9)
+    base = "Add a greeting function\n\ndef hello(): pass\n\nclass Greeter: ..."
+    key = "Add a greeting function"
+    cache.put("m", _msgs(base), {"json_mode": True}, LLMResponse(content="plan"), key=key)
+    # snippet order swapped
+    swapped = "Add a greeting function\n\nclass Greeter: ...\n\ndef hello(): pass"
+    hit = cache.get("m", _msgs(swapped), {"json_mode": True}, key=key)
+    assert hit and hit.content == "plan"
+    # different options or model never match
+    assert cache.get("m", _msgs(swapped), {"json_mode": False}, key=key) is None
+    assert cache.get("other", _msgs(base), {"json_mode": True}, key=key) is None
+    # unrelated prompt misses
+    assert cache.get("m", _msgs("Remove the database layer entirely"), {"json_mode": True}, key=key) is None
+
+
+def test_persisted_index_reloads(tmp_path):
+    path = tmp_path / "sem.jsonl"
+    sc.SemanticCache(path).put("m", _msgs("hello world"), {}, LLMResponse(content="x"))
+    assert sc.SemanticCache(path).get("m", _msgs("hello   world"), {}).content == "x"
+
+
+@pytest.mark.asyncio
+async def test_cached_uses_semantic_tier(tmp_path, monkeypatch):
+    from clients.llm_client import cache
+    monkeypatch.setattr(cache, "_CACHE_DIR", tmp_path)
+    monkeypatch.setattr(sc, "_TYPES", {"plan"})
+    monkeypatch.setattr(sc, "_cache", None)
+    calls = []
+
+    class P:
+        @cache.cached
+        async def chat(self, messages, model, **kw):
+            calls.append(kw)
+            return LLMResponse(content="fresh")
+
+    await P().chat(_msgs("plan for 123e4567-e89b-12d3-a456-426614174000"), "m", call_type="plan")
+    res = await P().chat(_msgs("plan  for 0f0f0f0f-aaaa-bbbb-cccc-222222222222"), "m", call_type="plan")
+    assert res.content == "fresh" and len(calls) == 1
+    assert "call_type" not in calls[0]
+
+
+def test_similar_prompt_for_another_task_misses(tmp_path):
+    cache = sc.SemanticCache(tmp_path / "sem.jsonl", threshold=0.5)
+    ctx = "\n\n".join(f"def helper_{i}(): return {i}" for i in range(50))
+    cache.put("m", _msgs(f"Add retries\n\n{ctx}"), {}, LLMResponse(content="retries"), key="Add retries")
+    assert cache.get("m", _msgs(f"Add logging\n\n{ctx}"), {}, key="Add logging") is None
+    assert cache.get("m", _msgs(f"Add logging\n\n{ctx}"), {}) is None               # no key: exact only
+    shuffled = "\n\n".join(reversed(ctx.split("\n\n")))
+    hit = cache.get("m", _msgs(f"Add  retries\n\n{shuffled}"), {}, key="Add  retries")
+    assert hit and hit.content == "retries" and hit.cached
+
+
+def test_file_is_compacted(tmp_path):
+    path = tmp_path / "sem.jsonl"
+    cache = sc.SemanticCache(path, max_entries=3)
+    for i in range(10):
+        cache.put("m", _msgs(f"prompt {i}"), {}, LLMResponse(content=str(i)))
+    assert len(path.read_text().splitlines()) <= 6
+    path.write_text(path.read_text() * 3)                     # e.g. written by an older version
+    again = sc.SemanticCache(path, max_entries=3)
+    assert again.get("m", _msgs("prompt 9"), {}).content == "9"
+    assert again.get("m", _msgs("prompt 0"), {}) is None
+    assert len(path.read_text().splitlines()) == 3
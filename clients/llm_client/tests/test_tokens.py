@@ -0,0 +1,29 @@
+from clients.llm_client import tokens
+
+
+def test_count_tokens_cached():
+    tokens.count_tokens.cache_clear()
+    n1 = tokens.count_tokens("def hello(): return 'world'")
+    n2 = tokens.count_tokens("def hello(): return 'world'")
+    assert n1 == n2 > 0
+    assert tokens.count_tokens.cache_info().hits == 1
+
+
+def test_pack_respects_budget_and_rank():
+    snips = ["a " * 40, "b " * 400, "c " * 10]
+    budget = tokens.count_tokens(snips[0]) + tokens.count_tokens(snips[2]) + 10
+    out = tokens.pack(snips, budget)
+    # the oversized middle snippet is skipped, order preserved
+    assert out == [snips[0], snips[2]]
+
+
+def test_truncate():
+    text = "word " * 1000
+    cut = tokens.truncate(text, 50)
+    assert tokens.count_tokens(cut) <= 50
+    assert tokens.truncate("short", 50) == "short"
+
+
+def test_cost_table():
+    assert tokens.cost_usd("gpt-4o", 1000, 1000) == 0.04
+    assert tokens.cost_usd("unknown-model", 1000, 1000) == 0
@@ -0,0 +1,83 @@
+"""Token counting, prompt budgeting and cost accounting.
+
+`count_tokens` is tiktoken-backed with an LRU of per-snippet counts, so packing
+the same RAG snippets into many prompts only encodes each one once.  When the
+tokenizer is unavailable (no wheel, or no network to fetch the BPE file) it
+falls back to a ~4 chars/token estimate.
+"""
+from __future__ import annotations
+import functools, logging, os
+
+log = logging.getLogger("llm.tokens")
+
+_CHARS_PER_TOKEN = 4
+_MSG_OVERHEAD = 4            # role/separator tokens per chat message
+
+# prompt budget (tokens) per model; leaves room for the completion
+_MODEL_BUDGETS = {
+    "gpt-4o-mini": 12000,
+    "gpt-4o":      12000,
+    "gpt-4.1-nano": 8000,
+}
+_DEFAULT_BUDGET = int(os.getenv("LLM_PROMPT_BUDGET", "6000"))
+
+COST_TABLE = {  # very simplified cost table USD / 1K tokens
+    "gpt-4o-mini": (0.005, 0.015),   # (prompt, completion)
+    "gpt-4o":      (0.01, 0.03),
+}
+
+@functools.lru_cache(maxsize=None)
+def _encoder(model: str):
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    try:
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            return tiktoken.get_encoding("cl100k_base")
+    except Exception as e:               # BPE download failed (offline)
+        log.warning("tokenizer unavailable for %s, estimating: %s", model, e)
+        return None
+
+@functools.lru_cache(maxsize=16384)
+def count_tokens(text: str, model: str = "gpt-4o-mini") -> int:
+    enc = _encoder(model)
+    if enc is None:
+        return (len(text) + _CHARS_PER_TOKEN - 1) // _CHARS_PER_TOKEN
+    return len(enc.encode(text, disallowed_special=()))
+
+def count_messages(messages: list[dict], model: str = "gpt-4o-mini") -> int:
+    return sum(count_tokens(m.get("content") or "", model) + _MSG_OVERHEAD for m in messages)
+
+def budget_for(model: str) -> int:
+    return _MODEL_BUDGETS.get(model, _DEFAULT_BUDGET)
+
+def truncate(text: str, max_tokens: int, model: str = "gpt-4o-mini") -> str:
+    """Cut `text` to at most `max_tokens` tokens."""
+    if count_tokens(text, model) <= max_tokens:
+        return text
+    enc = _encoder(model)
+    if enc is None:
+        return text[: max_tokens * _CHARS_PER_TOKEN]
+    return enc.decode(enc.encode(text, disallowed_special=())[:max_tokens])
+
+def pack(snippets: list[str], budget: int, model: str = "gpt-4o-mini",
+         sep: str = "\n\n") -> list[str]:
+    """Greedily keep snippets (already ranked best-first) that fit in `budget` tokens.
+
+    A snippet that does not fit is skipped rather than ending the scan, so a
+    smaller lower-ranked snippet can still fill the remaining room.
+    """
+    out, used, sep_cost = [], 0, count_tokens(sep, model)
+    for s in snippets:
+        cost = count_tokens(s, model) + (sep_cost if out else 0)
+        if used + cost > budget:
+            continue
+        out.append(s); used += cost
+    return out
+
+def cost_usd(model: str, tokens_prompt: int, tokens_completion: int) -> float:
+    p_cost, c_cost = COST_TABLE.get(model, (0, 0))
+    return (tokens_prompt / 1000) * p_cost + (tokens_completion / 1000) * c_cost
@@ -4,8 +4,8 @@ from typing import List
 
 MODE = os.getenv("RAG_CLIENT_TRANSPORT","http")  # http | grpc
 if MODE == "grpc":
-    from ._grpc import hybrid_search, snippet, grep_like, snippet_stream
+    from ._grpc import hybrid_search, hybrid_search_batch, snippet, grep_like, snippet_stream
 else:
-    from ._http import hybrid_search, snippet, grep_like, snippet_stream
+    from ._http import hybrid_search, hybrid_search_batch, snippet, grep_like, snippet_stream
 
-__all__ = ["hybrid_search", "snippet", "grep_like", "snippet_stream", "DocHit"]
\ No newline at end of file
+__all__ = ["hybrid_search", "hybrid_search_batch", "snippet", "grep_like", "snippet_stream", "DocHit"]
\ No newline at end of file
@@ -1,4 +1,4 @@
-import os, httpx, tenacity, logging, json, time
+import os, httpx, tenacity, logging, json, time, asyncio
 from .typing import DocHit
 from .cache import CACHE
 from typing import List
@@ -19,18 +19,35 @@ async def _get(path, params=None):
         r = await cli.get(f"{BASE}{path}", params=params)
         r.raise_for_status(); return r.json()
 
+@tenacity.retry(
+    wait=tenacity.wait_exponential(multiplier=0.5, min=1, max=8),
+    stop=tenacity.stop_after_attempt(3),
+    retry=tenacity.retry_if_not_exception_type(httpx.HTTPStatusError),
+    reraise=True)
+async def _post(path, body):
+    async with httpx.AsyncClient(timeout=60) as cli:
+        r = await cli.post(f"{BASE}{path}", json=body)
+        r.raise_for_status(); return r.json()
+
 async def _timed(fn, *a, **kw):
     t=time.perf_counter()
     res=await fn(*a,**kw)
     LAT.labels(fn.__name__).inc(time.perf_counter()-t)
     return res
 
-async def _hybrid_search_impl(query:str, k:int=8, alpha:float=0.25, filter:dict|None=None) -> List[DocHit]:
-    cache_key = f"hs::{query}:{k}:{alpha}:{json.dumps(filter,sort_keys=True) if filter else ''}"
-    if hit:=CACHE.get(cache_key): return hit
+def _hs_key(query, k, alpha, filter):
+    return f"hs::{query}:{k}:{alpha}:{json.dumps(filter,sort_keys=True) if filter else ''}"
+
+def _hs_params(query, k=8, alpha=0.25, filter=None):
+    # everything in the cache key goes to the server, single or batched
     params = {"q": query, "k": k, "alpha": alpha}
     if filter: params.update(filter)
-    js = await _get("/search", params=params)
+    return params
+
+async def _hybrid_search_impl(query:str, k:int=8, alpha:float=0.25, filter:dict|None=None) -> List[DocHit]:
+    cache_key = _hs_key(query, k, alpha, filter)
+    if hit:=CACHE.get(cache_key): return hit
+    js = await _get("/search", params=_hs_params(query, k, alpha, filter))
     CACHE.set(cache_key, js["results"])
     return js["results"]
 
@@ -38,6 +55,31 @@ async def hybrid_search(query:str, k:int=8, alpha:float=0.25, filter:dict|None=N
     CALLS.labels("search").inc()
     return await _timed(_hybrid_search_impl, query, k, alpha, filter)
 
+async def _hybrid_search_batch_impl(queries:list[dict]) -> List[List[DocHit]]:
+    out, misses = [None]*len(queries), []
+    for i, q in enumerate(queries):
+        key = _hs_key(q["query"], q.get("k", 8), q.get("alpha", 0.25), q.get("filter"))
+        if hit:=CACHE.get(key): out[i] = hit
+        else: misses.append((i, key))
+    if not misses: return out
+    body = {"queries": [_hs_params(**queries[i]) for i, _ in misses]}
+    try:
+        js = await _post("/search/batch", body)
+    except httpx.HTTPStatusError as e:
+        if e.response.status_code not in (404, 405): raise
+        log.info("rag_service has no /search/batch; searching one query at a time")
+        res = await asyncio.gather(*(_hybrid_search_impl(**queries[i]) for i, _ in misses))
+        js = {"replies": [{"results": r} for r in res]}
+    for (i, key), reply in zip(misses, js["replies"]):
+        CACHE.set(key, reply["results"])
+        out[i] = reply["results"]
+    return out
+
+async def hybrid_search_batch(queries:list[dict]) -> List[List[DocHit]]:
+    """Many hybrid searches in one request; `queries` holds hybrid_search kwargs, results keep their order."""
+    CALLS.labels("search_batch").inc()
+    return await _timed(_hybrid_search_batch_impl, queries)
+
 async def _snippet_impl(point_id:int, radius:int=20)->str:
     cache_key = f"snip::{point_id}:{radius}"
     if hit:=CACHE.get(cache_key): return hit
@@ -10,4 +10,38 @@ async def test_hybrid_cache(monkeypatch):
     monkeypatch.setattr("clients.rag_client._http._get", fake_get)
     res1=await hybrid_search("hello",k=2)
     res2=await hybrid_search("hello",k=2)
-    assert calls==1 and res1==res2
\ No newline at end of file
+    assert calls==1 and res1==res2
+
+@pytest.mark.asyncio
+async def test_batch_search_only_sends_cache_misses(monkeypatch):
+    from clients.rag_client import hybrid_search_batch
+    bodies=[]
+    async def fake_post(path, body):
+        bodies.append(body)
+        return {"replies":[{"results":[{"point_id":i,"snippet":q["q"],"score":1.0}]} for i,q in enumerate(body["queries"])]}
+    async def fake_get(*_,**__):
+        return {"results":[{"point_id":9,"snippet":"cached","score":1.0}]}
+    monkeypatch.setattr("clients.rag_client._http._post", fake_post)
+    monkeypatch.setattr("clients.rag_client._http._get", fake_get)
+    await hybrid_search("warm",k=3)
+    res=await hybrid_search_batch([{"query":"cold","k":3},{"query":"warm","k":3},{"query":"other","k":3}])
+    assert bodies==[{"queries":[{"q":"cold","k":3,"alpha":0.25},{"q":"other","k":3,"alpha":0.25}]}]
+    assert [r[0]["snippet"] for r in res]==["cold","cached","other"]
+    assert await hybrid_search_batch([{"query":"cold","k":3}])==[res[0]] and len(bodies)==1
+    await hybrid_search_batch([{"query":"cold","k":3,"filter":{"path":"x.py"}}])
+    assert bodies[-1]=={"queries":[{"q":"cold","k":3,"alpha":0.25,"path":"x.py"}]}
+
+
+@pytest.mark.asyncio
+async def test_batch_search_falls_back_without_endpoint(monkeypatch):
+    import httpx
+    from clients.rag_client import hybrid_search_batch
+    async def no_batch(path, body):
+        req=httpx.Request("POST","http://rag/search/batch")
+        raise httpx.HTTPStatusError("404",request=req,response=httpx.Response(404,request=req))
+    async def fake_get(path, params=None):
+        return {"results":[{"point_id":1,"snippet":params["q"],"score":1.0}]}
+    monkeypatch.setattr("clients.rag_client._http._post", no_batch)
+    monkeypatch.setattr("clients.rag_client._http._get", fake_get)
+    res=await hybrid_search_batch([{"query":"fb-a","k":1},{"query":"fb-b","k":1,"filter":{"path":"x.py"}}])
+    assert [r[0]["snippet"] for r in res]==["fb-a","fb-b"]
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""Compare protobuf vs orjson payload size and decode rate for the pipeline messages.
+
+    python -m scripts.bench_codec [iterations]
+
+"orjson -> dict" is what a JSON consumer gets; "orjson -> proto" adds the
+ParseDict step needed to hand handlers the same typed object as the proto path.
+"""
+import sys, time, uuid
+import orjson
+from google.protobuf.json_format import MessageToDict, ParseDict
+from apps import core_contracts_pb2 as pb
+from clients.kafka_utils.codec import decode
+
+def samples() -> dict:
+    rid = str(uuid.uuid4())
+    plan = pb.Plan(id=str(uuid.uuid4()), parent_request_id=rid,
+                   rationale=["keep the public API stable", "touch as few modules as possible"])
+    for i in range(10):
+        plan.steps.add(order=i + 1, goal=f"update handler {i} to use the shared client",
+                       kind="EDIT", path=f"apps/service_{i}/handler.py")
+    bundle = pb.TaskBundle(plan_id=plan.id)
+    for s in plan.steps:
+        bundle.tasks.add(id=str(uuid.uuid4()), parent_plan_id=plan.id, step_number=s.order,
+                         goal=s.goal, path=s.path, kind=s.kind, complexity="moderate",
+                         blob_ids=[f"{s.path}:{n}" for n in range(8)])
+    return {
+        "ChangeRequest": pb.ChangeRequest(id=rid, requester="bench", repo="demo", branch="main",
+                                          description="add retries to every outbound HTTP call"),
+        "Plan": plan,
+        "TaskBundle": bundle,
+        "CommitResult": pb.CommitResult(task_id=str(uuid.uuid4()), commit_sha="a" * 40,
+                                        status="SUCCESS", branch_name="auto/bench",
+                                        notes=["selfcheck passed"]),
+        "BuildReport": pb.BuildReport(commit_sha="a" * 40, status="FAILED",
+                                      failed_tests=[f"tests/test_{i}.py::test_case" for i in range(5)],
+                                      line_coverage=81.5, artefact_url="/artefacts/bench.tgz"),
+    }
+
+def rate(fn, n: int) -> float:
+    t0 = time.perf_counter()
+    for _ in range(n):
+        fn()
+    return n / (time.perf_counter() - t0)
+
+def run(n: int = 20000) -> list[dict]:
+    rows = []
+    for name, msg in samples().items():
+        cls = type(msg)
+        pbuf = msg.SerializeToString()
+        jbuf = orjson.dumps(MessageToDict(msg, preserving_proto_field_name=True))
+        view = memoryview(b"\0" * 16 + pbuf)[16:]          # payload inside a larger buffer
+        rows.append({
+            "message": name,
+            "proto_bytes": len(pbuf),
+            "json_bytes": len(jbuf),
+            "proto_per_s": rate(lambda: decode(pbuf, cls), n),
+            "proto_view_per_s": rate(lambda: decode(view, cls), n),
+            "json_dict_per_s": rate(lambda: decode(jbuf, dict), n),
+            "json_proto_per_s": rate(lambda: ParseDict(orjson.loads(jbuf), cls()), n),
+        })
+    return rows
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    cols = ["message", "proto_bytes", "json_bytes", "proto_per_s", "proto_view_per_s",
+            "json_dict_per_s", "json_proto_per_s"]
+    print(" ".join(f"{c:>16}" for c in cols))
+    for r in run(n):
+        print(" ".join(f"{r[c]:>16,.0f}" if isinstance(r[c], float) else f"{r[c]:>16}" for c in cols))
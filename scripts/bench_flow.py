@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""End-to-end Kafka flow benchmark on the in-process broker.
+
+    python -m scripts.bench_flow [requests] [tasks_per_plan]
+
+Runs stand-in agents wired like the real services through kafka_utils'
+consumer and producer, with the orchestrator's real `Pipelines` routing and
+task DAG in the middle (CRQ -> DEEP -> PLAN -> TASK -> per-task CTASK -> CRES
+-> BREPORT).  It measures the messaging and scheduling path (codec,
+batching, commits, dispatch) without LLM, RAG or git work, and reports
+throughput and per-request latency percentiles.
+"""
+import asyncio, statistics, sys, time, uuid
+from apps import core_contracts_pb2 as pb
+from apps.orchestrator import topics as T
+from apps.orchestrator.pipelines import Pipelines
+from clients.kafka_utils import backend, memory, producer as kproducer
+from clients.kafka_utils.runtime import serve
+
+async def _flow(n:int, tasks:int) -> dict:
+    send = kproducer.send
+    started: dict[str, float] = {}
+    remaining: dict[str, int] = {}
+    latencies: list[float] = []
+    done = asyncio.Event()
+    pipelines = Pipelines()
+
+    async def orchestrator(topic, obj):
+        _, out = pipelines.handle(topic, obj)
+        for t, msg, key in out:
+            await send(t, msg, key=key, wait=False)
+
+    async def planner(topic, cr):
+        plan = pb.Plan(id=str(uuid.uuid4()), parent_request_id=cr.id, correlation_id=cr.id)
+        for i in range(tasks):
+            plan.steps.add(order=i + 1, goal=cr.description, kind="EDIT", path=f"pkg/mod_{i}.py")
+        await send(T.PLAN, plan, key=cr.id)
+
+    async def code_planner(topic, plan):
+        tb = pb.TaskBundle(plan_id=plan.id, correlation_id=plan.correlation_id)
+        for s in plan.steps:
+            tb.tasks.add(id=str(uuid.uuid4()), parent_plan_id=plan.id, step_number=s.order,
+                         goal=s.goal, path=s.path, kind=s.kind)
+        await send(T.TASK, tb, key=plan.id)
+
+    async def coder(topic, task):
+        await send(T.CRES, pb.CommitResult(task_id=task.id, commit_sha=uuid.uuid4().hex, status="SUCCESS",
+                                           branch_name=f"agt/{task.id}", correlation_id=task.correlation_id))
+
+    async def ci(topic, cres):
+        await send(T.BREPORT, pb.BuildReport(commit_sha=cres.commit_sha, status="PASSED",
+                                             correlation_id=cres.correlation_id))
+
+    async def sink(topic, rep):
+        cid = rep.correlation_id
+        remaining[cid] -= 1
+        if remaining[cid] == 0:
+            latencies.append(time.perf_counter() - started[cid])
+            if len(latencies) == n:
+                done.set()
+
+    stages = [asyncio.ensure_future(serve(group, topics, fn, commit="after"))
+              for group, topics, fn in (
+                  ("bench-orch", [T.CRQ, T.PLAN, T.TASK, T.CRES, T.BREPORT], orchestrator),
+                  ("bench-rp", [T.DEEP], planner), ("bench-cp", [T.PLAN], code_planner),
+                  ("bench-ca", [T.CTASK], coder), ("bench-ci", [T.CRES], ci),
+                  ("bench-sink", [T.BREPORT], sink))]
+    t0 = time.perf_counter()
+    for _ in range(n):
+        cr = pb.ChangeRequest(id=str(uuid.uuid4()), requester="bench", repo="demo",
+                              branch="main", description="rename helper")
+        started[cr.id], remaining[cr.id] = time.perf_counter(), tasks
+        await send(T.CRQ, cr, key=cr.id, wait=False)
+    await done.wait()
+    wall = time.perf_counter() - t0
+    for s in stages:
+        s.cancel()
+    await asyncio.gather(*stages, return_exceptions=True)
+    q = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else latencies * 99
+    msgs = n * (4 + 3 * tasks)
+    return {"requests": n, "messages": msgs, "wall_s": wall,
+            "requests_per_s": n / wall, "messages_per_s": msgs / wall,
+            "p50_ms": q[49] * 1000, "p99_ms": q[98] * 1000}
+
+def run(n:int=200, tasks:int=4) -> dict:
+    """Run the flow on a fresh in-memory broker; restores the previous backend."""
+    prev, prev_producer = backend.name, kproducer._producer
+    backend.use("memory")
+    memory.reset()
+    kproducer._producer = None
+    try:
+        return asyncio.run(_flow(n, tasks))
+    finally:
+        if kproducer._producer is not None:
+            kproducer._producer.close()
+        kproducer._producer = prev_producer
+        backend.use(prev)
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    tasks = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    for k, v in run(n, tasks).items():
+        print(f"{k:>16} {v:,.1f}" if isinstance(v, float) else f"{k:>16} {v}")
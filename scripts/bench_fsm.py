@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""Table-driven OrchestratorFSM vs the transitions.Machine version it replaced.
+
+    python -m scripts.bench_fsm [instances]
+
+Reports construction time, cost per transition and memory per instance.
+The transitions-based machine is rebuilt here from the same TRANSITIONS
+table, so both implementations run the identical state graph.
+"""
+import sys, time, tracemalloc
+from apps.orchestrator.state_machine import ANY, TRANSITIONS, OrchestratorFSM, Stage
+
+HAPPY_PATH = ("crq", "plan", "code_ok", "build_ok", "tspec", "gt_ok", "build2_ok")
+
+class LegacyFSM:
+    def __init__(self):
+        from transitions import Machine, State
+        self.machine = Machine(model=self, states=[State(s.value) for s in Stage], initial=Stage.IDLE.value)
+        for ev, src, dst in TRANSITIONS:
+            self.machine.add_transition(ev, src if src == ANY else src.value, dst.value)
+
+def _measure(factory, n:int) -> dict:
+    t0 = time.perf_counter()
+    fsms = [factory() for _ in range(n)]
+    build = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    for f in fsms:
+        for ev in HAPPY_PATH:
+            getattr(f, ev)()
+    step = time.perf_counter() - t0
+    assert all(f.state == Stage.DONE.value for f in fsms)
+    del fsms
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    keep = [factory() for _ in range(n)]
+    mem = tracemalloc.get_traced_memory()[0] - base
+    tracemalloc.stop()
+    del keep
+    return {"construct_us": build / n * 1e6, "transition_us": step / (n * len(HAPPY_PATH)) * 1e6,
+            "bytes_per_fsm": mem / n}
+
+def run(n:int=2000) -> dict:
+    return {"table": _measure(OrchestratorFSM, n), "transitions": _measure(LegacyFSM, n)}
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    res = run(n)
+    print(f"{'':>12} {'construct_us':>14} {'transition_us':>14} {'bytes_per_fsm':>14}")
+    for name, r in res.items():
+        print(f"{name:>12} {r['construct_us']:>14.2f} {r['transition_us']:>14.3f} {r['bytes_per_fsm']:>14.0f}")